@@ -6,6 +6,8 @@ import sqlite3
 import uuid
 from datetime import datetime, date
 from flask import Blueprint, request, jsonify, current_app
+from catalog import get_catalog
+from userstats import read_user_stats
 activity_bp = Blueprint('activity', __name__)
 
 def now_iso():
@@ -20,8 +22,8 @@ def _json_field(obj, key, default=None):
 
 @activity_bp.route('/api/activity', methods=['POST'])
 def post_activity():
-    # Local import of get_db (FIX APPLIED)
-    from app import get_db
+    # Local import of db_write (FIX APPLIED)
+    from app import db_write
     """
     Generic activity ingestion endpoint.
     Body: { event_type, event_subtype?, term_key?, subject?, payload?, user_id? }
@@ -38,9 +40,7 @@ def post_activity():
 
     payload_str = json.dumps(payload, default=str)
 
-    try:
-        db = get_db()
-        cur = db.cursor()
+    def record(cur):
         cur.execute("""
             INSERT INTO user_activity_log
             (user_id, event_type, event_subtype, term_key, subject, payload, created_at)
@@ -48,14 +48,14 @@ def post_activity():
         """, (user_id, event_type, event_subtype, term_key, subject, payload_str, now_iso()))
         # update aggregates if view event
         if event_type == 'view_term':
-            # increment term_view_aggregates
+            # increment term_view_aggregates (catalog terms only; the log keeps the raw key)
             cur.execute("""
-                INSERT INTO term_view_aggregates (user_id, term_key, views, last_viewed)
-                VALUES (?, ?, 1, ?)
-                ON CONFLICT(user_id, term_key) DO UPDATE SET
+                INSERT INTO term_view_aggregates (user_id, term_id, views, last_viewed)
+                SELECT ?, term_id, 1, ? FROM terms_data WHERE term = ?
+                ON CONFLICT(user_id, term_id) DO UPDATE SET
                     views = views + 1,
                     last_viewed = excluded.last_viewed
-            """, (user_id, term_key, now_iso()))
+            """, (user_id, now_iso(), term_key))
             # update subject aggregates (if subject provided)
             if subject:
                 cur.execute("""
@@ -65,7 +65,9 @@ def post_activity():
                         views = views + 1,
                         last_viewed = excluded.last_viewed
                 """, (user_id, subject, now_iso()))
-        db.commit()
+
+    try:
+        db_write(record)
         
         return jsonify({'success': True})
     except FileNotFoundError as fe:
@@ -82,15 +84,12 @@ def start_session():
     token = str(uuid.uuid4())
     started_at = now_iso()
     try:
-        # Local import of get_db (FIX APPLIED)
-        from app import get_db
-        db=get_db()
-        cur = db.cursor()
-        cur.execute("""
+        # Local import of db_write (FIX APPLIED)
+        from app import db_write
+        db_write(lambda cur: cur.execute("""
             INSERT INTO user_sessions (user_id, session_token, started_at, device_info)
             VALUES (?, ?, ?, ?)
-        """, (user_id, token, started_at, device_info))
-        db.commit()
+        """, (user_id, token, started_at, device_info)))
         
         return jsonify({'session_token': token, 'started_at': started_at})
     except Exception as e:
@@ -105,11 +104,8 @@ def end_session():
     ended_at = now_iso()
     if not token:
         return jsonify({'error': 'session_token required'}), 400
-    try:
-        # Local import of get_db (FIX APPLIED)
-        from app import get_db
-        db=get_db()
-        cur = db.cursor()
+
+    def finish(cur):
         # update session row
         if duration is not None:
             cur.execute("""
@@ -132,7 +128,11 @@ def end_session():
                     UPDATE user_sessions SET ended_at = ?
                     WHERE session_token = ?
                 """, (ended_at, token))
-        db.commit()
+
+    try:
+        # Local import of db_write (FIX APPLIED)
+        from app import db_write
+        db_write(finish)
         
         return jsonify({'success': True})
     except Exception as e:
@@ -147,15 +147,12 @@ def post_search():
     results_count = int(data.get('results_count') or 0)
     clicked_term = data.get('clicked_term')
     try:
-        # Local import of get_db (FIX APPLIED)
-        from app import get_db
-        db=get_db()
-        cur = db.cursor()
-        cur.execute("""
+        # Local import of db_write (FIX APPLIED)
+        from app import db_write
+        db_write(lambda cur: cur.execute("""
             INSERT INTO search_logs (user_id, query, results_count, clicked_term, created_at)
             VALUES (?, ?, ?, ?, ?)
-        """, (user_id, query, results_count, clicked_term, now_iso()))
-        db.commit()
+        """, (user_id, query, results_count, clicked_term, now_iso())))
         
         return jsonify({'success': True})
     except Exception as e:
@@ -191,7 +188,11 @@ def get_collections():
         collections = []
         for collection in collections_raw:
             col_id = collection['id']
-            cursor.execute("SELECT term FROM collection_terms WHERE collection_id = ?", (col_id,))
+            cursor.execute("""
+                SELECT t.term FROM collection_terms c
+                JOIN terms_data t ON t.term_id = c.term_id
+                WHERE c.collection_id = ?
+            """, (col_id,))
             terms = [row['term'] for row in cursor.fetchall()]
             
             collection['terms'] = terms
@@ -206,10 +207,7 @@ def get_collections():
 
 @activity_bp.route('/api/collections', methods=['POST'])
 def save_collection():
-    """Creates a new collection or updates an existing one (includes term replacement).
-    
-    CRITICAL FIX: db.commit() added to ensure data persistence.
-    """
+    """Creates a new collection or updates an existing one (includes term replacement)."""
     data = request.get_json(force=True)
     user_id = _json_field(data, 'user_id', 'local')
     name = _json_field(data, 'name')
@@ -219,12 +217,10 @@ def save_collection():
     if not name:
         return jsonify({'error': 'Collection name is required'}), 400
 
-    from app import get_db
-    db = get_db()
-    cursor = db.cursor()
-    id_to_use = collection_id
+    from app import db_write
 
-    try:
+    def save(cursor):
+        """Returns the collection id, or None on a name collision."""
         if collection_id:
             # --- Update existing collection ---
             # 1. Update the name
@@ -233,11 +229,6 @@ def save_collection():
             # 2. Delete old terms to replace them with the new list
             cursor.execute("DELETE FROM collection_terms WHERE collection_id = ?", (collection_id,))
             
-            if cursor.rowcount == 0:
-                # Optional: If collection_id was provided but not found, could be an error
-                current_app.logger.warning(f"Attempted to update non-existent collection ID {collection_id}")
-                pass
-            
             id_to_use = collection_id
             
         else:
@@ -245,20 +236,26 @@ def save_collection():
             # Check for name collision first
             cursor.execute("SELECT 1 FROM user_collections WHERE user_id = ? AND name = ?", (user_id, name))
             if cursor.fetchone():
-                return jsonify({"error": "A collection with this name already exists"}), 409
+                return None
             
             # Insert the new collection
             cursor.execute("INSERT INTO user_collections (user_id, name) VALUES (?, ?)", (user_id, name))
             id_to_use = cursor.lastrowid
 
-        # 3. Insert new terms (for both create and update)
+        # 3. Insert new terms (for both create and update); names not in the catalog are skipped
         if id_to_use and terms:
             term_data = [(id_to_use, term) for term in terms]
-            cursor.executemany("INSERT OR IGNORE INTO collection_terms (collection_id, term) VALUES (?, ?)", term_data)
+            cursor.executemany("""
+                INSERT OR IGNORE INTO collection_terms (collection_id, term_id)
+                SELECT ?, term_id FROM terms_data WHERE term = ?
+            """, term_data)
+        return id_to_use
 
-        # <<< CRITICAL FIX: COMMIT THE TRANSACTION >>>
-        db.commit() 
-        # ---------------------------------------------
+    try:
+        # Committed by the writer thread before it returns
+        id_to_use = db_write(save)
+        if id_to_use is None:
+            return jsonify({"error": "A collection with this name already exists"}), 409
         
         return jsonify({
             'message': 'Collection saved successfully',
@@ -268,44 +265,36 @@ def save_collection():
         }), 200
 
     except Exception as e:
-        db.rollback()
         current_app.logger.exception("save_collection failed")
         return jsonify({'error': str(e)}), 500
 
 
 @activity_bp.route('/api/collections/<int:collection_id>', methods=['DELETE'])
 def delete_collection(collection_id):
-    """Deletes a collection. FIX: Added db.commit()"""
+    """Deletes a collection."""
     user_id = request.args.get('user_id', 'local')
-    from app import get_db
-    db = get_db()
-    cursor = db.cursor()
+    from app import db_write
 
-    try:
+    def delete(cursor):
         # Delete the collection (ON DELETE CASCADE handles terms deletion)
         cursor.execute("DELETE FROM user_collections WHERE id = ? AND user_id = ?", (collection_id, user_id))
-        
-        # <<< CRITICAL FIX: COMMIT THE TRANSACTION >>>
-        db.commit() 
-        # ---------------------------------------------
+        return cursor.rowcount
 
-        if cursor.rowcount == 0:
+    try:
+        if db_write(delete) == 0:
             return jsonify({"error": "Collection not found or access denied"}), 404
         
         return jsonify({'message': 'Collection deleted successfully'}), 200
 
     except Exception as e:
-        db.rollback()
         current_app.logger.exception("delete_collection failed")
         return jsonify({'error': str(e)}), 500
 
 
 @activity_bp.route('/api/collections/<int:collection_id>/terms', methods=['POST'])
 def add_term_to_collection(collection_id):
-    """Adds a single term to a collection. FIX: Added db.commit()"""
-    from app import get_db
-    db = get_db()
-    cursor = db.cursor()
+    """Adds a single term to a collection."""
+    from app import db_write
     
     data = request.get_json(force=True)
     user_id = _json_field(data, 'user_id', 'local')
@@ -314,33 +303,41 @@ def add_term_to_collection(collection_id):
     if not term:
         return jsonify({'error': 'Term is required'}), 400
     
-    try:
+    def add(cursor):
+        """None if the collection is not the user's, False if the term is not in the catalog."""
         # Check if the collection belongs to the user
         cursor.execute("SELECT 1 FROM user_collections WHERE id = ? AND user_id = ?", (collection_id, user_id))
         if cursor.fetchone() is None:
-            return jsonify({"error": "Collection not found or access denied"}), 404
+            return None
+
+        cursor.execute("SELECT term_id FROM terms_data WHERE term = ?", (term,))
+        row = cursor.fetchone()
+        if row is None:
+            return False
 
         # Insert the term (using INSERT OR IGNORE to handle duplicates gracefully)
-        cursor.execute("INSERT OR IGNORE INTO collection_terms (collection_id, term) VALUES (?, ?)", (collection_id, term))
-        
-        # <<< CRITICAL FIX: COMMIT THE TRANSACTION >>>
-        db.commit() 
-        # ---------------------------------------------
+        cursor.execute("INSERT OR IGNORE INTO collection_terms (collection_id, term_id) VALUES (?, ?)",
+                       (collection_id, row[0]))
+        return True
+    
+    try:
+        added = db_write(add)
+        if added is None:
+            return jsonify({"error": "Collection not found or access denied"}), 404
+        if not added:
+            return jsonify({"error": f"Term {term} not found"}), 404
 
         return jsonify({'message': f'Term {term} added successfully'}), 200
 
     except Exception as e:
-        db.rollback()
         current_app.logger.exception("add_term_to_collection failed")
         return jsonify({'error': str(e)}), 500
 
 
 @activity_bp.route('/api/collections/<int:collection_id>/terms', methods=['DELETE'])
 def remove_term_from_collection(collection_id):
-    """Removes a single term from a collection. FIX: Added db.commit()"""
-    from app import get_db
-    db = get_db()
-    cursor = db.cursor()
+    """Removes a single term from a collection."""
+    from app import db_write
     
     data = request.get_json(force=True)
     user_id = _json_field(data, 'user_id', 'local')
@@ -349,26 +346,30 @@ def remove_term_from_collection(collection_id):
     if not term:
         return jsonify({'error': 'Term is required'}), 400
 
-    try:
+    def remove(cursor):
+        """Deleted row count, or None if the collection is not the user's."""
         # Check if the collection belongs to the user
         cursor.execute("SELECT 1 FROM user_collections WHERE id = ? AND user_id = ?", (collection_id, user_id))
         if cursor.fetchone() is None:
-            return jsonify({"error": "Collection not found or access denied"}), 404
+            return None
 
         # Delete the term link
-        cursor.execute("DELETE FROM collection_terms WHERE collection_id = ? AND term = ?", (collection_id, term))
-        
-        # <<< CRITICAL FIX: COMMIT THE TRANSACTION >>>
-        db.commit() 
-        # ---------------------------------------------
-        
-        if cursor.rowcount == 0:
+        cursor.execute("""
+            DELETE FROM collection_terms
+            WHERE collection_id = ? AND term_id = (SELECT term_id FROM terms_data WHERE term = ?)
+        """, (collection_id, term))
+        return cursor.rowcount
+
+    try:
+        removed = db_write(remove)
+        if removed is None:
+            return jsonify({"error": "Collection not found or access denied"}), 404
+        if removed == 0:
             return jsonify({"error": "Term not found in collection"}), 404
 
         return jsonify({'message': f'Term {term} removed successfully'}), 200
 
     except Exception as e:
-        db.rollback()
         current_app.logger.exception("remove_term_from_collection failed")
         return jsonify({'error': str(e)}), 500
 
@@ -385,28 +386,15 @@ def stats_overview():
     user_id = request.args.get('user_id', 'local')
     try:
         # Local import of get_db (FIX APPLIED)
-        from app import get_db
-        db=get_db()
+        from app import get_read_db, CATALOG_PATH
+        db=get_read_db()
         cur = db.cursor()
-        # total terms (fast)
-        # Note: assuming 'terms_data' table exists in your DB, as per context
-        cur.execute("SELECT COUNT(*) as cnt FROM terms_data")
-        # Use fetchone() check instead of rowcount for clarity/robustness with fetchone()
-        row_total = cur.fetchone()
-        total = row_total['cnt'] if row_total else 0
-
-        # favorites/bookmarks/notes counts from user_term_meta
-        cur.execute("""
-            SELECT
-              SUM(CASE WHEN favorite = 1 THEN 1 ELSE 0 END) as favorites,
-              SUM(CASE WHEN bookmark = 1 THEN 1 ELSE 0 END) as bookmarks
-            FROM user_term_meta WHERE user_id = ?
-        """, (user_id,))
-        row = cur.fetchone()
-        favorites = row['favorites'] or 0
-        bookmarks = row['bookmarks'] or 0
+        # Catalog size from the in-memory index; counts from the user's summary row
+        total = len(get_catalog(CATALOG_PATH).all_terms())
+        summary = read_user_stats(cur, user_id)
+        favorites = summary['favorites']
+        bookmarks = summary['bookmarks']
 
-        
         return jsonify({
             'total_terms': total,
             'favorites': favorites,
@@ -422,8 +410,8 @@ def top_searches():
     limit = int(request.args.get('limit', 20))
     try:
         # Local import of get_db (FIX APPLIED)
-        from app import get_db
-        db=get_db()
+        from app import get_read_db
+        db=get_read_db()
         cur = db.cursor()
         cur.execute("""
             SELECT query, COUNT(*) as times, SUM(CASE WHEN clicked_term IS NOT NULL THEN 1 ELSE 0 END) as clicks
@@ -456,28 +444,32 @@ def term_group():
     favorite = request.args.get('favorite')
     bookmark = request.args.get('bookmark')
 
-    conds = ["user_id = ?"]
+    conds = ["m.user_id = ?"]
     params = [user_id]
 
     if rating is not None:
-        conds.append("rating = ?")
+        conds.append("m.rating = ?")
         params.append(int(rating))
     if important_min is not None:
-        conds.append("important_level >= ?")
+        conds.append("m.important_level >= ?")
         params.append(int(important_min))
     if favorite is not None and favorite == '1':
-        conds.append("favorite = 1")
+        conds.append("m.favorite = 1")
     if bookmark is not None and bookmark == '1':
-        conds.append("bookmark = 1")
+        conds.append("m.bookmark = 1")
 
     where = " AND ".join(conds)
     try:
         # Local import of get_db (FIX APPLIED)
-        from app import get_db
-        db=get_db()
+        from app import get_read_db
+        db=get_read_db()
         cur = db.cursor()
         # Assuming 'important_level' is in 'user_term_meta' as per your original request snippet context.
-        q = f"SELECT term, favorite, bookmark, difficulty, rating, notes, last_viewed, important_level FROM user_term_meta WHERE {where} ORDER BY term"
+        q = f"""
+            SELECT t.term, m.favorite, m.bookmark, m.difficulty, m.rating, m.notes, m.last_viewed, m.important_level
+            FROM user_term_meta m JOIN terms_data t ON t.term_id = m.term_id
+            WHERE {where} ORDER BY t.term
+        """
         cur.execute(q, params)
         rows = cur.fetchall()
         data = []
@@ -526,31 +518,28 @@ def save_term_meta():
     important_level = _json_field(data, 'important_level', 0)
     
     try:
-        # Local import of get_db (FIX APPLIED)
-        from app import get_db
-        db = get_db()
-        cur = db.cursor()
+        # Local import of db_write (FIX APPLIED)
+        from app import db_write
         
-        # INSERT OR UPDATE (UPSERT)
-        cur.execute("""
+        # INSERT OR UPDATE (UPSERT); no row if the term is not in the catalog
+        saved = db_write(lambda cur: cur.execute("""
             INSERT INTO user_term_meta 
-                (user_id, term, favorite, bookmark, difficulty, rating, notes, important_level)
-            VALUES 
-                (?, ?, ?, ?, ?, ?, ?, ?)
-            ON CONFLICT(user_id, term) DO UPDATE SET
+                (user_id, term_id, favorite, bookmark, difficulty, rating, notes, important_level)
+            SELECT ?, term_id, ?, ?, ?, ?, ?, ?
+            FROM terms_data WHERE term = ?
+            ON CONFLICT(user_id, term_id) DO UPDATE SET
                 favorite = excluded.favorite,
                 bookmark = excluded.bookmark,
                 difficulty = excluded.difficulty,
                 rating = excluded.rating,
                 notes = excluded.notes,
                 important_level = excluded.important_level
-        """, (user_id, term, favorite, bookmark, difficulty, rating, notes, important_level))
-
-        db.commit()
+        """, (user_id, favorite, bookmark, difficulty, rating, notes, important_level, term)).rowcount)
         
+        if not saved:
+            return jsonify({'error': f'Term "{term}" not found'}), 404
         return jsonify({'success': True})
     except Exception as e:
-        db.rollback()
         current_app.logger.exception("save_term_meta failed")
         return jsonify({'error': str(e)}), 500
     
@@ -568,10 +557,11 @@ def get_homework():
         db = get_db()
         cur = db.cursor()
         cur.execute("""
-            SELECT id, term, due_date, notes, added_at
-            FROM homework
-            WHERE user_id = ?
-            ORDER BY due_date ASC, added_at DESC
+            SELECT h.id, t.term, h.due_date, h.notes, h.added_at
+            FROM homework h
+            JOIN terms_data t ON t.term_id = h.term_id
+            WHERE h.user_id = ?
+            ORDER BY h.due_date ASC, h.added_at DESC
         """, (user_id,))
         rows = cur.fetchall()
         
@@ -594,20 +584,23 @@ def add_homework():
     if not term or not due_date:
         return jsonify({'error': 'term and due_date are required'}), 400
     
-    try:
-        # Local import of get_db (FIX APPLIED)
-        from app import get_db
-        db = get_db()
-        cur = db.cursor()
+    def insert(cur):
+        """New row id, or None if the term is not in the catalog."""
         cur.execute("""
-            INSERT INTO homework (user_id, term, due_date, notes, added_at)
-            VALUES (?, ?, ?, ?, ?)
-        """, (user_id, term, due_date, notes, now_iso()))
-        db.commit()
+            INSERT INTO homework (user_id, term_id, due_date, notes, added_at)
+            SELECT ?, term_id, ?, ?, ? FROM terms_data WHERE term = ?
+        """, (user_id, due_date, notes, now_iso(), term))
+        return cur.lastrowid if cur.rowcount else None
+    
+    try:
+        # Local import of db_write (FIX APPLIED)
+        from app import db_write
+        hid = db_write(insert)
+        if hid is None:
+            return jsonify({'error': f'Term "{term}" not found'}), 404
         
-        return jsonify({'success': True, 'id': cur.lastrowid}), 201
+        return jsonify({'success': True, 'id': hid}), 201
     except Exception as e:
-        db.rollback()
         current_app.logger.exception("add_homework failed")
         return jsonify({'error': str(e)}), 500
 
@@ -617,14 +610,12 @@ def delete_homework(hid):
     user_id = request.args.get('user_id', 'local')
     
     try:
-        # Local import of get_db (FIX APPLIED)
-        from app import get_db
-        db = get_db()
-        cur = db.cursor()
-        cur.execute("DELETE FROM homework WHERE id = ? AND user_id = ?", (hid, user_id))
-        db.commit()
+        # Local import of db_write (FIX APPLIED)
+        from app import db_write
+        deleted = db_write(lambda cur: cur.execute(
+            "DELETE FROM homework WHERE id = ? AND user_id = ?", (hid, user_id)).rowcount)
         
-        if cur.rowcount == 0:
+        if deleted == 0:
             return jsonify({'error': 'Homework item not found or unauthorized'}), 404
         
         return jsonify({'success': True})
@@ -676,18 +667,15 @@ def save_preference():
         return jsonify({'error': 'key required'}), 400
     
     try:
-        # Local import of get_db (FIX APPLIED)
-        from app import get_db
-        db=get_db()
-        cur = db.cursor()
-        cur.execute("""
+        # Local import of db_write (FIX APPLIED)
+        from app import db_write
+        db_write(lambda cur: cur.execute("""
             INSERT INTO user_preferences (user_id, preference_key, preference_value, updated_at)
             VALUES (?, ?, ?, ?)
             ON CONFLICT(user_id, preference_key) DO UPDATE SET
                 preference_value = excluded.preference_value,
                 updated_at = excluded.updated_at
-        """, (user_id, key, str(value), now_iso()))
-        db.commit()
+        """, (user_id, key, str(value), now_iso())))
         
         return jsonify({'success': True})
     except Exception as e:
@@ -705,22 +693,17 @@ def save_preferences_batch():
         return jsonify({'error': 'preferences object required'}), 400
     
     try:
-        # Local import of get_db (FIX APPLIED)
-        from app import get_db
-        db=get_db()
-        cur = db.cursor()
+        # Local import of db_write (FIX APPLIED)
+        from app import db_write
         timestamp = now_iso()
         
-        for key, value in preferences.items():
-            cur.execute("""
-                INSERT INTO user_preferences (user_id, preference_key, preference_value, updated_at)
-                VALUES (?, ?, ?, ?)
-                ON CONFLICT(user_id, preference_key) DO UPDATE SET
-                    preference_value = excluded.preference_value,
-                    updated_at = excluded.updated_at
-            """, (user_id, key, str(value), timestamp))
-        
-        db.commit()
+        db_write(lambda cur: cur.executemany("""
+            INSERT INTO user_preferences (user_id, preference_key, preference_value, updated_at)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT(user_id, preference_key) DO UPDATE SET
+                preference_value = excluded.preference_value,
+                updated_at = excluded.updated_at
+        """, [(user_id, key, str(value), timestamp) for key, value in preferences.items()]))
         
         return jsonify({'success': True, 'count': len(preferences)})
     except Exception as e:
@@ -743,10 +726,11 @@ def get_recent_terms():
         db=get_db()
         cur = db.cursor()
         cur.execute("""
-            SELECT term, subject, viewed_at 
-            FROM user_recent_terms 
-            WHERE user_id = ?
-            ORDER BY viewed_at DESC
+            SELECT t.term, r.subject, r.viewed_at 
+            FROM user_recent_terms r
+            JOIN terms_data t ON t.term_id = r.term_id
+            WHERE r.user_id = ?
+            ORDER BY r.viewed_at DESC
             LIMIT ?
         """, (user_id, limit))
         rows = cur.fetchall()
@@ -777,20 +761,17 @@ def add_recent_term():
         return jsonify({'error': 'term required'}), 400
     
     try:
-        # Local import of get_db (FIX APPLIED)
-        from app import get_db
-        db=get_db()
-        cur = db.cursor()
+        # Local import of db_write (FIX APPLIED)
+        from app import db_write
         
         # Add new recent term
-        cur.execute("""
-            INSERT INTO user_recent_terms (user_id, term, subject, viewed_at)
-            VALUES (?, ?, ?, ?)
-        """, (user_id, term, subject, now_iso()))
-        
-        
-        db.commit()
+        added = db_write(lambda cur: cur.execute("""
+            INSERT INTO user_recent_terms (user_id, term_id, subject, viewed_at)
+            SELECT ?, term_id, ?, ? FROM terms_data WHERE term = ?
+        """, (user_id, subject, now_iso(), term)).rowcount)
         
+        if not added:
+            return jsonify({'error': f'Term "{term}" not found'}), 404
         return jsonify({'success': True})
     except Exception as e:
         current_app.logger.exception("add_recent_term failed")
@@ -802,12 +783,9 @@ def clear_recent_terms():
     user_id = request.args.get('user_id', 'local')
     
     try:
-        # Local import of get_db (FIX APPLIED)
-        from app import get_db
-        db=get_db()
-        cur = db.cursor()
-        cur.execute("DELETE FROM user_recent_terms WHERE user_id = ?", (user_id,))
-        db.commit()
+        # Local import of db_write (FIX APPLIED)
+        from app import db_write
+        db_write(lambda cur: cur.execute("DELETE FROM user_recent_terms WHERE user_id = ?", (user_id,)))
         
         return jsonify({'success': True})
     except Exception as e:
@@ -825,75 +803,26 @@ def get_complete_stats():
     
     try:
         # Local import of get_db (FIX APPLIED)
-        from app import get_db
-        db=get_db()
+        from app import get_read_db, CATALOG_PATH
+        db=get_read_db()
         cur = db.cursor()
         
         stats = {}
         
-        # Total terms in database
-        cur.execute("SELECT COUNT(*) as cnt FROM terms_data")
-        stats['total_terms'] = cur.fetchone()['cnt']
-        
-        # User term metadata counts
-        cur.execute("""
-            SELECT
-                SUM(CASE WHEN favorite = 1 THEN 1 ELSE 0 END) as favorites,
-                SUM(CASE WHEN bookmark = 1 THEN 1 ELSE 0 END) as bookmarks,
-                SUM(CASE WHEN notes IS NOT NULL AND notes != '' THEN 1 ELSE 0 END) as with_notes,
-                SUM(CASE WHEN difficulty = 'easy' THEN 1 ELSE 0 END) as easy,
-                SUM(CASE WHEN difficulty = 'medium' THEN 1 ELSE 0 END) as medium,
-                SUM(CASE WHEN difficulty = 'hard' THEN 1 ELSE 0 END) as hard
-            FROM user_term_meta 
-            WHERE user_id = ?
-        """, (user_id,))
-        meta_counts = cur.fetchone()
-        stats['favorites'] = meta_counts['favorites'] or 0
-        stats['bookmarks'] = meta_counts['bookmarks'] or 0
-        stats['with_notes'] = meta_counts['with_notes'] or 0
-        stats['easy'] = meta_counts['easy'] or 0
-        stats['medium'] = meta_counts['medium'] or 0
-        stats['hard'] = meta_counts['hard'] or 0
-        
-        # Recent terms count (this session)
-        cur.execute("""
-            SELECT COUNT(*) as cnt 
-            FROM user_recent_terms 
-            WHERE user_id = ?
-        """, (user_id,))
-        stats['recent_terms'] = cur.fetchone()['cnt']
-        
-        # Collections count
-        cur.execute("""
-            SELECT COUNT(*) as cnt 
-            FROM user_collections 
-            WHERE user_id = ?
-        """, (user_id,))
-        stats['collections'] = cur.fetchone()['cnt']
+        # Total terms in database (in-memory catalog index)
+        stats['total_terms'] = len(get_catalog(CATALOG_PATH).all_terms())
         
-        # Homework count
-        cur.execute("""
-            SELECT COUNT(*) as cnt 
-            FROM homework 
-            WHERE user_id = ?
-        """, (user_id,))
-        stats['homework'] = cur.fetchone()['cnt']
-        
-        # Total views from aggregates
-        cur.execute("""
-            SELECT SUM(views) as total 
-            FROM term_view_aggregates 
-            WHERE user_id = ?
-        """, (user_id,))
-        result = cur.fetchone()
-        stats['total_views'] = result['total'] if result['total'] else 0
+        # favorites, bookmarks, with_notes, easy/medium/hard, recent_terms,
+        # collections, homework, total_views: the user's summary row
+        stats.update(read_user_stats(cur, user_id))
         
         # Most viewed terms (top 5)
         cur.execute("""
-            SELECT term_key AS term, views, last_viewed 
-            FROM term_view_aggregates 
-            WHERE user_id = ?
-            ORDER BY views DESC 
+            SELECT t.term AS term, a.views, a.last_viewed 
+            FROM term_view_aggregates a
+            JOIN terms_data t ON t.term_id = a.term_id
+            WHERE a.user_id = ?
+            ORDER BY a.views DESC 
             LIMIT 5
         """, (user_id,))
         stats['top_terms'] = [dict(row) for row in cur.fetchall()]
@@ -2,20 +2,48 @@ import os
 import sys
 import json
 import sqlite3
-from flask import Flask, send_from_directory, request, jsonify, g # ADDED 'g'
+from flask import Flask, send_from_directory, request, jsonify, g, make_response
 from datetime import datetime
 import atexit
 from activity import activity_bp
+from catalog import get_catalog, encode_cursor, decode_cursor
+from search import search_terms
+from suggest import get_suggester
+from viewtracker import get_view_tracker, stop_all_trackers
+from termcache import get_term_cache
+from codec import get_codec
+from splitdb import catalog_db_path, read_only_uri
+from migrations import migrate_database, schema_version, SCOPE_USER, ALL_SCOPES, LATEST_VERSION
+from dbpool import get_pool, close_all_pools
+from writer import get_writer, stop_all_writers
+from replica import enable_replica, get_replica, stop_all_replicas
+from maintenance import get_maintainer, stop_all_maintainers
+from metachanges import current_version
+from bitmapindex import get_bitmap_index, FACETS
+from server import serve, request_shutdown
+from httpcache import get_response_cache, serialize, strong_etag, json_response, catalog_response
 app = Flask(__name__)
 app.register_blueprint(activity_bp)
 
 # Ensure clean shutdown
 def cleanup():
     """Cleanup function to ensure all resources are released"""
-    try:
-        pass
-    except:
-        pass
+    steps = (
+        # Let a maintenance task in progress finish; start no new ones
+        stop_all_maintainers,
+        # Write out term views still sitting in the write-behind queue
+        stop_all_trackers,
+        # Commit whatever is still queued for the writer thread
+        stop_all_writers,
+        stop_all_replicas,
+        close_all_pools
+    )
+    # Every step runs even if an earlier one fails, so queued writes still commit
+    for step in steps:
+        try:
+            step()
+        except Exception as e:
+            print(f"WARNING: {step.__name__} failed during shutdown: {e}")
 
 atexit.register(cleanup)
 
@@ -26,171 +54,84 @@ else:
     BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 
 DB_PATH = os.path.join(BASE_DIR, 'prism.sqlite')
-
-# --- NEW RAW CONNECTION HELPER (Used by init_db only) ---
-def _get_raw_db_conn(row_factory=None):
-    """Creates a direct SQLite connection (non-Flask context aware)."""
-    if not os.path.exists(DB_PATH):
-        print(f"ERROR: Database not found at {DB_PATH}")
-        return None
-    conn = sqlite3.connect(DB_PATH)
-    if row_factory:
-        conn.row_factory = row_factory
-    return conn
+# Read-only catalog (terms_data and friends): catalog.sqlite once split, else prism.sqlite itself
+CATALOG_PATH = catalog_db_path(DB_PATH)
 
 # --- MODIFIED: FLASK CONTEXT AWARE GETTER ---
 def get_db():
-    """Gets the request-local database connection, creating it if necessary."""
+    """Gets the request-local database connection, checking one out of the pool if necessary."""
     if 'db' not in g:
-        # Connect and set row_factory for column name access
-        g.db = _get_raw_db_conn(sqlite3.Row)
+        # Pooled connections come configured (WAL, pragmas) with row_factory = sqlite3.Row
+        try:
+            g.db = get_pool(DB_PATH, CATALOG_PATH).acquire()
+        except sqlite3.OperationalError as e:
+            print(f"ERROR: Could not open database at {DB_PATH}: {e}")
+            return None
         
     return g.db
 
+def get_read_db():
+    """
+    Connection for read-only endpoints that can tolerate data a moment old:
+    the in-memory user-state replica when running with --replica, else get_db().
+    """
+    replica = get_replica(DB_PATH)
+    if replica is None:
+        return get_db()
+    try:
+        return replica.connection()
+    except sqlite3.Error as e:
+        print(f"WARNING: Replica unavailable, reading from disk: {e}")
+        return get_db()
+
+def db_write(fn, *args):
+    """
+    Runs fn(cursor, *args) on the single writer thread, batched with other
+    pending writes into one transaction, and returns its result once committed.
+    """
+    return get_writer(DB_PATH).write(fn, *args)
+
 def init_db():
-    """Initialize new tables for enhanced features"""
-    # Use the raw connection function here as it's outside a request context
-    db = _get_raw_db_conn() 
-    if not db:
+    """Brings the database schema up to date (see migrations.py)"""
+    if not os.path.exists(DB_PATH):
+        print(f"ERROR: Database not found at {DB_PATH}")
         return
     
-    cursor = db.cursor()
-    
-    # User term metadata table
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS user_term_meta (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            term TEXT NOT NULL,
-            user_id TEXT DEFAULT 'local',
-            favorite INTEGER DEFAULT 0,
-            bookmark INTEGER DEFAULT 0,
-            difficulty TEXT DEFAULT 'unknown',
-            rating INTEGER DEFAULT 0,
-            read_status TEXT DEFAULT 'to-read',
-            personal_tags TEXT DEFAULT '',
-            notes TEXT DEFAULT '',
-            last_viewed TIMESTAMP,
-            important_level TEXT DEFAULT 'none',
-            UNIQUE(term, user_id)
-        )
-    """)
-    
-    # Schema migration for important_level
+    split = CATALOG_PATH != DB_PATH
     try:
-        cursor.execute("PRAGMA table_info(user_term_meta)")
-        columns = [col[1] for col in cursor.fetchall()]
-        if 'important_level' not in columns:
-            cursor.execute("ALTER TABLE user_term_meta ADD COLUMN important_level TEXT DEFAULT 'none'")
-            db.commit()
-    except sqlite3.Error:
-        pass
-    
-    # Saved tests table
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS saved_tests (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT,
-            description TEXT,
-            creator TEXT,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            config_json TEXT
-        )
-    """)
-    
-    # Test questions table
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS test_questions (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            test_id INTEGER,
-            term TEXT,
-            question_json TEXT,
-            seq INTEGER,
-            FOREIGN KEY(test_id) REFERENCES saved_tests(id)
-        )
-    """)
-    
-    # Test attempts table
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS test_attempts (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            test_id INTEGER,
-            user_id TEXT,
-            started_at TIMESTAMP,
-            finished_at TIMESTAMP,
-            answers_json TEXT,
-            score REAL,
-            status TEXT DEFAULT 'in-progress',
-            FOREIGN KEY(test_id) REFERENCES saved_tests(id)
-        )
-    """)
-    
-    # User collections table (for custom lists) - matching actual schema
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS user_collections (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id TEXT DEFAULT 'local',
-            title TEXT,
-            description TEXT,
-            term_keys TEXT,
-            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    """)
-    
-    # Collection terms table (many-to-many relationship) - matching actual schema
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS collection_terms (
-            collection_id INTEGER,
-            term TEXT NOT NULL,
-            FOREIGN KEY(collection_id) REFERENCES user_collections(id) ON DELETE CASCADE,
-            UNIQUE(collection_id, term)
-        )
-    """)
-    
-    # --- Schema Migration for 'user_collections' ---
-    try:
-        # Check if 'created_at' column exists in 'user_collections'
-        cursor.execute("PRAGMA table_info(user_collections)")
-        columns = [col[1] for col in cursor.fetchall()]
-        
-        if 'created_at' not in columns:
-            # Add the missing column
-            cursor.execute("""
-                ALTER TABLE user_collections
-                ADD COLUMN created_at TIMESTAMP DEFAULT (STRFTIME('%Y-%m-%dT%H:%M:%f', 'now'));
-            """)
-            print("INFO: Added missing 'created_at' column to user_collections table.")
-            db.commit()
+        # A split-off catalog.sqlite is read-only here; only user-state steps run
+        migrate_database(DB_PATH, (SCOPE_USER,) if split else ALL_SCOPES)
     except sqlite3.Error as e:
-        # This catches errors if the user_collections table itself is missing for some reason
-        print(f"WARNING: Could not check/alter user_collections table: {e}")
-        pass
-    
-    # --- End of Schema Migration ---
-    
-    # User preferences table for app settings
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS user_preferences (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id TEXT DEFAULT 'local',
-            preference_key TEXT NOT NULL,
-            preference_value TEXT,
-            UNIQUE(user_id, preference_key)
-        )
-    """)
+        print(f"WARNING: Database migration failed: {e}")
     
-    db.commit()
-    db.close()
+    if split:
+        try:
+            catalog = sqlite3.connect(read_only_uri(CATALOG_PATH), uri=True)
+            try:
+                if schema_version(catalog) < LATEST_VERSION:
+                    print(f"WARNING: {CATALOG_PATH} needs migrating; stop the app and run migdb.py")
+            finally:
+                catalog.close()
+        except sqlite3.Error as e:
+            print(f"WARNING: Could not check catalog schema version: {e}")
 
 # Initialize database on startup
 init_db()
 
+# Build the in-memory catalog index once so the first page load is served from memory
+if os.path.exists(CATALOG_PATH):
+    try:
+        get_catalog(CATALOG_PATH).refresh()
+    except sqlite3.Error as e:
+        print(f"WARNING: Could not build catalog index: {e}")
+
 # --- NEW: Teardown function to close DB after each request ---
 def close_db(e=None):
-    """Closes the database connection at the end of the request."""
+    """Returns the request's database connection to the pool."""
     db = g.pop('db', None)
 
     if db is not None:
-        db.close()
+        get_pool(DB_PATH).release(db)
 
 app.teardown_appcontext(close_db)
 # -----------------------------------------------------------
@@ -204,22 +145,90 @@ def index():
 def serve_static(filename):
     return send_from_directory('web', filename)
 
+# Fields a term listing can be projected to (API name -> terms_data column)
+LISTING_FIELDS = {
+    'term': 'term',
+    'subject': 'subject',
+    'definition': 'definition',
+    'keyPoints': 'keyPoints_str',
+    'example': 'example'
+}
+PAGING_ARGS = ('limit', 'after', 'fields', 'prefix')
+
+def parse_key_points(value):
+    """Splits the '||'-separated keyPoints_str column into a list"""
+    return [p.strip() for p in value.split('||') if p.strip()] if value else []
+
+def paged_term_listing(subject=None):
+    """
+    Keyset-paginated term listing.
+    Query: limit (default 100, max 500), after (cursor from the previous
+    page's 'next'), fields (comma list of LISTING_FIELDS), prefix.
+    Returns { items: [...], next: cursor or null }
+    """
+    fields = [f.strip() for f in request.args.get('fields', 'term,subject').split(',') if f.strip()]
+    unknown = [f for f in fields if f not in LISTING_FIELDS]
+    if unknown or not fields:
+        return jsonify({'error': f'Unknown fields: {", ".join(unknown)}' if unknown else 'fields required'}), 400
+    try:
+        limit = max(1, min(int(request.args.get('limit', 100)), 500))
+        after = decode_cursor(request.args['after']) if request.args.get('after') else None
+    except ValueError as e:
+        return jsonify({'error': f'Invalid paging parameters: {e}'}), 400
+    
+    # term/subject come from the in-memory index; anything else is one IN (...) lookup
+    extra = [f for f in fields if f not in ('term', 'subject')]
+    db = get_db() if extra else None
+    if extra and not db:
+        return jsonify({'error': 'Database not found'}), 500
+    
+    def build():
+        rows, next_key = get_catalog(CATALOG_PATH).page(after, limit, subject, request.args.get('prefix'))
+        
+        details = {}
+        if extra and rows:
+            columns = ', '.join(LISTING_FIELDS[f] for f in extra)
+            placeholders = ', '.join('?' * len(rows))
+            cursor = db.cursor()
+            cursor.execute(f"SELECT term, content_codec, {columns} FROM terms_data WHERE term IN ({placeholders})",
+                           [r['term'] for r in rows])
+            codec = get_codec(CATALOG_PATH)
+            details = {row[0]: [codec.decode(value, row[1]) for value in row[2:]] for row in cursor.fetchall()}
+        
+        items = []
+        for r in rows:
+            values = details.get(r['term'])
+            item = {}
+            for f in fields:
+                if f in ('term', 'subject'):
+                    item[f] = r[f]
+                else:
+                    value = values[extra.index(f)] if values else None
+                    item[f] = parse_key_points(value) if f == 'keyPoints' else (value or '')
+            items.append(item)
+        
+        return {'items': items, 'next': encode_cursor(next_key) if next_key else None}
+    
+    return catalog_response(CATALOG_PATH, request.full_path, build)
+
 @app.route('/api/terms', methods=['GET'])
 def get_all_terms():
+    """Get all terms (served from the in-memory catalog index).
+    With any of limit/after/fields/prefix the result is paginated, see paged_term_listing().
+    Catalog endpoints answer If-None-Match / If-Modified-Since, see catalog_response()."""
     try:
-        db = get_db()
-        if not db:
-            return jsonify({'error': 'Database not found'}), 500
-        
-        cursor = db.cursor()
-        cursor.execute("SELECT term, subject FROM terms_data ORDER BY subject, term")
-        rows = cursor.fetchall()
-        
-        # Removed db.close()
-        
-        # Accessing by index for compatibility, though row['term'] would also work now
-        terms = [{'term': row[0], 'subject': row[1]} for row in rows] 
-        return jsonify(terms)
+        if any(arg in request.args for arg in PAGING_ARGS):
+            return paged_term_listing()
+        return catalog_response(CATALOG_PATH, request.full_path, get_catalog(CATALOG_PATH).all_terms)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/terms/random', methods=['GET'])
+def get_random_terms():
+    """Get a random sample of terms for the discover view"""
+    try:
+        count = max(1, min(int(request.args.get('count', 6)), 100))
+        return jsonify(get_catalog(CATALOG_PATH).random_terms(count))
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -227,115 +236,165 @@ def get_all_terms():
 def get_subjects():
     """Get all unique subjects with term counts"""
     try:
-        db = get_db()
-        if not db:
-            return jsonify({'error': 'Database not found'}), 500
-        
-        cursor = db.cursor()
-        cursor.execute("""
-            SELECT subject, COUNT(*) as count 
-            FROM terms_data 
-            GROUP BY subject 
-            ORDER BY subject
-        """)
-        rows = cursor.fetchall()
-        # Removed db.close()
-        
-        subjects = [{'subject': row[0], 'count': row[1]} for row in rows]
-        return jsonify(subjects)
+        return catalog_response(CATALOG_PATH, request.full_path, get_catalog(CATALOG_PATH).subjects)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/terms/subject/<subject>', methods=['GET'])
 def get_terms_by_subject(subject):
-    """Get all terms for a specific subject"""
+    """Get all terms for a specific subject (paginated like /api/terms when asked)"""
     try:
         from urllib.parse import unquote
         subject = unquote(subject)
         
+        if any(arg in request.args for arg in PAGING_ARGS):
+            return paged_term_listing(subject)
+        return catalog_response(CATALOG_PATH, request.full_path,
+                                lambda: get_catalog(CATALOG_PATH).terms_for_subject(subject))
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/search/query', methods=['GET'])
+def search_query():
+    """Full-text search over the catalog, ranked by user metadata and bm25"""
+    try:
+        query = request.args.get('q', '').strip()
+        user_id = request.args.get('user_id', 'local')
+        limit = max(1, min(int(request.args.get('limit', 50)), 200))
+        
         db = get_db()
         if not db:
             return jsonify({'error': 'Database not found'}), 500
         
-        cursor = db.cursor()
-        cursor.execute("""
-            SELECT term, subject 
-            FROM terms_data 
-            WHERE subject = ? 
-            ORDER BY term
-        """, (subject,))
-        rows = cursor.fetchall()
-        # Removed db.close()
+        results = search_terms(db.cursor(), query, user_id, limit)
+        return jsonify(results)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/suggest', methods=['GET'])
+def suggest_terms():
+    """Prefix completions for the search box, ranked by the user's view counts"""
+    try:
+        query = request.args.get('q', '')
+        subject = request.args.get('subject') or None
+        user_id = request.args.get('user_id', 'local')
+        limit = max(1, min(int(request.args.get('limit', 10)), 50))
         
-        terms = [{'term': row[0], 'subject': row[1]} for row in rows]
-        return jsonify(terms)
+        return jsonify(get_suggester(DB_PATH, CATALOG_PATH).suggest(query, limit, subject, user_id))
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+# Content sections of a term: API name -> (terms_data column, decoder)
+TERM_SECTIONS = {
+    'definition': ('definition', lambda value: value or ''),
+    'keyPoints': ('keyPoints_str', parse_key_points),
+    'example': ('example', lambda value: value or ''),
+    'objective_qa': ('objective_qa_json', lambda value: json.loads(value or '[]')),
+    'descriptive_qa': ('descriptive_qa_json', lambda value: json.loads(value or '[]')),
+    'quiz_data': ('quiz_data_json', lambda value: json.loads(value or '[]'))
+}
+
+def load_term_content(cursor, term_name, sections=None):
+    """
+    Decoded catalog content of a term (no user metadata), or None if the
+    term does not exist. Only the requested `sections` (default: all) are
+    read and decoded; term and subject are always present. Served from the
+    term cache when possible; the returned dict is shared, so callers must
+    not modify it.
+    """
+    if sections is None:
+        sections = list(TERM_SECTIONS)
+    cache = get_term_cache(CATALOG_PATH)
+    generation = get_catalog(CATALOG_PATH).current_generation()
+    record = cache.get(term_name, generation)
+    missing = [s for s in sections if record is None or s not in record]
+    if not missing:
+        return record
+    
+    columns = ''.join(f', {TERM_SECTIONS[s][0]}' for s in missing)
+    cursor.execute(f"SELECT term, subject, content_codec{columns} FROM terms_data WHERE term = ?", (term_name,))
+    row = cursor.fetchone()
+    if not row:
+        return None
+    
+    codec = get_codec(CATALOG_PATH)
+    fields = {'term': row[0], 'subject': row[1]}
+    size = 0
+    for section, value in zip(missing, row[3:]):
+        text = codec.decode(value, row[2])
+        fields[section] = TERM_SECTIONS[section][1](text)
+        # Sized by the decoded text the record is built from, not the (possibly
+        # compressed) bytes read from disk
+        if text:
+            size += len(text.encode('utf-8'))
+    return cache.merge(term_name, fields, size, generation)
+
 @app.route('/api/term/<path:term_name>', methods=['GET'])
 def get_term_data(term_name):
+    """
+    Get a term with its user metadata.
+    ?fields=definition,keyPoints,meta,... limits the response (and what is
+    read from the database) to those sections; see TERM_SECTIONS.
+    Carries a strong ETag; a matching If-None-Match gets an empty 304.
+    Without meta the response only changes with the catalog.
+    """
     try:
         from urllib.parse import unquote
         term_name = unquote(term_name)
         
+        sections = None
+        include_meta = True
+        if request.args.get('fields'):
+            fields = [f.strip() for f in request.args['fields'].split(',') if f.strip()]
+            unknown = [f for f in fields if f not in TERM_SECTIONS and f not in ('term', 'subject', 'meta')]
+            if unknown:
+                return jsonify({'error': f'Unknown fields: {", ".join(unknown)}'}), 400
+            sections = [f for f in fields if f in TERM_SECTIONS]
+            include_meta = 'meta' in fields
+        
         db = get_db()
         if not db:
             return jsonify({'error': 'Database not found'}), 500
         
+        # The catalog part of the response is serialized once per catalog version
         cursor = db.cursor()
-        cursor.execute("""
-            SELECT term, subject, definition, keyPoints_str, example, 
-                    objective_qa_json, descriptive_qa_json, quiz_data_json
-            FROM terms_data WHERE term = ?
-        """, (term_name,))
-        
-        row = cursor.fetchone()
-        
-        if not row:
-            # Removed db.close()
-            return jsonify({'error': f'Term "{term_name}" not found in database'}), 404
+        responses = get_response_cache(CATALOG_PATH)
+        generation = get_catalog(CATALOG_PATH).current_generation()
+        key = (term_name, tuple(sections) if sections is not None else None)
+        cached = responses.get(key, generation)
+        if cached is None:
+            content = load_term_content(cursor, term_name, sections)
+            
+            if not content:
+                # Removed db.close()
+                return jsonify({'error': f'Term "{term_name}" not found in database'}), 404
+            
+            if sections is None:
+                data = content
+            else:
+                data = {'term': content['term'], 'subject': content['subject']}
+                data.update((s, content[s]) for s in sections)
+            cached = responses.put(key, serialize(data), generation)
+        body, etag = cached
         
         # Get metadata
-        cursor.execute("""
-            SELECT favorite, bookmark, difficulty, rating, read_status, 
-                    personal_tags, notes, last_viewed
-            FROM user_term_meta 
-            WHERE term = ? AND user_id = 'local'
-        """, (term_name,))
-        meta_row = cursor.fetchone()
-        
-        # Update last viewed
-        cursor.execute("""
-            INSERT OR REPLACE INTO user_term_meta 
-            (term, user_id, favorite, bookmark, difficulty, rating, read_status, 
-             personal_tags, notes, last_viewed)
-            VALUES (?, 'local', ?, ?, ?, ?, ?, ?, ?, ?)
-        """, (
-            term_name,
-            meta_row[0] if meta_row else 0,
-            meta_row[1] if meta_row else 0,
-            meta_row[2] if meta_row else 'unknown',
-            meta_row[3] if meta_row else 0,
-            meta_row[4] if meta_row else 'to-read',
-            meta_row[5] if meta_row else '',
-            meta_row[6] if meta_row else '',
-            datetime.now().isoformat()
-        ))
-        db.commit()
-        # Removed db.close()
-        
-        keyPoints = [p.strip() for p in row[3].split('||') if p.strip()] if row[3] else []
-        
-        data = {
-            'term': row[0],
-            'subject': row[1],
-            'definition': row[2] or '',
-            'keyPoints': keyPoints,
-            'example': row[4] or '',
-            'objective_qa': json.loads(row[5] or '[]'),
-            'descriptive_qa': json.loads(row[6] or '[]'),
-            'quiz_data': json.loads(row[7] or '[]'),
-            'meta': {
+        meta_row = None
+        if include_meta:
+            cursor.execute("""
+                SELECT favorite, bookmark, difficulty, rating, read_status, 
+                        personal_tags, notes, last_viewed
+                FROM user_term_meta 
+                WHERE term_id = (SELECT term_id FROM terms_data WHERE term = ?) AND user_id = 'local'
+            """, (term_name,))
+            meta_row = cursor.fetchone()
+        
+        # Update last viewed (queued; written in batches by the view tracker)
+        tracker = get_view_tracker(DB_PATH)
+        last_viewed = tracker.pending_view('local', term_name) or (meta_row[7] if meta_row else None)
+        tracker.record('local', term_name)
+        
+        if include_meta:
+            meta = serialize({
                 'favorite': meta_row[0] if meta_row else 0,
                 'bookmark': meta_row[1] if meta_row else 0,
                 'difficulty': meta_row[2] if meta_row else 'unknown',
@@ -343,15 +402,44 @@ def get_term_data(term_name):
                 'read_status': meta_row[4] if meta_row else 'to-read',
                 'personal_tags': meta_row[5] if meta_row else '',
                 'notes': meta_row[6] if meta_row else '',
-                'last_viewed': meta_row[7] if meta_row else None
-            }
-        }
+                'last_viewed': last_viewed
+            })
+            # Splice the per-user part into the cached catalog JSON object
+            body = body[:-1] + b',"meta":' + meta + b'}'
+            etag = strong_etag(etag.encode('ascii'), meta)
         
-        return jsonify(data)
+        return json_response(body, etag)
     except Exception as e:
         print(f"Error fetching term '{term_name}': {str(e)}")
         return jsonify({'error': f'Database error: {str(e)}'}), 500
 
+@app.route('/api/term/<path:term_name>/objective', methods=['GET'], defaults={'section': 'objective_qa'})
+@app.route('/api/term/<path:term_name>/descriptive', methods=['GET'], defaults={'section': 'descriptive_qa'})
+@app.route('/api/term/<path:term_name>/quiz', methods=['GET'], defaults={'section': 'quiz_data'})
+def get_term_section(term_name, section):
+    """Get one question section of a term (loaded lazily when its tab opens)"""
+    try:
+        from urllib.parse import unquote
+        term_name = unquote(term_name)
+        
+        db = get_db()
+        if not db:
+            return jsonify({'error': 'Database not found'}), 500
+        
+        responses = get_response_cache(CATALOG_PATH)
+        generation = get_catalog(CATALOG_PATH).current_generation()
+        key = (term_name, section)
+        cached = responses.get(key, generation)
+        if cached is None:
+            content = load_term_content(db.cursor(), term_name, [section])
+            if not content:
+                return jsonify({'error': f'Term "{term_name}" not found in database'}), 404
+            cached = responses.put(key, serialize(content[section]), generation)
+        
+        return json_response(*cached)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/api/term/meta', methods=['POST'])
 def save_term_meta():
     """Save or update term metadata"""
@@ -360,46 +448,178 @@ def save_term_meta():
         term = data.get('term')
         user_id = data.get('user_id', 'local')
         
-        db = get_db()
-        if not db:
-            return jsonify({'error': 'Database not found'}), 500
-        
-        cursor = db.cursor()
-        
-        # Get existing meta
-        cursor.execute("""
-            SELECT favorite, bookmark, difficulty, rating, read_status, 
-                    personal_tags, notes, important_level
-            FROM user_term_meta 
-            WHERE term = ? AND user_id = ?
-        """, (term, user_id))
-        existing = cursor.fetchone()
-        
-        # Merge with new data
-        favorite = data.get('favorite', existing[0] if existing else 0)
-        bookmark = data.get('bookmark', existing[1] if existing else 0)
-        difficulty = data.get('difficulty', existing[2] if existing else 'unknown')
-        rating = data.get('rating', existing[3] if existing else 0)
-        read_status = data.get('read_status', existing[4] if existing else 'to-read')
-        personal_tags = data.get('personal_tags', existing[5] if existing else '')
-        notes = data.get('notes', existing[6] if existing else '')
-        important_level = data.get('important_level', existing[7] if existing else 'none')
-        
-        cursor.execute("""
-            INSERT OR REPLACE INTO user_term_meta 
-            (term, user_id, favorite, bookmark, difficulty, rating, read_status, 
-             personal_tags, notes, important_level, last_viewed)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """, (term, user_id, favorite, bookmark, difficulty, rating, read_status,
-              personal_tags, notes, important_level, datetime.now().isoformat()))
-        
-        db.commit()
-        # Removed db.close()
+        def merge_meta(cursor):
+            """False if the term is not in the catalog."""
+            cursor.execute("SELECT term_id FROM terms_data WHERE term = ?", (term,))
+            row = cursor.fetchone()
+            if row is None:
+                return False
+            term_id = row[0]
+            
+            # Read and write in the same transaction so concurrent updates merge
+            cursor.execute("""
+                SELECT favorite, bookmark, difficulty, rating, read_status, 
+                        personal_tags, notes, important_level
+                FROM user_term_meta 
+                WHERE term_id = ? AND user_id = ?
+            """, (term_id, user_id))
+            existing = cursor.fetchone()
+            
+            # Merge with new data
+            favorite = data.get('favorite', existing[0] if existing else 0)
+            bookmark = data.get('bookmark', existing[1] if existing else 0)
+            difficulty = data.get('difficulty', existing[2] if existing else 'unknown')
+            rating = data.get('rating', existing[3] if existing else 0)
+            read_status = data.get('read_status', existing[4] if existing else 'to-read')
+            personal_tags = data.get('personal_tags', existing[5] if existing else '')
+            notes = data.get('notes', existing[6] if existing else '')
+            important_level = data.get('important_level', existing[7] if existing else 'none')
+            
+            # An upsert, not INSERT OR REPLACE: the counter triggers see it as an UPDATE
+            cursor.execute("""
+                INSERT INTO user_term_meta 
+                (term_id, user_id, favorite, bookmark, difficulty, rating, read_status, 
+                 personal_tags, notes, important_level, last_viewed)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(term_id, user_id) DO UPDATE SET
+                    favorite = excluded.favorite,
+                    bookmark = excluded.bookmark,
+                    difficulty = excluded.difficulty,
+                    rating = excluded.rating,
+                    read_status = excluded.read_status,
+                    personal_tags = excluded.personal_tags,
+                    notes = excluded.notes,
+                    important_level = excluded.important_level,
+                    last_viewed = excluded.last_viewed
+            """, (term_id, user_id, favorite, bookmark, difficulty, rating, read_status,
+                  personal_tags, notes, important_level, datetime.now().isoformat()))
+            return True
+        
+        if not db_write(merge_meta):
+            return jsonify({'error': f'Term "{term}" not found in database'}), 404
         
         return jsonify({'success': True})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+# Fields /api/term/meta/bulk may set, and the most terms one request may touch
+BULK_META_FIELDS = ('favorite', 'bookmark', 'difficulty', 'rating', 'read_status',
+                    'personal_tags', 'notes', 'important_level')
+BULK_LIMIT = 5000
+# Bound parameters per IN (...) lookup
+IN_CHUNK = 500
+
+def _chunks(values, size=IN_CHUNK):
+    for i in range(0, len(values), size):
+        yield values[i:i + size]
+
+@app.route('/api/term/meta/bulk', methods=['POST'])
+def bulk_update_term_meta():
+    """
+    Set the same metadata fields on many terms in one transaction
+    Body: { set: {field: value, ...}, user_id?, terms: [name, ...] }
+       or { set, user_id?, select: {subject?, collection_id?, where?} }
+    select parts must all hold; where is an /api/query expression. Fields left
+    out of `set` keep their value (or the column default for a new row).
+    Returns { inserted, updated, not_found, results: [{term, status}] }
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        user_id = data.get('user_id', 'local')
+        patch = data.get('set')
+        terms = data.get('terms')
+        select = data.get('select')
+        
+        if not isinstance(patch, dict) or not patch:
+            return jsonify({'error': 'set must be an object of fields to change'}), 400
+        unknown = [field for field in patch if field not in BULK_META_FIELDS]
+        if unknown:
+            return jsonify({'error': f'Unknown fields: {", ".join(unknown)}'}), 400
+        if (terms is None) == (select is None):
+            return jsonify({'error': 'Give either terms or select'}), 400
+        if terms is not None:
+            if not isinstance(terms, list) or not all(isinstance(t, str) for t in terms):
+                return jsonify({'error': 'terms must be a list of term names'}), 400
+            # Each term once, in request order
+            terms = list(dict.fromkeys(terms))
+        elif not isinstance(select, dict) or not select or set(select) - {'subject', 'collection_id', 'where'}:
+            return jsonify({'error': 'select takes subject, collection_id and/or where'}), 400
+        
+        # Filter expressions run on the bitmap index, before the write
+        matching = None
+        if select and 'where' in select:
+            matching = set(get_bitmap_index(DB_PATH, CATALOG_PATH).term_ids(user_id, select['where']))
+        
+        # Only the patched columns are written; the rest keep their value
+        column_list = ', '.join(patch)
+        value_placeholders = ', '.join('?' * len(patch))
+        assignments = ', '.join(f'{column} = excluded.{column}' for column in patch)
+        values = [int(v) if isinstance(v, bool) else v for v in patch.values()]
+        
+        def apply(cursor):
+            """[(term, term_id or None)] in result order, after the upsert."""
+            if terms is not None:
+                found = {}
+                for chunk in _chunks(terms):
+                    placeholders = ', '.join('?' * len(chunk))
+                    cursor.execute(f"SELECT term, term_id FROM terms_data WHERE term IN ({placeholders})", chunk)
+                    found.update(cursor.fetchall())
+                targets = [(term, found.get(term)) for term in terms]
+            else:
+                ids = matching
+                if 'subject' in select:
+                    cursor.execute("SELECT term_id FROM terms_data WHERE subject = ?", (select['subject'],))
+                    subject_ids = {row[0] for row in cursor.fetchall()}
+                    ids = subject_ids if ids is None else ids & subject_ids
+                if 'collection_id' in select:
+                    cursor.execute("""
+                        SELECT c.term_id FROM collection_terms c
+                        JOIN user_collections u ON u.id = c.collection_id
+                        WHERE c.collection_id = ? AND u.user_id = ?
+                    """, (select['collection_id'], user_id))
+                    collection_ids = {row[0] for row in cursor.fetchall()}
+                    ids = collection_ids if ids is None else ids & collection_ids
+                targets = []
+                for chunk in _chunks(sorted(ids)):
+                    placeholders = ', '.join('?' * len(chunk))
+                    cursor.execute(f"SELECT term, term_id FROM terms_data WHERE term_id IN ({placeholders})", chunk)
+                    targets.extend((term, term_id) for term, term_id in cursor.fetchall())
+                targets.sort()
+            
+            if len(targets) > BULK_LIMIT:
+                raise ValueError(f'{len(targets)} terms selected; at most {BULK_LIMIT} per request')
+            ids = [term_id for _, term_id in targets if term_id is not None]
+            
+            existing = set()
+            for chunk in _chunks(ids):
+                placeholders = ', '.join('?' * len(chunk))
+                cursor.execute(f"""
+                    SELECT term_id FROM user_term_meta
+                    WHERE user_id = ? AND term_id IN ({placeholders})
+                """, [user_id] + chunk)
+                existing.update(row[0] for row in cursor.fetchall())
+            
+            cursor.executemany(f"""
+                INSERT INTO user_term_meta (term_id, user_id, {column_list})
+                VALUES (?, ?, {value_placeholders})
+                ON CONFLICT(term_id, user_id) DO UPDATE SET {assignments}
+            """, [(term_id, user_id, *values) for term_id in ids])
+            return [(term, None if term_id is None else term_id in existing) for term, term_id in targets]
+        
+        outcomes = db_write(apply)
+        results = [{'term': term, 'status': 'not_found' if existed is None else 'updated' if existed else 'inserted'}
+                   for term, existed in outcomes]
+        return jsonify({
+            'inserted': sum(1 for r in results if r['status'] == 'inserted'),
+            'updated': sum(1 for r in results if r['status'] == 'updated'),
+            'not_found': sum(1 for r in results if r['status'] == 'not_found'),
+            'results': results
+        })
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/api/term/meta/<path:term>', methods=['GET'])
 def get_term_meta(term):
     """Get term metadata"""
@@ -417,11 +637,13 @@ def get_term_meta(term):
             SELECT favorite, bookmark, difficulty, rating, read_status, 
                     personal_tags, notes, last_viewed, important_level
             FROM user_term_meta 
-            WHERE term = ? AND user_id = ?
+            WHERE term_id = (SELECT term_id FROM terms_data WHERE term = ?) AND user_id = ?
         """, (term, user_id))
         
         row = cursor.fetchone()
         # Removed db.close()
+        # A view may still be queued in the write-behind tracker
+        last_viewed = get_view_tracker(DB_PATH).pending_view(user_id, term) or (row[7] if row else None)
         
         if row:
             return jsonify({
@@ -432,7 +654,7 @@ def get_term_meta(term):
                 'read_status': row[4],
                 'personal_tags': row[5],
                 'notes': row[6],
-                'last_viewed': row[7],
+                'last_viewed': last_viewed,
                 'important_level': row[8]
             })
         else:
@@ -444,7 +666,7 @@ def get_term_meta(term):
                 'read_status': 'to-read',
                 'personal_tags': '',
                 'notes': '',
-                'last_viewed': None,
+                'last_viewed': last_viewed,
                 'important_level': 'none'
             })
     except Exception as e:
@@ -456,20 +678,15 @@ def create_test():
     try:
         data = request.json
         
-        db = get_db()
-        if not db:
-            return jsonify({'error': 'Database not found'}), 500
-        
-        cursor = db.cursor()
-        cursor.execute("""
-            INSERT INTO saved_tests (name, description, creator, config_json)
-            VALUES (?, ?, ?, ?)
-        """, (data['name'], data.get('description', ''), 
-              data.get('creator', 'local'), json.dumps(data['config'])))
+        def insert_test(cursor):
+            cursor.execute("""
+                INSERT INTO saved_tests (name, description, creator, config_json)
+                VALUES (?, ?, ?, ?)
+            """, (data['name'], data.get('description', ''), 
+                  data.get('creator', 'local'), json.dumps(data['config'])))
+            return cursor.lastrowid
         
-        test_id = cursor.lastrowid
-        db.commit()
-        # Removed db.close()
+        test_id = db_write(insert_test)
         
         return jsonify({'success': True, 'test_id': test_id})
     except Exception as e:
@@ -490,7 +707,7 @@ def generate_test_questions(test_id):
         cursor = db.cursor()
         
         # Build query based on filters
-        query = "SELECT term, subject FROM terms_data WHERE 1=1"
+        query = "SELECT term_id, term, subject FROM terms_data WHERE 1=1"
         params = []
         
         if filters.get('subject'):
@@ -500,9 +717,9 @@ def generate_test_questions(test_id):
         if filters.get('difficulty'):
             # Join with metadata for difficulty filter
             query = """
-                SELECT t.term, t.subject 
+                SELECT t.term_id, t.term, t.subject 
                 FROM terms_data t
-                LEFT JOIN user_term_meta m ON t.term = m.term
+                LEFT JOIN user_term_meta m ON m.term_id = t.term_id
                 WHERE 1=1
             """
             if filters.get('subject'):
@@ -516,21 +733,24 @@ def generate_test_questions(test_id):
         available_terms = cursor.fetchall()
         
         # Generate questions for each section
+        codec = get_codec(CATALOG_PATH)
+        questions = []
         seq = 0
         for section in sections:
             section_type = section['type']
             count = section['count']
             
             for i in range(min(count, len(available_terms))):
-                term, subject = available_terms[i]
+                term_id, term, subject = available_terms[i]
                 
                 # Get term data
                 cursor.execute("""
                     SELECT objective_qa_json, descriptive_qa_json, quiz_data_json,
-                            definition, keyPoints_str, example
-                    FROM terms_data WHERE term = ?
-                """, (term,))
-                term_data = cursor.fetchone()
+                            definition, keyPoints_str, example, content_codec
+                    FROM terms_data WHERE term_id = ?
+                """, (term_id,))
+                row = cursor.fetchone()
+                term_data = [codec.decode(value, row[6]) for value in row[:6]]
                 
                 question = None
                 if section_type == 'objective' and term_data[0]:
@@ -562,14 +782,17 @@ def generate_test_questions(test_id):
                     }
                 
                 if question:
-                    cursor.execute("""
-                        INSERT INTO test_questions (test_id, term, question_json, seq)
-                        VALUES (?, ?, ?, ?)
-                    """, (test_id, term, json.dumps(question), seq))
+                    questions.append((test_id, term_id, json.dumps(question), seq))
                     seq += 1
         
-        db.commit()
-        # Removed db.close()
+        def insert_questions(cursor):
+            cursor.executemany("""
+                INSERT INTO test_questions (test_id, term_id, question_json, seq)
+                VALUES (?, ?, ?, ?)
+            """, questions)
+        
+        if questions:
+            db_write(insert_questions)
         
         return jsonify({'success': True, 'questions_generated': seq})
     except Exception as e:
@@ -605,120 +828,46 @@ def get_tests():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/stats/overview', methods=['GET'])
-def get_stats_overview():
-    """Get overview statistics"""
-    try:
-        db = get_db()
-        if not db:
-            return jsonify({'error': 'Database not found'}), 500
-        
-        cursor = db.cursor()
-        
-        # Total terms
-        cursor.execute("SELECT COUNT(*) FROM terms_data")
-        total_terms = cursor.fetchone()[0]
-        
-        # Favorite terms
-        cursor.execute("SELECT COUNT(*) FROM user_term_meta WHERE favorite = 1")
-        favorite_count = cursor.fetchone()[0]
-        
-        # Bookmarked terms
-        cursor.execute("SELECT COUNT(*) FROM user_term_meta WHERE bookmark = 1")
-        bookmark_count = cursor.fetchone()[0]
-        
-        # Recently viewed
-        cursor.execute("""
-            SELECT COUNT(*) FROM user_term_meta 
-            WHERE last_viewed IS NOT NULL 
-            AND datetime(last_viewed) > datetime('now', '-7 days')
-        """)
-        recent_count = cursor.fetchone()[0]
-        
-        # Tests created
-        cursor.execute("SELECT COUNT(*) FROM saved_tests")
-        tests_count = cursor.fetchone()[0]
-        
-        # Removed db.close()
-        
-        return jsonify({
-            'total_terms': total_terms,
-            'favorites': favorite_count,
-            'bookmarks': bookmark_count,
-            'recent_views': recent_count,
-            'tests_created': tests_count
-        })
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
+# /api/meta/counts keys: response key -> (dimension, value) in user_meta_counters
+META_COUNTS = {
+    'with_notes': ('notes', 'with'),
+    'hard': ('difficulty', 'hard'),
+    'easy': ('difficulty', 'easy'),
+    'medium': ('difficulty', 'medium'),
+    'rating_5': ('rating', '5'),
+    'rating_4': ('rating', '4'),
+    'rating_3': ('rating', '3'),
+    'rating_2': ('rating', '2'),
+    'rating_1': ('rating', '1'),
+    'important_critical': ('important_level', 'critical'),
+    'important_high': ('important_level', 'high'),
+    'important_medium': ('important_level', 'medium'),
+    'important_low': ('important_level', 'low')
+}
 
 @app.route('/api/meta/counts', methods=['GET'])
 def get_meta_counts():
-    """Get metadata counts including ratings"""
+    """Get metadata counts including ratings (one user with ?user_id=, else all users)"""
     try:
-        db = get_db()
+        db = get_read_db()
         if not db:
             return jsonify({'error': 'Database not found'}), 500
         
         cursor = db.cursor()
+        user_id = request.args.get('user_id')
         
-        # Terms with notes
-        cursor.execute("SELECT COUNT(*) FROM user_term_meta WHERE notes != ''")
-        notes_count = cursor.fetchone()[0]
-        
-        # Difficulty counts
-        cursor.execute("SELECT COUNT(*) FROM user_term_meta WHERE difficulty = 'hard'")
-        hard_count = cursor.fetchone()[0]
-        
-        cursor.execute("SELECT COUNT(*) FROM user_term_meta WHERE difficulty = 'easy'")
-        easy_count = cursor.fetchone()[0]
-        
-        cursor.execute("SELECT COUNT(*) FROM user_term_meta WHERE difficulty = 'medium'")
-        medium_count = cursor.fetchone()[0]
-        
-        # Rating counts
-        cursor.execute("SELECT COUNT(*) FROM user_term_meta WHERE rating = 5")
-        rating_5 = cursor.fetchone()[0]
-        
-        cursor.execute("SELECT COUNT(*) FROM user_term_meta WHERE rating = 4")
-        rating_4 = cursor.fetchone()[0]
-        
-        cursor.execute("SELECT COUNT(*) FROM user_term_meta WHERE rating = 3")
-        rating_3 = cursor.fetchone()[0]
-        
-        cursor.execute("SELECT COUNT(*) FROM user_term_meta WHERE rating = 2")
-        rating_2 = cursor.fetchone()[0]
-        
-        cursor.execute("SELECT COUNT(*) FROM user_term_meta WHERE rating = 1")
-        rating_1 = cursor.fetchone()[0]
-        
-        # Important level counts
-        cursor.execute("SELECT COUNT(*) FROM user_term_meta WHERE important_level = 'critical'")
-        important_critical = cursor.fetchone()[0]
-        
-        cursor.execute("SELECT COUNT(*) FROM user_term_meta WHERE important_level = 'high'")
-        important_high = cursor.fetchone()[0]
-        
-        cursor.execute("SELECT COUNT(*) FROM user_term_meta WHERE important_level = 'medium'")
-        important_medium = cursor.fetchone()[0]
-        
-        cursor.execute("SELECT COUNT(*) FROM user_term_meta WHERE important_level = 'low'")
-        important_low = cursor.fetchone()[0]
+        # Maintained by triggers on user_term_meta (see metacounters.py)
+        if user_id:
+            cursor.execute("""
+                SELECT dimension, value, count FROM user_meta_counters WHERE user_id = ?
+            """, (user_id,))
+        else:
+            cursor.execute("""
+                SELECT dimension, value, SUM(count) FROM user_meta_counters GROUP BY dimension, value
+            """)
+        counters = {(dimension, value): count for dimension, value, count in cursor.fetchall()}
         
-        return jsonify({
-            'with_notes': notes_count,
-            'hard': hard_count,
-            'easy': easy_count,
-            'medium': medium_count,
-            'rating_5': rating_5,
-            'rating_4': rating_4,
-            'rating_3': rating_3,
-            'rating_2': rating_2,
-            'rating_1': rating_1,
-            'important_critical': important_critical,
-            'important_high': important_high,
-            'important_medium': important_medium,
-            'important_low': important_low
-        })
+        return jsonify({key: counters.get(counter, 0) for key, counter in META_COUNTS.items()})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -726,15 +875,16 @@ def get_meta_counts():
 def get_all_metadata():
     """Get all term metadata for priority sorting"""
     try:
-        db = get_db()
+        db = get_read_db()
         if not db:
             return jsonify({'error': 'Database not found'}), 500
         
         cursor = db.cursor()
         cursor.execute("""
-            SELECT term, favorite, bookmark, difficulty, rating, 
-                    CASE WHEN notes = '' THEN 0 ELSE 1 END as has_notes
-            FROM user_term_meta
+            SELECT t.term, m.favorite, m.bookmark, m.difficulty, m.rating, 
+                    CASE WHEN m.notes = '' THEN 0 ELSE 1 END as has_notes
+            FROM user_term_meta m
+            JOIN terms_data t ON t.term_id = m.term_id
         """)
         
         rows = cursor.fetchall()
@@ -753,12 +903,81 @@ def get_all_metadata():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/meta/changes', methods=['GET'])
+def get_metadata_changes():
+    """
+    Metadata rows changed since a version, for clients that mirror /api/meta/all
+    Query: since (the version of the previous call; 0 = every row), user_id?, limit?
+    Returns { version, changes: [{user_id, term, favorite, ...}], deleted: [{user_id, term}], more, reset }
+    Pass `version` back as since; while more is true, call again straight away.
+    reset means since is ahead of the server (restored database): refetch from 0.
+    """
+    try:
+        since = int(request.args.get('since', 0))
+        limit = max(1, min(int(request.args.get('limit', 5000)), 10000))
+        user_id = request.args.get('user_id')
+        if since < 0:
+            return jsonify({'error': 'since must be a version (0 or more)'}), 400
+
+        db = get_read_db()
+        if not db:
+            return jsonify({'error': 'Database not found'}), 500
+
+        cursor = db.cursor()
+        # Read first: entries up to it are committed, later ones wait for the next call
+        version = current_version(cursor)
+        if since > version:
+            return jsonify({'version': version, 'changes': [], 'deleted': [], 'more': False, 'reset': True})
+
+        query = """
+            SELECT c.version, c.user_id, c.deleted, t.term, m.favorite, m.bookmark, m.difficulty, m.rating,
+                   CASE WHEN m.notes = '' THEN 0 ELSE 1 END as has_notes
+            FROM user_meta_changes c
+            LEFT JOIN user_term_meta m ON m.term_id = c.term_id AND m.user_id = c.user_id
+            LEFT JOIN terms_data t ON t.term_id = c.term_id
+            WHERE c.version > ? AND c.version <= ?
+        """
+        params = [since, version]
+        if user_id is not None:
+            query += " AND c.user_id = ?"
+            params.append(user_id)
+        query += " ORDER BY c.version LIMIT ?"
+        cursor.execute(query, params + [limit + 1])
+        rows = cursor.fetchall()
+
+        more = len(rows) > limit
+        if more:
+            rows = rows[:limit]
+            version = rows[-1][0]
+        changes, deleted = [], []
+        for row in rows:
+            if row[2] or row[4] is None:
+                # A fresh mirror (since=0) has nothing to delete
+                if since:
+                    deleted.append({'user_id': row[1], 'term': row[3]})
+                continue
+            changes.append({
+                'user_id': row[1],
+                'term': row[3],
+                'favorite': row[4],
+                'bookmark': row[5],
+                'difficulty': row[6],
+                'rating': row[7],
+                'notes': row[8]
+            })
+
+        return jsonify({'version': version, 'changes': changes, 'deleted': deleted, 'more': more, 'reset': False})
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/api/meta/filter/<filter_type>', methods=['GET'])
 @app.route('/api/meta/filter/<filter_type>/<param>', methods=['GET'])
 def filter_by_metadata(filter_type, param=None):
     """Filter terms by metadata"""
     try:
-        db = get_db()
+        db = get_read_db()
         if not db:
             return jsonify({'error': 'Database not found'}), 500
         
@@ -768,7 +987,7 @@ def filter_by_metadata(filter_type, param=None):
             cursor.execute("""
                 SELECT t.term, t.subject 
                 FROM terms_data t
-                JOIN user_term_meta m ON t.term = m.term
+                JOIN user_term_meta m ON m.term_id = t.term_id
                 WHERE m.favorite = 1
                 ORDER BY t.term
             """)
@@ -776,7 +995,7 @@ def filter_by_metadata(filter_type, param=None):
             cursor.execute("""
                 SELECT t.term, t.subject 
                 FROM terms_data t
-                JOIN user_term_meta m ON t.term = m.term
+                JOIN user_term_meta m ON m.term_id = t.term_id
                 WHERE m.bookmark = 1
                 ORDER BY t.term
             """)
@@ -784,7 +1003,7 @@ def filter_by_metadata(filter_type, param=None):
             cursor.execute("""
                 SELECT t.term, t.subject 
                 FROM terms_data t
-                JOIN user_term_meta m ON t.term = m.term
+                JOIN user_term_meta m ON m.term_id = t.term_id
                 WHERE m.notes != ''
                 ORDER BY t.term
             """)
@@ -792,7 +1011,7 @@ def filter_by_metadata(filter_type, param=None):
             cursor.execute("""
                 SELECT t.term, t.subject 
                 FROM terms_data t
-                JOIN user_term_meta m ON t.term = m.term
+                JOIN user_term_meta m ON m.term_id = t.term_id
                 WHERE m.difficulty = ?
                 ORDER BY t.term
             """, (param,))
@@ -808,40 +1027,82 @@ def filter_by_metadata(filter_type, param=None):
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/cache/stats', methods=['GET'])
+def get_cache_stats():
+    """Hit/miss/eviction counters of the in-process caches"""
+    return jsonify({
+        'term_cache': get_term_cache(CATALOG_PATH).stats(),
+        'response_cache': get_response_cache(CATALOG_PATH).stats(),
+        'bitmap_index': get_bitmap_index(DB_PATH, CATALOG_PATH).stats()
+    })
+
+@app.route('/api/db/stats', methods=['GET'])
+def get_db_stats():
+    """Connection pool size and checkout wait times, writer batch sizes, replica refreshes"""
+    replica = get_replica(DB_PATH)
+    return jsonify({
+        'pool': get_pool(DB_PATH).metrics(),
+        'writer': get_writer(DB_PATH).metrics(),
+        'replica': replica.metrics() if replica else None
+    })
+
+@app.route('/api/admin/maintenance', methods=['GET'])
+def get_maintenance():
+    """Maintenance schedule of this process and the most recent runs (from any process)"""
+    try:
+        limit = min(int(request.args.get('limit', 50)), 500)
+        db = get_db()
+        if not db:
+            return jsonify({'error': 'Database not found'}), 500
+        
+        cursor = db.cursor()
+        cursor.execute("""
+            SELECT task, started_at, duration_ms, status, details_json
+            FROM maintenance_log ORDER BY id DESC LIMIT ?
+        """, (limit,))
+        runs = [{
+            'task': row[0],
+            'started_at': row[1],
+            'duration_ms': row[2],
+            'status': row[3],
+            'details': json.loads(row[4]) if row[4] else {}
+        } for row in cursor.fetchall()]
+        
+        return jsonify({'schedule': get_maintainer(DB_PATH).status(), 'runs': runs})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/admin/maintenance', methods=['POST'])
+def run_maintenance():
+    """Run maintenance tasks now. Body: { tasks?: ['checkpoint', 'optimize', 'vacuum'] }"""
+    try:
+        data = request.get_json(silent=True) or {}
+        tasks = data.get('tasks') or None
+        maintainer = get_maintainer(DB_PATH)
+        reports = maintainer.run(tasks) if tasks else maintainer.run()
+        return jsonify({'runs': reports})
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/api/shutdown', methods=['POST'])
 def shutdown():
-    """Shutdown the Flask server"""
-    func = request.environ.get('werkzeug.server.shutdown')
-    if func is None:
-        os._exit(0)
-    func()
+    """Shut the server down once in-flight requests (this one included) have finished"""
+    if not request_shutdown():
+        # Not running under server.serve(): no server to drain. Send this
+        # response, then commit queued views and writes (as serve()'s on_exit
+        # does) before ending the process.
+        response = make_response('Server shutting down...')
+        response.call_on_close(_exit_after_cleanup)
+        return response
     return 'Server shutting down...'
 
-if __name__ == '__main__':
-    import webbrowser
-    import threading
-    import signal
-    
-    def open_browser():
-        webbrowser.open('http://127.0.0.1:5000')
-    
-    def signal_handler(sig, frame):
-        print('\nShutting down Prism...')
-        sys.exit(0)
-    
-    signal.signal(signal.SIGINT, signal_handler)
-    signal.signal(signal.SIGTERM, signal_handler)
-    
-    threading.Timer(1, open_browser).start()
-    
-    try:
-        app.run(host='127.0.0.1', port=5000, debug=False, use_reloader=False)
-    except KeyboardInterrupt:
-        print('\nShutting down Prism...')
-        sys.exit(0)
-    finally:
-        import os
-        os._exit(0)
+def _exit_after_cleanup():
+    cleanup()
+    sys.stdout.flush()
+    os._exit(0)
+
 @app.route('/api/filter', methods=['GET'])
 def filter_terms():
     """Filter terms by rating or importance level"""
@@ -850,7 +1111,7 @@ def filter_terms():
         rating = request.args.get('rating')
         important_level = request.args.get('important_level')
         
-        db = get_db()
+        db = get_read_db()
         if not db:
             return jsonify({'error': 'Database not found'}), 500
         
@@ -860,7 +1121,7 @@ def filter_terms():
             cursor.execute("""
                 SELECT t.term, t.subject 
                 FROM terms_data t
-                INNER JOIN user_term_meta m ON t.term = m.term
+                INNER JOIN user_term_meta m ON m.term_id = t.term_id
                 WHERE m.user_id = ? AND m.rating = ?
                 ORDER BY t.term
             """, (user_id, int(rating)))
@@ -868,7 +1129,7 @@ def filter_terms():
             cursor.execute("""
                 SELECT t.term, t.subject 
                 FROM terms_data t
-                INNER JOIN user_term_meta m ON t.term = m.term
+                INNER JOIN user_term_meta m ON m.term_id = t.term_id
                 WHERE m.user_id = ? AND m.important_level = ?
                 ORDER BY t.term
             """, (user_id, important_level))
@@ -882,6 +1143,39 @@ def filter_terms():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/query', methods=['POST'])
+def query_terms():
+    """
+    Terms matching a filter expression over the user's metadata and the subject,
+    with facet counts for drill-down, in one request
+    Body: { where?, user_id?, limit? (default 100, max 1000), offset?, facets? }
+    where: {"difficulty": "hard", "favorite": true, "subject": "X"} (all must hold;
+    a list of values matches any of them), {"and": [...]}, {"or": [...]}, {"not": {...}};
+    omitted or {} matches every term
+    Dimensions: favorite, bookmark, has_notes, difficulty, rating, important_level,
+    read_status, subject
+    facets: true (subject, difficulty, rating, important_level, favorite, bookmark)
+    or a list of dimensions
+    Returns { count, items: [{term, subject}] ordered by term, facets?: {dimension: {value: count}} }
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        where = data.get('where') or {}
+        user_id = data.get('user_id', 'local')
+        limit = max(1, min(int(data.get('limit', 100)), 1000))
+        offset = max(0, int(data.get('offset', 0)))
+        facets = data.get('facets') or []
+        if facets is True:
+            facets = FACETS
+        elif not isinstance(facets, list):
+            return jsonify({'error': 'facets must be true or a list of dimensions'}), 400
+        
+        return jsonify(get_bitmap_index(DB_PATH, CATALOG_PATH).query(user_id, where, limit, offset, facets))
+    except ValueError as e:
+        return jsonify({'error': f'Invalid query: {e}'}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/api/preferences/<key>', methods=['GET'])
 def get_preference(key):
     """Get a user preference"""
@@ -913,17 +1207,58 @@ def set_preference(key):
         user_id = data.get('user_id', 'local')
         value = data.get('value')
         
-        db = get_db()
-        if not db:
-            return jsonify({'error': 'Database not found'}), 500
-        
-        cursor = db.cursor()
-        cursor.execute("""
-            INSERT OR REPLACE INTO user_preferences (user_id, preference_key, preference_value)
-            VALUES (?, ?, ?)
-        """, (user_id, key, str(value)))
+        def upsert_preference(cursor):
+            cursor.execute("""
+                INSERT OR REPLACE INTO user_preferences (user_id, preference_key, preference_value, updated_at)
+                VALUES (?, ?, ?, ?)
+            """, (user_id, key, str(value), datetime.now().isoformat()))
         
-        db.commit()
+        db_write(upsert_preference)
         return jsonify({'success': True})
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
\ No newline at end of file
+        return jsonify({'error': str(e)}), 500
+
+if __name__ == '__main__':
+    import argparse
+    import webbrowser
+    import threading
+    
+    parser = argparse.ArgumentParser(description='Prism')
+    parser.add_argument('--serve', action='store_true',
+                        help='production mode: no browser window, listen on --host/--port')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=5000)
+    parser.add_argument('--threads', type=int, default=8, help='request threads per worker (with waitress installed)')
+    parser.add_argument('--workers', type=int, default=1, help='pre-forked worker processes (POSIX only)')
+    parser.add_argument('--keep-alive', type=float, default=5.0,
+                        help='seconds an idle keep-alive connection is held open')
+    parser.add_argument('--drain-timeout', type=float, default=30.0,
+                        help='seconds to wait for in-flight requests on shutdown')
+    parser.add_argument('--no-maintenance', action='store_true',
+                        help='do not run ANALYZE, checkpoints and incremental vacuum in the background')
+    parser.add_argument('--replica', action='store_true',
+                        help='serve stats and metadata filters from an in-memory copy of the user-state tables')
+    args = parser.parse_args()
+    
+    if args.replica:
+        # Re-copied after every commit of this process's writer (other
+        # processes' commits are picked up by polling)
+        get_writer(DB_PATH).add_listener(enable_replica(DB_PATH, CATALOG_PATH).mark_dirty)
+    
+    if args.serve:
+        print(f"🚀 Serving Prism on http://{args.host}:{args.port} "
+              f"({args.workers} worker(s) x {args.threads} threads)")
+    else:
+        # Desktop mode: a single local process with the browser pointed at it
+        args.host, args.workers = '127.0.0.1', 1
+        threading.Timer(1, lambda: webbrowser.open(f'http://127.0.0.1:{args.port}')).start()
+    
+    def start_maintenance(worker):
+        # One maintainer per database file is enough: the first worker runs it
+        if worker == 0 and not args.no_maintenance:
+            get_maintainer(DB_PATH).start()
+    
+    serve(app, args.host, args.port, threads=args.threads, workers=args.workers,
+          keep_alive=args.keep_alive, drain_timeout=args.drain_timeout,
+          on_start=start_maintenance, on_exit=cleanup)
+    print('\nShutting down Prism...')
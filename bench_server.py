@@ -0,0 +1,138 @@
+import argparse
+import http.client
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+from urllib.parse import quote
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# The baseline: Flask's built-in development server, as app.py used to start it
+DEV_SERVER = "from app import app; app.run(host='127.0.0.1', port={port}, debug=False, use_reloader=False)"
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def wait_until_up(port, timeout=60):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=2)
+            conn.request('GET', '/api/subjects')
+            conn.getresponse().read()
+            conn.close()
+            return True
+        except OSError:
+            time.sleep(0.2)
+    return False
+
+
+def start_server(mode, port, threads, workers):
+    if mode == 'dev':
+        cmd = [sys.executable, '-c', DEV_SERVER.format(port=port)]
+    else:
+        cmd = [sys.executable, 'app.py', '--serve', '--port', str(port),
+               '--threads', str(threads), '--workers', str(workers)]
+    return subprocess.Popen(cmd, cwd=BASE_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def sample_paths(port, count):
+    """Term and search URLs built from real catalog terms."""
+    conn = http.client.HTTPConnection('127.0.0.1', port)
+    conn.request('GET', f'/api/terms?limit={count}')
+    body = json.loads(conn.getresponse().read())
+    conn.close()
+    terms = [item['term'] for item in body['items']]
+    return {
+        'term': [f'/api/term/{quote(t, safe="")}' for t in terms],
+        'search': [f'/api/search/query?q={quote(t.split()[0][:4])}' for t in terms if t.split()]
+    }
+
+
+def run_load(port, paths, clients, duration):
+    """Requests/second and error count with `clients` concurrent connections."""
+    done = [0] * clients
+    errors = [0] * clients
+    stop_at = time.perf_counter() + duration
+
+    def client(i):
+        conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+        n = i
+        while time.perf_counter() < stop_at:
+            path = paths[n % len(paths)]
+            n += clients
+            try:
+                conn.request('GET', path)
+                response = conn.getresponse()
+                response.read()
+                if response.status != 200:
+                    errors[i] += 1
+                else:
+                    done[i] += 1
+                if response.will_close:
+                    conn.close()
+                    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+            except OSError:
+                errors[i] += 1
+                conn.close()
+                conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+        conn.close()
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+    return sum(done) / elapsed, sum(errors)
+
+
+def benchmark(clients, duration, threads, workers):
+    results = {}
+    for mode in ('dev', 'serve'):
+        port = free_port()
+        proc = start_server(mode, port, threads, workers)
+        try:
+            if not wait_until_up(port):
+                print(f"❌ {mode} server did not start")
+                return False
+            paths = sample_paths(port, 200)
+            for endpoint, urls in paths.items():
+                run_load(port, urls, clients, 1)  # warm caches and connections
+                rate, errors = run_load(port, urls, clients, duration)
+                results[(mode, endpoint)] = rate
+                print(f"   {mode:5} {endpoint:6} {rate:9.0f} req/s" + (f"  ({errors} errors)" if errors else ''))
+        finally:
+            proc.terminate()
+            proc.wait(timeout=60)
+
+    print("\n📋 Summary:")
+    for endpoint in ('term', 'search'):
+        dev, prod = results[('dev', endpoint)], results[('serve', endpoint)]
+        print(f"   {endpoint:6}: {dev:.0f} -> {prod:.0f} req/s ({prod / dev:.2f}x)")
+    return True
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Compare the development server with --serve on the term and search endpoints')
+    parser.add_argument('--clients', type=int, default=16, help='concurrent keep-alive connections')
+    parser.add_argument('--duration', type=float, default=5.0, help='seconds per measurement')
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--workers', type=int, default=1)
+    args = parser.parse_args()
+
+    if not os.path.exists(os.path.join(BASE_DIR, 'prism.sqlite')):
+        print("❌ prism.sqlite not found")
+        sys.exit(1)
+    print(f"🚀 Benchmarking with {args.clients} clients, {args.duration:.0f}s per run...\n")
+    sys.exit(0 if benchmark(args.clients, args.duration, args.threads, args.workers) else 1)
@@ -0,0 +1,276 @@
+# bitmapindex.py
+import sqlite3
+import threading
+from collections import OrderedDict
+
+from catalog import get_catalog
+from splitdb import attach_catalog, read_only_uri
+
+# Per-user dimensions of user_term_meta: name -> (column expression, value of
+# a term without a meta row). Boolean dimensions hold a single bitmap of the
+# terms where they are true. 'subject' comes from the catalog and is the same
+# for every user.
+DIMENSIONS = {
+    'favorite': ("favorite = 1", False),
+    'bookmark': ("bookmark = 1", False),
+    'has_notes': ("notes IS NOT NULL AND notes != ''", False),
+    'difficulty': ("difficulty", 'unknown'),
+    'rating': ("rating", '0'),
+    'important_level': ("important_level", 'none'),
+    'read_status': ("read_status", 'to-read')
+}
+BOOLEAN_DIMENSIONS = ('favorite', 'bookmark', 'has_notes')
+# Facets counted when a query asks for facets=true
+FACETS = ('subject', 'difficulty', 'rating', 'important_level', 'favorite', 'bookmark')
+
+# Positions of the set bits of every byte value
+_BYTE_BITS = [tuple(bit for bit in range(8) if byte >> bit & 1) for byte in range(256)]
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def get_bitmap_index(db_path, catalog_path=None):
+    """Returns the process-wide BitmapIndex for db_path (terms from catalog_path, default db_path)."""
+    with _indexes_lock:
+        index = _indexes.get(db_path)
+        if index is None:
+            index = BitmapIndex(db_path, catalog_path)
+            _indexes[db_path] = index
+        return index
+
+
+def _bitmap(positions):
+    """Bitmap with the given bit positions set (built in a buffer, not by repeated big-int ORs)."""
+    positions = list(positions)
+    buffer = bytearray((max(positions, default=-1) >> 3) + 1)
+    for i in positions:
+        buffer[i >> 3] |= 1 << (i & 7)
+    return int.from_bytes(buffer, 'little')
+
+
+def _positions(bits):
+    """Set bit positions of `bits`, ascending."""
+    data = bits.to_bytes((bits.bit_length() + 7) // 8, 'little')
+    positions = []
+    for i, byte in enumerate(data):
+        if byte:
+            base = i * 8
+            positions.extend(base + bit for bit in _BYTE_BITS[byte])
+    return positions
+
+
+def _popcount(bits):
+    return bits.bit_count() if hasattr(bits, 'bit_count') else bin(bits).count('1')
+
+
+def _key(value):
+    """Bitmap key of a dimension value: 5, '5' and 5.0 are the same rating."""
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value)
+
+
+class BitmapIndex:
+    """
+    Bitmaps over catalog terms for filtering by any combination of metadata.
+
+    Bit i of every bitmap stands for the term with term_id i. Bitmaps are
+    Python ints, so AND / OR / NOT of two of them is a single C loop over
+    machine words whatever the number of terms. The catalog part (a bitmap
+    per subject and one of all terms) is rebuilt when the catalog index's
+    generation changes. Each user's part (a bitmap per value of every
+    DIMENSIONS entry) is read from user_term_meta on first use and kept for
+    the `max_users` most recent users, together with the user's latest
+    user_meta_changes version. Each query reads that version again (one
+    index seek) and rebuilds the part only if it moved, so only writes by
+    that user to a logged column (metachanges.LOGGED) cost a rebuild, from
+    this process or any other; last_viewed updates do not.
+
+    A term without a meta row has the default value of every dimension, so
+    {"not": {"favorite": true}} and {"difficulty": "unknown"} include it.
+
+    Facet counts are the popcounts of the result ANDed with each value's
+    bitmap, so the result is computed once for the page and every count.
+    """
+
+    def __init__(self, db_path, catalog_path=None, max_users=64):
+        self.db_path = db_path
+        self.catalog_path = catalog_path or db_path
+        self.max_users = max_users
+        self._lock = threading.Lock()
+        self._conn = None
+        self._generation = None
+        self._catalog = None
+        self._users = OrderedDict()
+        self.builds = 0
+
+    # --- internal -----------------------------------------------------
+
+    def _connection(self):
+        if self._conn is None:
+            self._conn = sqlite3.connect(read_only_uri(self.db_path), uri=True, check_same_thread=False)
+            if self.catalog_path != self.db_path:
+                attach_catalog(self._conn, self.catalog_path)
+        return self._conn
+
+    def _catalog_part(self):
+        """(all_bits, {subject: bits}, names, rank): names[i] = (term, subject), rank[i] = term order."""
+        generation = get_catalog(self.catalog_path).current_generation()
+        with self._lock:
+            if self._catalog is None or self._generation != generation:
+                rows = self._connection().execute("SELECT term_id, term, subject FROM terms_data").fetchall()
+                size = max((row[0] for row in rows), default=-1) + 1
+                names = [None] * size
+                subjects = {}
+                for term_id, term, subject in rows:
+                    names[term_id] = (term, subject)
+                    subjects.setdefault(subject, []).append(term_id)
+                rank = [0] * size
+                for position, term_id in enumerate(sorted((row[0] for row in rows), key=lambda i: names[i][0])):
+                    rank[term_id] = position
+                self._catalog = (_bitmap(row[0] for row in rows),
+                                 {subject: _bitmap(ids) for subject, ids in subjects.items()}, names, rank)
+                self._generation = generation
+            return self._catalog
+
+    def _user_part(self, user_id):
+        """({dimension: {key: bits}}, rows_bits) for user_id."""
+        with self._lock:
+            # Read before the rows: a write in between only costs another rebuild
+            version = self._connection().execute(
+                "SELECT MAX(version) FROM user_meta_changes WHERE user_id = ?", (user_id,)).fetchone()[0]
+            cached = self._users.get(user_id)
+            if cached is not None and cached[0] == version:
+                self._users.move_to_end(user_id)
+                return cached[1]
+
+            columns = ', '.join(expression for expression, _ in DIMENSIONS.values())
+            rows = self._connection().execute(
+                f"SELECT term_id, {columns} FROM user_term_meta WHERE user_id = ?", (user_id,)).fetchall()
+            lists = {dimension: {} for dimension in DIMENSIONS}
+            for row in rows:
+                for dimension, value in zip(DIMENSIONS, row[1:]):
+                    if dimension in BOOLEAN_DIMENSIONS:
+                        if value:
+                            lists[dimension].setdefault(True, []).append(row[0])
+                    elif value is not None:
+                        lists[dimension].setdefault(_key(value), []).append(row[0])
+            part = ({dimension: {key: _bitmap(ids) for key, ids in values.items()}
+                     for dimension, values in lists.items()},
+                    _bitmap(row[0] for row in rows))
+            self._users[user_id] = (version, part)
+            self._users.move_to_end(user_id)
+            while len(self._users) > self.max_users:
+                self._users.popitem(last=False)
+            self.builds += 1
+            return part
+
+    def _match(self, dimension, value, catalog, user):
+        all_bits, subjects = catalog[0], catalog[1]
+        if dimension == 'subject':
+            return subjects.get(value, 0)
+        if dimension not in DIMENSIONS:
+            raise ValueError(f"Unknown dimension: {dimension}")
+        bitmaps, with_rows = user
+        default = DIMENSIONS[dimension][1]
+        if dimension in BOOLEAN_DIMENSIONS:
+            if not isinstance(value, (bool, int)):
+                raise ValueError(f"{dimension} takes true or false")
+            true_bits = bitmaps[dimension].get(True, 0)
+            return true_bits if value else all_bits & ~true_bits
+        if isinstance(value, (dict, list, bool)) or value is None:
+            raise ValueError(f"{dimension} takes a string or a number")
+        bits = bitmaps[dimension].get(_key(value), 0)
+        if _key(value) == default:
+            # Terms the user never touched
+            bits |= all_bits & ~with_rows
+        return bits
+
+    def _evaluate(self, expression, catalog, user):
+        all_bits = catalog[0]
+        if not isinstance(expression, dict):
+            raise ValueError(f"Expected an object, got {expression!r}")
+        if len(expression) == 1:
+            (operator, operand), = expression.items()
+            if operator in ('and', 'or'):
+                if not isinstance(operand, list) or not operand:
+                    raise ValueError(f"'{operator}' takes a non-empty list")
+                parts = [self._evaluate(e, catalog, user) for e in operand]
+                bits = parts[0]
+                for part in parts[1:]:
+                    bits = bits & part if operator == 'and' else bits | part
+                return bits
+            if operator == 'not':
+                return all_bits & ~self._evaluate(operand, catalog, user)
+        # {"dimension": value, ...}: AND of the keys, OR of a list of values
+        bits = all_bits
+        for dimension, value in expression.items():
+            values = value if isinstance(value, list) else [value]
+            if not values:
+                raise ValueError(f"{dimension} takes at least one value")
+            matched = 0
+            for v in values:
+                matched |= self._match(dimension, v, catalog, user)
+            bits &= matched
+        return bits
+
+    def _facet_counts(self, bits, dimensions, catalog, user):
+        """{dimension: {value: matches}} of the terms in `bits`, values with no match left out."""
+        total = _popcount(bits)
+        facets = {}
+        for dimension in dimensions:
+            if dimension in BOOLEAN_DIMENSIONS:
+                true_count = _popcount(bits & user[0][dimension].get(True, 0))
+                facets[dimension] = {'true': true_count, 'false': total - true_count}
+                continue
+            if dimension == 'subject':
+                bitmaps = {subject: b for subject, b in catalog[1].items() if subject is not None}
+            elif dimension in DIMENSIONS:
+                keys = set(user[0][dimension]) | {DIMENSIONS[dimension][1]}
+                bitmaps = {key: self._match(dimension, key, catalog, user) for key in keys}
+            else:
+                raise ValueError(f"Unknown facet: {dimension}")
+            counts = {}
+            for value, value_bits in bitmaps.items():
+                count = _popcount(bits & value_bits)
+                if count:
+                    counts[value] = count
+            facets[dimension] = counts
+        return facets
+
+    # --- public -------------------------------------------------------
+
+    def evaluate(self, user_id, expression):
+        """Bitmap (an int, bit i = term_id i) of the catalog terms matching `expression` for user_id."""
+        catalog = self._catalog_part()
+        return self._evaluate(expression, catalog, self._user_part(user_id)) & catalog[0]
+
+    def term_ids(self, user_id, expression):
+        """term_ids of the catalog terms matching `expression` for user_id, ascending."""
+        return _positions(self.evaluate(user_id, expression))
+
+    def query(self, user_id, expression, limit=100, offset=0, facets=()):
+        """
+        {'count', 'items': [{'term', 'subject'}]} for one page of the matching
+        terms ordered by term, plus 'facets' (see _facet_counts) for the
+        `facets` dimensions, all from one evaluation of `expression`.
+        """
+        catalog = self._catalog_part()
+        user = self._user_part(user_id)
+        _, _, names, rank = catalog
+        bits = self._evaluate(expression, catalog, user) & catalog[0]
+        positions = _positions(bits)
+        positions.sort(key=rank.__getitem__)
+        page = positions[offset:offset + limit]
+        result = {
+            'count': len(positions),
+            'items': [{'term': names[i][0], 'subject': names[i][1]} for i in page]
+        }
+        if facets:
+            result['facets'] = self._facet_counts(bits, facets, catalog, user)
+        return result
+
+    def stats(self):
+        with self._lock:
+            return {'users_cached': len(self._users), 'user_builds': self.builds}
@@ -27,6 +27,7 @@ REM Check and copy
 echo.
 if exist "dist\Prism.exe" (
     copy /Y prism.sqlite dist\ >nul
+    if exist catalog.sqlite copy /Y catalog.sqlite dist\ >nul
     echo.
     echo ========================================
     echo SUCCESS!
@@ -0,0 +1,240 @@
+# catalog.py
+import base64
+import bisect
+import hashlib
+import heapq
+import json
+import random
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+
+from splitdb import read_only_uri
+
+# One index per database file. app.py can be imported twice (as __main__ and
+# as 'app' via the activity blueprint), so the registry lives here instead.
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def get_catalog(db_path):
+    """Returns the process-wide CatalogIndex for db_path."""
+    with _indexes_lock:
+        index = _indexes.get(db_path)
+        if index is None:
+            index = CatalogIndex(db_path)
+            _indexes[db_path] = index
+        return index
+
+
+def encode_cursor(key):
+    """Opaque, URL-safe cursor for a (subject, term) keyset position."""
+    raw = json.dumps(list(key), ensure_ascii=False).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Inverse of encode_cursor. Raises ValueError for a malformed cursor."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        subject, term = json.loads(raw.decode('utf-8'))
+    except Exception:
+        raise ValueError('invalid cursor')
+    if not isinstance(subject, str) or not isinstance(term, str):
+        raise ValueError('invalid cursor')
+    return subject, term
+
+
+class CatalogIndex:
+    """
+    In-memory copy of the (term, subject) table from terms_data.
+
+    Holds the rows sorted by (subject, term), the slice of rows for every
+    subject and the per-subject counts, so the listing endpoints never touch
+    SQLite. Staleness is detected with PRAGMA data_version on a private
+    connection (it changes whenever another connection commits) and confirmed
+    against the catalog_version counter that the terms_data triggers bump, so
+    writes to user tables do not force a rebuild.
+    """
+
+    def __init__(self, db_path, check_interval=1.0):
+        self.db_path = db_path
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._conn = None
+        self._data_version = None
+        self._catalog_version = None
+        self._checked_at = 0.0
+        self._snapshot = None
+        self.generation = 0
+
+    # --- internal -----------------------------------------------------
+
+    def _connection(self):
+        if self._conn is None:
+            # Read-only: the index never writes, and a missing file must not be created
+            self._conn = sqlite3.connect(read_only_uri(self.db_path), uri=True, check_same_thread=False)
+        return self._conn
+
+    def _read_catalog_version(self, conn):
+        """(version, updated_at) from the catalog_version row; (None, None) if missing."""
+        try:
+            row = conn.execute("SELECT version, updated_at FROM catalog_version WHERE id = 1").fetchone()
+        except sqlite3.Error:
+            try:
+                # Databases that init_db has not migrated yet
+                row = conn.execute("SELECT version, NULL FROM catalog_version WHERE id = 1").fetchone()
+            except sqlite3.Error:
+                row = None
+        return (row[0], row[1]) if row else (None, None)
+
+    def _build(self, conn, catalog_version, updated_at):
+        rows = conn.execute("SELECT term, subject FROM terms_data ORDER BY subject, term").fetchall()
+
+        terms = [{'term': term, 'subject': subject} for term, subject in rows]
+        # Keyset positions; NULL subjects sort first in SQLite, as '' does here
+        keys = [(subject or '', term) for term, subject in rows]
+        subjects = []
+        slices = {}
+        start = 0
+        for i in range(1, len(rows) + 1):
+            if i == len(rows) or rows[i][1] != rows[start][1]:
+                subject = rows[start][1]
+                slices[subject] = (start, i)
+                subjects.append({'subject': subject, 'count': i - start})
+                start = i
+
+        # Per subject: lower-cased names in sorted order with their row
+        # positions, so a name prefix narrows each subject with bisect
+        folded = {}
+        for subject, (lo, hi) in slices.items():
+            pairs = sorted((terms[i]['term'].lower(), i) for i in range(lo, hi))
+            folded[subject] = ([p[0] for p in pairs], [p[1] for p in pairs])
+
+        # HTTP validators: the persisted version plus a digest of the rows, so
+        # they survive restarts but differ between two databases
+        digest = hashlib.sha1(f'{catalog_version}\0'.encode('utf-8'))
+        for term, subject in rows:
+            digest.update(f'{subject}\0{term}\0'.encode('utf-8'))
+        last_modified = None
+        if updated_at:
+            try:
+                last_modified = datetime.fromisoformat(updated_at).replace(tzinfo=timezone.utc)
+            except ValueError:
+                pass
+
+        # Swap everything in at once so readers never see a half-built index
+        self._snapshot = (terms, subjects, slices, keys, (digest.hexdigest(), last_modified), folded)
+        # Bumped on every rebuild so derived indexes know when to rebuild too
+        self.generation += 1
+
+    def _ensure_fresh(self):
+        now = time.monotonic()
+        if self._snapshot is not None and now - self._checked_at < self.check_interval:
+            return
+
+        with self._lock:
+            if self._snapshot is not None and now - self._checked_at < self.check_interval:
+                return
+            conn = self._connection()
+            data_version = conn.execute("PRAGMA data_version").fetchone()[0]
+            if self._snapshot is None or data_version != self._data_version:
+                catalog_version, updated_at = self._read_catalog_version(conn)
+                if (self._snapshot is None or catalog_version is None
+                        or catalog_version != self._catalog_version):
+                    self._build(conn, catalog_version, updated_at)
+                    self._catalog_version = catalog_version
+                self._data_version = data_version
+            self._checked_at = now
+
+    # --- public -------------------------------------------------------
+
+    def refresh(self):
+        """Forces a version check (and a rebuild if the catalog changed)."""
+        self._checked_at = 0.0
+        self._ensure_fresh()
+
+    def current_generation(self):
+        """Generation number after a (throttled) staleness check; changes whenever terms_data does."""
+        self._ensure_fresh()
+        return self.generation
+
+    def validators(self):
+        """
+        (version_tag, last_modified) describing the current catalog content,
+        for ETag / Last-Modified headers. last_modified is a UTC datetime or
+        None when the database does not record it.
+        """
+        self._ensure_fresh()
+        return self._snapshot[4]
+
+    def all_terms(self):
+        """All catalog rows as [{'term', 'subject'}], ordered by subject, term."""
+        self._ensure_fresh()
+        return self._snapshot[0]
+
+    def subjects(self):
+        """[{'subject', 'count'}] ordered by subject."""
+        self._ensure_fresh()
+        return self._snapshot[1]
+
+    def terms_for_subject(self, subject):
+        """Rows of one subject ordered by term (empty list if unknown)."""
+        self._ensure_fresh()
+        terms, _, slices, _, _, _ = self._snapshot
+        bounds = slices.get(subject)
+        if bounds is None:
+            return []
+        return terms[bounds[0]:bounds[1]]
+
+    def page(self, after=None, limit=100, subject=None, prefix=None):
+        """
+        One keyset page of rows ordered by (subject, term).
+
+        `after` is the (subject, term) key of the last row already seen,
+        `subject` restricts the page to one subject and `prefix` to terms
+        whose name starts with it (case-insensitive).
+        Returns (rows, next_key); next_key is None on the last page.
+        """
+        self._ensure_fresh()
+        terms, subjects, slices, keys, _, folded = self._snapshot
+
+        if subject is None:
+            start, end = 0, len(terms)
+        else:
+            start, end = slices.get(subject, (0, 0))
+        if after is not None:
+            start = max(start, bisect.bisect_right(keys, tuple(after), start, end))
+
+        if prefix:
+            prefix = prefix.lower()
+            names = [subject] if subject is not None else [s['subject'] for s in subjects]
+            matches = []
+            # Subjects are contiguous in key order, so their matches concatenate in order
+            for name in names:
+                if name not in folded or slices[name][1] <= start:
+                    continue
+                lowered, positions = folded[name]
+                lo = bisect.bisect_left(lowered, prefix)
+                hi = bisect.bisect_left(lowered, prefix + '\U0010ffff', lo)
+                matches.extend(heapq.nsmallest(
+                    limit + 1 - len(matches), (pos for pos in positions[lo:hi] if pos >= start)))
+                if len(matches) > limit:
+                    break
+            has_more = len(matches) > limit
+            rows = [terms[i] for i in matches[:limit]]
+        else:
+            rows = terms[start:start + limit]
+            has_more = start + limit < end
+
+        next_key = None
+        if has_more and rows:
+            last = rows[-1]
+            next_key = (last['subject'] or '', last['term'])
+        return rows, next_key
+
+    def random_terms(self, count):
+        """Up to `count` distinct rows picked at random."""
+        terms = self.all_terms()
+        return random.sample(terms, min(count, len(terms)))
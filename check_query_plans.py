@@ -0,0 +1,334 @@
+import argparse
+import ast
+import os
+import re
+import sqlite3
+import sys
+import tempfile
+
+import bitmapindex
+import metacounters
+import userstats
+from migrations import migrate_database
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Modules whose SQL is checked: the routes and the modules they delegate queries to
+SOURCES = ('app.py', 'activity.py', 'search.py', 'catalog.py', 'suggest.py', 'viewtracker.py',
+           'bitmapindex.py', 'metacounters.py', 'userstats.py', 'metachanges.py', 'maintenance.py', 'replica.py')
+
+# Representative values for the {expressions} of f-string queries, keyed by
+# the expression source, or "function:expression" where a name is reused.
+# SQL built by a module's own helpers is taken from those helpers.
+FSTRING_SAMPLES = {
+    'columns': 'definition, example',
+    'load_term_content:columns': ', definition, example',
+    "', '.join(FTS_COLUMNS)": 'term, subject, definition, keyPoints_str, example',
+    'placeholders': '?, ?',
+    'build_standalone_search_index:placeholders': '?, ?, ?, ?, ?, ?',
+    "''.join((f', {TERM_SECTIONS[s][0]}' for s in missing))": ', definition',
+    'PRIORITY_SQL': '1',
+    'weights': '10.0, 4.0, 1.0, 1.0, 0.5',
+    'bulk_update_term_meta:column_list': 'favorite, difficulty',
+    'bulk_update_term_meta:value_placeholders': '?, ?',
+    'bulk_update_term_meta:assignments': 'favorite = excluded.favorite, difficulty = excluded.difficulty',
+    '_user_part:columns': ', '.join(expression for expression, _ in bitmapindex.DIMENSIONS.values()),
+    'rebuild_meta_counters:_recount_sql()': metacounters._recount_sql(),
+    'rebuild_user_stats:_recount_sql()': userstats._recount_sql(),
+    "', '.join(STAT_COLUMNS)": ', '.join(userstats.STAT_COLUMNS),
+    "', '.join((f'SUM({c})' for c in STAT_COLUMNS))": ', '.join(f'SUM({c})' for c in userstats.STAT_COLUMNS),
+    '_table_row_counts:table': 'user_term_meta',
+    '_copy_user_tables:name': 'user_term_meta',
+}
+
+# Queries assembled at runtime (execute(query, params)): one representative
+# statement per shape, keyed by "module:function". An empty list marks
+# statements that are not queries (DDL replayed from sqlite_master).
+DYNAMIC_SQL = {
+    'app.py:generate_test_questions': [
+        "SELECT term_id, term, subject FROM terms_data WHERE 1=1 AND subject = ? ORDER BY RANDOM()",
+        """SELECT t.term_id, t.term, t.subject FROM terms_data t
+           LEFT JOIN user_term_meta m ON m.term_id = t.term_id
+           WHERE 1=1 AND t.subject = ? AND m.difficulty = ? ORDER BY RANDOM()""",
+    ],
+    'app.py:get_metadata_changes': [
+        """SELECT c.version, c.user_id, c.deleted, t.term, m.favorite, m.bookmark, m.difficulty, m.rating,
+                  CASE WHEN m.notes = '' THEN 0 ELSE 1 END as has_notes
+           FROM user_meta_changes c
+           LEFT JOIN user_term_meta m ON m.term_id = c.term_id AND m.user_id = c.user_id
+           LEFT JOIN terms_data t ON t.term_id = c.term_id
+           WHERE c.version > ? AND c.version <= ? ORDER BY c.version LIMIT ?""",
+        """SELECT c.version, c.user_id, c.deleted, t.term, m.favorite, m.bookmark, m.difficulty, m.rating,
+                  CASE WHEN m.notes = '' THEN 0 ELSE 1 END as has_notes
+           FROM user_meta_changes c
+           LEFT JOIN user_term_meta m ON m.term_id = c.term_id AND m.user_id = c.user_id
+           LEFT JOIN terms_data t ON t.term_id = c.term_id
+           WHERE c.version > ? AND c.version <= ? AND c.user_id = ? ORDER BY c.version LIMIT ?""",
+    ],
+    'activity.py:term_group': [
+        """SELECT t.term, m.favorite, m.bookmark, m.difficulty, m.rating, m.notes, m.last_viewed, m.important_level
+           FROM user_term_meta m JOIN terms_data t ON t.term_id = m.term_id
+           WHERE m.user_id = ? AND m.favorite = 1 ORDER BY t.term""",
+        """SELECT t.term, m.favorite, m.bookmark, m.difficulty, m.rating, m.notes, m.last_viewed, m.important_level
+           FROM user_term_meta m JOIN terms_data t ON t.term_id = m.term_id
+           WHERE m.user_id = ? AND m.rating = ? ORDER BY t.term""",
+        """SELECT t.term, m.favorite, m.bookmark, m.difficulty, m.rating, m.notes, m.last_viewed, m.important_level
+           FROM user_term_meta m JOIN terms_data t ON t.term_id = m.term_id
+           WHERE m.user_id = ? AND m.important_level >= ? ORDER BY t.term""",
+    ],
+    'metacounters.py:check_meta_counters': [metacounters._recount_sql()],
+    'userstats.py:check_user_stats': [userstats._recount_sql()],
+    'replica.py:_copy_user_tables': [],
+}
+
+# Plans that are fine by design, one entry per statement: ("module:function",
+# substring of its normalized SQL ('' = the function's only query), plan
+# step prefixes the exemption covers, reason). An entry that no longer
+# matches any statement is reported, so exemptions cannot outlive their query.
+ALLOWED = (
+    ('app.py:generate_test_questions', 'order by random()', ('USE TEMP B-TREE FOR ORDER BY',),
+     'random sample: every candidate row gets a random sort key'),
+    ('app.py:get_tests', 'from saved_tests order by created_at desc', ('SCAN saved_tests USING INDEX',),
+     'lists every saved test, newest first, in index order'),
+    ('app.py:get_all_metadata', 'as has_notes from user_term_meta m', ('SCAN m',),
+     'exports every metadata row'),
+    ('app.py:get_maintenance', 'from maintenance_log order by id desc limit', ('SCAN maintenance_log',),
+     'newest runs first: walks the rowid backwards and stops at LIMIT'),
+    ('app.py:get_meta_counts', 'sum(count) from user_meta_counters group by',
+     ('SCAN user_meta_counters', 'USE TEMP B-TREE FOR GROUP BY'),
+     'totals over all users: a few counters per user, not one row per term'),
+    ('app.py:filter_by_metadata', 'order by t.term', ('USE TEMP B-TREE FOR ORDER BY',),
+     'user rows hold term_id; the matches found by index are sorted by name after the join'),
+    ('app.py:filter_terms', 'order by t.term', ('USE TEMP B-TREE FOR ORDER BY',),
+     'user rows hold term_id; the matches found by index are sorted by name after the join'),
+    ('activity.py:term_group', 'order by t.term', ('USE TEMP B-TREE FOR ORDER BY',),
+     'user rows hold term_id; the matches found by index are sorted by name after the join'),
+    ('activity.py:top_searches', 'order by times desc', ('USE TEMP B-TREE FOR ORDER BY',),
+     "ranked by an aggregate over one user's searches"),
+    ('search.py:search_terms', 'order by priority', ('SCAN (subquery', 'SCAN c', 'USE TEMP B-TREE FOR ORDER BY'),
+     "re-ranks only the bm25 top k and the user's own prioritized matches"),
+    ('search.py:_is_external_content', 'from sqlite_master', ('SCAN sqlite_master',), 'schema lookup'),
+    ('search.py:ensure_search_index', 'from sqlite_master', ('SCAN sqlite_master',), 'schema lookup'),
+    ('metacounters.py:ensure_meta_counters', 'from sqlite_master', ('SCAN sqlite_master',), 'schema lookup'),
+    ('userstats.py:ensure_user_stats', 'from sqlite_master', ('SCAN sqlite_master',), 'schema lookup'),
+    ('metachanges.py:ensure_meta_changes', 'from sqlite_master', ('SCAN sqlite_master',), 'schema lookup'),
+    ('catalog.py:_build', 'from terms_data order by subject, term', ('SCAN terms_data',),
+     'catalog index build reads every term once per catalog generation'),
+    ('bitmapindex.py:_catalog_part', 'from terms_data', ('SCAN terms_data',),
+     'bitmap build reads every term once per catalog generation'),
+    ('metacounters.py:rebuild_meta_counters', 'from user_term_meta m', ('USE TEMP B-TREE FOR GROUP BY',),
+     'offline recount of every counter'),
+    ('metacounters.py:check_meta_counters', 'from user_term_meta m', ('USE TEMP B-TREE FOR GROUP BY',),
+     'offline recount of every counter'),
+    ('metacounters.py:check_meta_counters', 'from user_meta_counters', ('SCAN user_meta_counters',),
+     'offline check compares every stored counter'),
+    ('userstats.py:rebuild_user_stats', 'group by user_id',
+     ('SCAN s', 'SCAN (subquery', 'USE TEMP B-TREE FOR GROUP BY'), 'offline recount of every summary row'),
+    ('userstats.py:check_user_stats', 'group by user_id',
+     ('SCAN s', 'SCAN (subquery', 'USE TEMP B-TREE FOR GROUP BY'), 'offline recount of every summary row'),
+    ('userstats.py:check_user_stats', 'from user_stats_summary', ('SCAN user_stats_summary',),
+     'offline check compares every summary row'),
+    ('userstats.py:read_user_stats', 'sum(favorites)', ('SCAN user_stats_summary',),
+     'totals over all users: one summary row per user'),
+    ('metachanges.py:ensure_meta_changes', 'row_number() over', ('SCAN user_term_meta', 'SCAN (subquery'),
+     'numbers the existing rows once, when the change log is created'),
+    ('metachanges.py:ensure_meta_changes', 'count(*) from user_meta_changes', ('SCAN user_meta_changes',),
+     'seeds the counter once, when the change log is created'),
+    ('maintenance.py:_table_row_counts', 'from main.sqlite_master', ('SCAN main.sqlite_master',), 'schema lookup'),
+    ('maintenance.py:_table_row_counts', 'select count(*) from main.', ('SCAN',),
+     'staleness check counts each table, on the idle-time maintenance thread'),
+    ('maintenance.py:_analyzed_row_counts', 'from main.sqlite_master', ('SCAN main.sqlite_master',), 'schema lookup'),
+    ('maintenance.py:_analyzed_row_counts', 'from main.sqlite_stat1', ('SCAN main.sqlite_stat1',),
+     'reads the few rows ANALYZE recorded'),
+    ('replica.py:_copy_user_tables', 'from source.sqlite_master',
+     ('SCAN source.sqlite_master', 'USE TEMP B-TREE FOR ORDER BY'), 'schema of the tables to copy'),
+    ('replica.py:_copy_user_tables', 'select * from source.', ('SCAN source.',),
+     'the replica is a full copy of the user tables'),
+)
+
+BAD_PLAN_RE = re.compile(r'\bSCAN\b(?!.*VIRTUAL TABLE)|USE TEMP B-TREE')
+# Scanning a partial index only visits the rows its WHERE clause admits
+INDEX_RE = re.compile(r'USING (?:COVERING )?INDEX (\w+)')
+DML_RE = re.compile(r'^\s*(SELECT|INSERT|UPDATE|DELETE|WITH|REPLACE)\b', re.IGNORECASE)
+
+
+def normalize(sql):
+    return re.sub(r'\s+', ' ', sql).strip().lower()
+
+
+def _render_fstring(node, function):
+    """(sql, None), or (None, expr) for the first expression without a sample."""
+    parts = []
+    for value in node.values:
+        if isinstance(value, ast.Constant):
+            parts.append(value.value)
+        else:
+            expr = ast.unparse(value.value)
+            sample = FSTRING_SAMPLES.get(f'{function}:{expr}', FSTRING_SAMPLES.get(expr))
+            if sample is None:
+                return None, expr
+            parts.append(sample)
+    return ''.join(parts), None
+
+
+def extract_statements(path):
+    """
+    ("module:function", location, sql) for every execute()/executemany()
+    call in a module. Unresolvable calls are yielded with sql=None.
+    """
+    module = os.path.basename(path)
+    with open(path, encoding='utf-8') as f:
+        tree = ast.parse(f.read(), filename=path)
+
+    functions = {}
+    for node in ast.walk(tree):
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            for child in ast.walk(node):
+                functions.setdefault(id(child), node.name)
+
+    for node in ast.walk(tree):
+        if not (isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute)
+                and node.func.attr in ('execute', 'executemany') and node.args):
+            continue
+        function = functions.get(id(node), '<module>')
+        key = f'{module}:{function}'
+        location = f'{module}:{node.lineno} ({function})'
+        arg = node.args[0]
+        if isinstance(arg, ast.Constant) and isinstance(arg.value, str):
+            yield key, location, arg.value
+        elif isinstance(arg, ast.JoinedStr):
+            head = arg.values[0]
+            if isinstance(head, ast.Constant) and not DML_RE.match(head.value):
+                continue  # DDL / PRAGMA built from identifiers
+            sql, missing = _render_fstring(arg, function)
+            yield key, location, sql if sql is not None else f'-- unresolved f-string expression: {missing}'
+        elif key in DYNAMIC_SQL:
+            for sql in DYNAMIC_SQL[key]:
+                yield key, location, sql
+        else:
+            yield key, location, None
+
+
+def build_fixture(path):
+    """Empty database with the full current schema (catalog included)."""
+    conn = sqlite3.connect(path)
+    conn.execute("""
+        CREATE TABLE terms_data (
+            term TEXT PRIMARY KEY, subject TEXT, definition TEXT, keyPoints_str TEXT, example TEXT,
+            objective_qa_json TEXT, descriptive_qa_json TEXT, quiz_data_json TEXT, orig_subject TEXT
+        )
+    """)
+    conn.commit()
+    conn.close()
+    migrate_database(path)
+    conn = sqlite3.connect(path)
+    # An empty sqlite_stat1, as maintenance.py reads it once ANALYZE has run
+    conn.execute("ANALYZE sqlite_schema")
+    conn.commit()
+    conn.close()
+
+
+def explain(conn, sql):
+    params = [None] * sql.count('?')
+    return [row[3] for row in conn.execute('EXPLAIN QUERY PLAN ' + sql, params)]
+
+
+def partial_indexes(conn):
+    return {name for name, sql in conn.execute("SELECT name, sql FROM sqlite_master WHERE type = 'index'")
+            if sql and re.search(r'\bWHERE\b', sql, re.IGNORECASE)}
+
+
+def bad_steps(plan, partial):
+    bad = []
+    for step in plan:
+        if not BAD_PLAN_RE.search(step):
+            continue
+        index = INDEX_RE.search(step)
+        if step.startswith('SCAN') and index and index.group(1) in partial:
+            continue
+        bad.append(step)
+    return bad
+
+
+def allowance(key, sql, step):
+    """Index into ALLOWED of the entry exempting `step` of this statement, or None."""
+    sql = normalize(sql)
+    for i, (function, text, prefixes, _) in enumerate(ALLOWED):
+        if function == key and text in sql and step.startswith(prefixes):
+            return i
+    return None
+
+
+def find_problems(db_path=None, verbose=False):
+    """
+    [(location, message)] for every statement that cannot be planned or whose
+    plan has a full scan or temp B-tree no ALLOWED entry covers, plus every
+    ALLOWED entry that matched nothing. Returns (problems, statements checked).
+    """
+    tmpdir = None
+    if db_path is None:
+        tmpdir = tempfile.TemporaryDirectory()
+        db_path = os.path.join(tmpdir.name, 'plans.sqlite')
+        build_fixture(db_path)
+
+    conn = sqlite3.connect(db_path)
+    # replica.py copies user tables out of the database attached as 'source'
+    conn.execute("ATTACH DATABASE ? AS source", (db_path,))
+    partial = partial_indexes(conn)
+    problems = []
+    used = set()
+    checked = 0
+    try:
+        for source in SOURCES:
+            for key, location, sql in extract_statements(os.path.join(BASE_DIR, source)):
+                if sql is None:
+                    problems.append((location, 'dynamic SQL; add a representative query to DYNAMIC_SQL'))
+                    continue
+                if sql.startswith('-- unresolved'):
+                    problems.append((location, f'{sql[3:]}; add it to FSTRING_SAMPLES'))
+                    continue
+                if not DML_RE.match(sql):
+                    continue
+                try:
+                    plan = explain(conn, sql)
+                except sqlite3.Error as e:
+                    problems.append((location, f'{e}\n   {normalize(sql)[:160]}'))
+                    continue
+                checked += 1
+                bad = bad_steps(plan, partial)
+                allowed = {step: allowance(key, sql, step) for step in bad}
+                used.update(i for i in allowed.values() if i is not None)
+                failing = [step for step in bad if allowed[step] is None]
+                if failing:
+                    problems.append((location, f"{'; '.join(failing)}\n   {normalize(sql)[:160]}"))
+                elif verbose:
+                    notes = sorted({ALLOWED[i][3] for i in allowed.values()})
+                    note = f"  (allowed: {'; '.join(notes)})" if notes else ''
+                    print(f"✅ {location}: {'; '.join(plan)}{note}")
+    finally:
+        conn.close()
+        if tmpdir is not None:
+            tmpdir.cleanup()
+
+    for i, (function, text, prefixes, _) in enumerate(ALLOWED):
+        if i not in used:
+            problems.append((function, f"ALLOWED entry {text or '(any query)'!r} / {prefixes} matches no plan; remove it"))
+    return problems, checked
+
+
+def check(db_path=None, verbose=False):
+    """Prints every problem; returns their number (0 = all plans acceptable)."""
+    problems, checked = find_problems(db_path, verbose)
+    for location, message in problems:
+        print(f"❌ {location}: {message}")
+    print(f"\n📋 {checked} statements checked, {len(problems)} problem(s)")
+    return len(problems)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='EXPLAIN QUERY PLAN every SQL statement; fails on full scans and temp B-tree sorts')
+    parser.add_argument('--db', help='check against this database instead of a fresh fixture')
+    parser.add_argument('-v', '--verbose', action='store_true', help='print every plan')
+    args = parser.parse_args()
+    sys.exit(1 if check(args.db, args.verbose) else 0)
@@ -0,0 +1,118 @@
+# codec.py
+import sqlite3
+import threading
+import zlib
+
+from splitdb import read_only_uri
+
+try:
+    import zstandard
+except ImportError:  # optional: only needed for catalogs compressed with CODEC_ZSTD
+    zstandard = None
+
+# Values of terms_data.content_codec
+CODEC_PLAIN = 0
+CODEC_ZLIB = 1
+CODEC_ZSTD = 2    # zstd with the dictionary stored in codec_dictionaries
+
+CODEC_NAMES = {CODEC_PLAIN: 'plain', CODEC_ZLIB: 'zlib', CODEC_ZSTD: 'zstd'}
+
+# terms_data columns that compress_catalog.py stores as compressed BLOBs
+COMPRESSED_COLUMNS = ('definition', 'example', 'objective_qa_json', 'descriptive_qa_json', 'quiz_data_json')
+
+_codecs = {}
+_codecs_lock = threading.Lock()
+
+
+def get_codec(db_path):
+    """Returns the process-wide ContentCodec for the catalog in db_path."""
+    with _codecs_lock:
+        codec = _codecs.get(db_path)
+        if codec is None:
+            codec = ContentCodec(dictionary_loader=lambda: load_dictionary(db_path))
+            _codecs[db_path] = codec
+        return codec
+
+
+def load_dictionary(db_path):
+    """The zstd dictionary stored with the catalog, or None."""
+    conn = sqlite3.connect(read_only_uri(db_path), uri=True)
+    try:
+        row = conn.execute("""
+            SELECT dictionary FROM codec_dictionaries
+            WHERE codec = ? ORDER BY id DESC LIMIT 1
+        """, (CODEC_ZSTD,)).fetchone()
+        return row[0] if row else None
+    except sqlite3.Error:
+        return None
+    finally:
+        conn.close()
+
+
+class ContentCodec:
+    """
+    Encodes and decodes the compressed content columns of terms_data.
+
+    Plain TEXT values pass through untouched, so readers can call decode()
+    on every column whether or not the catalog has been compressed.
+    """
+
+    def __init__(self, dictionary=None, dictionary_loader=None):
+        self._dictionary = dictionary
+        self._dictionary_loader = dictionary_loader
+        self._local = threading.local()   # zstd (de)compressors are not thread-safe
+        self._lock = threading.Lock()
+
+    def _zstd_dict(self):
+        if zstandard is None:
+            raise RuntimeError("The catalog is zstd-compressed; install the 'zstandard' package to read it")
+        if self._dictionary is None and self._dictionary_loader is not None:
+            with self._lock:
+                if self._dictionary is None:
+                    self._dictionary = self._dictionary_loader()
+                    self._dictionary_loader = None
+        if self._dictionary is None:
+            return None
+        return zstandard.ZstdCompressionDict(self._dictionary)
+
+    def decode(self, value, codec):
+        """Text of a stored column value written with `codec`."""
+        if value is None or isinstance(value, str) or not codec:
+            return value
+        if codec == CODEC_ZLIB:
+            return zlib.decompress(value).decode('utf-8')
+        if codec == CODEC_ZSTD:
+            decompressor = getattr(self._local, 'decompressor', None)
+            if decompressor is None:
+                dict_data = self._zstd_dict()
+                decompressor = (zstandard.ZstdDecompressor(dict_data=dict_data) if dict_data
+                                else zstandard.ZstdDecompressor())
+                self._local.decompressor = decompressor
+            return decompressor.decompress(value).decode('utf-8')
+        raise ValueError(f'Unknown content codec {codec}')
+
+    def encode(self, text, codec, level=None):
+        """Stored form of `text` under `codec` (BLOB for compressed codecs)."""
+        if text is None or codec == CODEC_PLAIN:
+            return text
+        data = text.encode('utf-8')
+        if codec == CODEC_ZLIB:
+            return zlib.compress(data, 9 if level is None else level)
+        if codec == CODEC_ZSTD:
+            compressor = getattr(self._local, 'compressor', None)
+            if compressor is None:
+                dict_data = self._zstd_dict()
+                level = 19 if level is None else level
+                compressor = (zstandard.ZstdCompressor(level=level, dict_data=dict_data) if dict_data
+                              else zstandard.ZstdCompressor(level=level))
+                self._local.compressor = compressor
+            return compressor.compress(data)
+        raise ValueError(f'Unknown content codec {codec}')
+
+
+def train_dictionary(samples, size=112 * 1024):
+    """Trains a zstd dictionary from a list of text samples; returns its bytes."""
+    if zstandard is None:
+        raise RuntimeError("Training a dictionary requires the 'zstandard' package")
+    data = [s.encode('utf-8') for s in samples if s]
+    return zstandard.train_dictionary(size, data).as_bytes()
@@ -0,0 +1,257 @@
+import argparse
+import os
+import sqlite3
+import time
+
+from codec import (CODEC_PLAIN, CODEC_ZLIB, CODEC_ZSTD, CODEC_NAMES, COMPRESSED_COLUMNS,
+                   ContentCodec, train_dictionary, zstandard)
+from search import build_external_search_index, build_standalone_search_index, drop_search_triggers
+from splitdb import catalog_db_path
+
+BATCH_SIZE = 500
+
+
+def format_size(size_bytes):
+    """Converts bytes to a human-readable format (KB, MB)."""
+    if size_bytes < 1024 * 1024:
+        return f"{size_bytes / 1024:.1f} KB"
+    return f"{size_bytes / (1024 * 1024):.1f} MB"
+
+
+def ensure_codec_schema(cursor):
+    """Adds terms_data.content_codec and the codec_dictionaries table if missing."""
+    cursor.execute("PRAGMA table_info(terms_data)")
+    if 'content_codec' not in [col[1] for col in cursor.fetchall()]:
+        cursor.execute("ALTER TABLE terms_data ADD COLUMN content_codec INTEGER DEFAULT 0")
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS codec_dictionaries (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            codec INTEGER NOT NULL,
+            dictionary BLOB NOT NULL,
+            created_at TEXT DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+
+def current_codec(cursor):
+    """ContentCodec able to decode what is stored right now (existing dictionary included)."""
+    try:
+        cursor.execute("SELECT dictionary FROM codec_dictionaries WHERE codec = ? ORDER BY id DESC LIMIT 1",
+                       (CODEC_ZSTD,))
+        row = cursor.fetchone()
+    except sqlite3.Error:
+        row = None
+    return ContentCodec(dictionary=row[0] if row else None)
+
+
+def sample_texts(cursor, decoder, limit):
+    """Decoded content columns of `limit` random terms, as a list of rows."""
+    cursor.execute(f"""
+        SELECT content_codec, {', '.join(COMPRESSED_COLUMNS)}
+        FROM terms_data ORDER BY RANDOM() LIMIT ?
+    """, (limit,))
+    return [[decoder.decode(value, row[0]) for value in row[1:]] for row in cursor.fetchall()]
+
+
+def decoded_search_rows(conn, codec):
+    """
+    Yields the terms_fts rows of every term with its text decoded. The
+    SELECT only starts on first iteration, i.e. after terms_fts was recreated
+    (SQLite refuses to drop a table while a statement is reading).
+    """
+    for rowid, term, subject, row_codec, definition, key_points, example in conn.execute(
+            "SELECT rowid, term, subject, content_codec, definition, keyPoints_str, example FROM terms_data"):
+        yield (rowid, term, subject, codec.decode(definition, row_codec), key_points,
+               codec.decode(example, row_codec))
+
+
+def benchmark(db_path, sample_size=1000, level=None):
+    """
+    Compares codecs on a random sample of terms without changing the database.
+    Prints stored size, ratio and per-term compress/decompress time.
+    """
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+    ensure_codec_schema(cursor)
+    conn.rollback()
+    decoder = current_codec(cursor)
+    rows = sample_texts(cursor, decoder, sample_size * 2)
+    conn.close()
+
+    # Train on one half and measure on the other, so the dictionary is not flattered
+    training, rows = rows[:len(rows) // 2], rows[len(rows) // 2:]
+    raw_bytes = sum(len(v.encode('utf-8')) for row in rows for v in row if v)
+    if not rows:
+        print("❌ terms_data is empty")
+        return []
+
+    candidates = [('zlib-6', CODEC_ZLIB, ContentCodec(), 6),
+                  ('zlib-9', CODEC_ZLIB, ContentCodec(), 9)]
+    if zstandard is not None:
+        dictionary = train_dictionary([v for row in training for v in row if v])
+        for lvl in (3, level or 19):
+            candidates.append((f'zstd-{lvl}', CODEC_ZSTD, ContentCodec(), lvl))
+            candidates.append((f'zstd-{lvl}+dict', CODEC_ZSTD, ContentCodec(dictionary=dictionary), lvl))
+    else:
+        print("⚠️  'zstandard' is not installed; only zlib is compared")
+
+    print(f"📊 Sample: {len(rows)} terms, {format_size(raw_bytes)} of content text\n")
+    print(f"| {'codec'.ljust(14)} | {'stored'.rjust(10)} | {'ratio'.rjust(6)} | {'compress/term'.rjust(13)} | {'decode/term'.rjust(11)} |")
+    print(f"|{'-' * 16}|{'-' * 12}|{'-' * 8}|{'-' * 15}|{'-' * 13}|")
+
+    results = []
+    for name, codec_id, codec, lvl in candidates:
+        start = time.perf_counter()
+        stored = [[codec.encode(v, codec_id, lvl) for v in row] for row in rows]
+        compress_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for row in stored:
+            for v in row:
+                codec.decode(v, codec_id)
+        decode_time = time.perf_counter() - start
+
+        stored_bytes = sum(len(v) for row in stored for v in row if v)
+        result = {
+            'codec': name,
+            'stored_bytes': stored_bytes,
+            'ratio': raw_bytes / stored_bytes if stored_bytes else 0,
+            'compress_us': compress_time / len(rows) * 1e6,
+            'decode_us': decode_time / len(rows) * 1e6
+        }
+        results.append(result)
+        print(f"| {name.ljust(14)} | {format_size(stored_bytes).rjust(10)} | {result['ratio']:6.2f} | "
+              f"{result['compress_us']:10.0f} us | {result['decode_us']:8.0f} us |")
+    return results
+
+
+def compress_catalog(db_path, codec_name='auto', level=None, vacuum=True, dict_samples=2000):
+    """
+    Rewrites the content columns of terms_data (definition, example and the
+    three QA/quiz JSON columns) as compressed BLOBs and records the codec in
+    terms_data.content_codec. A row whose compressed columns would not be
+    smaller than its text stays plain. Re-running with another codec
+    re-encodes rows that were compressed before. Rebuilds the search index
+    from the decoded text afterwards, since SQL triggers cannot read
+    compressed columns; codec 'plain' restores the trigger-synced index.
+    Run it with the app stopped: a running server keeps the old dictionary.
+    """
+    if not os.path.exists(db_path):
+        print(f"❌ Database not found at: {db_path}")
+        return False
+
+    if codec_name == 'auto':
+        codec_name = 'zstd' if zstandard is not None else 'zlib'
+    codec_id = {'plain': CODEC_PLAIN, 'zlib': CODEC_ZLIB, 'zstd': CODEC_ZSTD}[codec_name]
+    if codec_id == CODEC_ZSTD and zstandard is None:
+        print("❌ The 'zstandard' package is required for --codec zstd")
+        return False
+
+    size_before = os.path.getsize(db_path)
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+
+    try:
+        ensure_codec_schema(cursor)
+        # The sync triggers would copy compressed BLOBs into terms_fts
+        drop_search_triggers(cursor)
+        decoder = current_codec(cursor)
+
+        encoder = ContentCodec()
+        if codec_id == CODEC_ZSTD:
+            print(f"🔧 Training zstd dictionary on {dict_samples} terms...")
+            samples = sample_texts(cursor, decoder, dict_samples)
+            dictionary = train_dictionary([v for row in samples for v in row if v])
+            cursor.execute("INSERT INTO codec_dictionaries (codec, dictionary) VALUES (?, ?)",
+                           (CODEC_ZSTD, dictionary))
+            encoder = ContentCodec(dictionary=dictionary)
+        conn.commit()
+
+        print(f"🔧 Rewriting content columns with {codec_name}...")
+        cols = ', '.join(COMPRESSED_COLUMNS)
+        assignments = ', '.join(f'{c} = ?' for c in COMPRESSED_COLUMNS)
+        raw_bytes = stored_bytes = count = kept_plain = 0
+        last_rowid = 0
+        start = time.perf_counter()
+        while True:
+            cursor.execute(f"""
+                SELECT rowid, content_codec, {cols} FROM terms_data
+                WHERE rowid > ? ORDER BY rowid LIMIT ?
+            """, (last_rowid, BATCH_SIZE))
+            batch = cursor.fetchall()
+            if not batch:
+                break
+            updates = []
+            for row in batch:
+                texts = [decoder.decode(v, row[1]) for v in row[2:]]
+                stored = [encoder.encode(t, codec_id, level) for t in texts]
+                text_size = sum(len(t.encode('utf-8')) for t in texts if t)
+                stored_size = sum(len(v) if isinstance(v, bytes) else len(v.encode('utf-8'))
+                                  for v in stored if v)
+                row_codec = codec_id
+                if codec_id != CODEC_PLAIN and stored_size >= text_size:
+                    # Short rows can grow when compressed; keep them as TEXT
+                    stored, stored_size, row_codec = texts, text_size, CODEC_PLAIN
+                    kept_plain += 1
+                raw_bytes += text_size
+                stored_bytes += stored_size
+                updates.append((*stored, row_codec, row[0]))
+            cursor.executemany(f"UPDATE terms_data SET {assignments}, content_codec = ? WHERE rowid = ?",
+                               updates)
+            conn.commit()
+            count += len(batch)
+            last_rowid = batch[-1][0]
+            print(f"   {count} terms...", end='\r')
+        rewrite_time = time.perf_counter() - start
+        print(f"✅ Rewrote {count} terms in {rewrite_time:.1f}s")
+
+        # VACUUM may renumber terms_data rowids, so it must run before the
+        # search index (keyed by rowid) is rebuilt
+        if vacuum:
+            print("🔧 Reclaiming free pages (VACUUM)...")
+            conn.execute("VACUUM")
+
+        if codec_id == CODEC_PLAIN:
+            print("🔧 Restoring the trigger-synced search index...")
+            build_external_search_index(conn.cursor())
+        else:
+            print("🔧 Rebuilding search index from decoded text...")
+            build_standalone_search_index(conn.cursor(), decoded_search_rows(conn, encoder))
+        conn.commit()
+
+        size_after = os.path.getsize(db_path)
+        print("\n📋 Summary:")
+        print(f"   Codec: {CODEC_NAMES[codec_id]}")
+        if kept_plain:
+            print(f"   Kept as plain TEXT (no smaller compressed): {kept_plain} terms")
+        print(f"   Content text: {format_size(raw_bytes)} -> {format_size(stored_bytes)}"
+              f" ({raw_bytes / stored_bytes if stored_bytes else 0:.2f}x)")
+        print(f"   Database file: {format_size(size_before)} -> {format_size(size_after)}")
+        return True
+    except Exception as e:
+        print(f"❌ Compression failed: {e}")
+        conn.rollback()
+        return False
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Compress the content columns of terms_data')
+    parser.add_argument('--db', default=catalog_db_path(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'prism.sqlite')),
+                        help='catalog database (default: catalog.sqlite if split, else prism.sqlite)')
+    parser.add_argument('--codec', choices=['auto', 'zstd', 'zlib', 'plain'], default='auto',
+                        help="auto = zstd with a trained dictionary if 'zstandard' is installed, else zlib; "
+                             "plain = decompress back to TEXT")
+    parser.add_argument('--level', type=int, default=None, help='compression level')
+    parser.add_argument('--no-vacuum', action='store_true', help='skip VACUUM after rewriting')
+    parser.add_argument('--benchmark', action='store_true',
+                        help='only compare codecs on a sample; the database is not modified')
+    parser.add_argument('--sample', type=int, default=1000, help='terms sampled by --benchmark')
+    args = parser.parse_args()
+
+    if args.benchmark:
+        benchmark(args.db, args.sample, args.level)
+    else:
+        print("🚀 Compressing catalog content...\n")
+        compress_catalog(args.db, args.codec, args.level, vacuum=not args.no_vacuum)
@@ -0,0 +1,189 @@
+# dbpool.py
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+from splitdb import attach_catalog
+
+# Applied once to every pooled connection. journal_mode=WAL is persistent in
+# the file; the others are per-connection.
+PRAGMAS = (
+    ('journal_mode', 'WAL'),
+    ('synchronous', 'NORMAL'),     # durable at checkpoints; safe with WAL
+    ('cache_size', -16384),        # KiB, i.e. 16 MB of page cache per connection
+    ('mmap_size', 268435456),      # 256 MB memory-mapped reads
+    ('temp_store', 'MEMORY'),
+    ('busy_timeout', 5000)         # ms to wait for a writer instead of failing
+)
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(db_path, catalog_path=None):
+    """Returns the process-wide ConnectionPool for db_path (see ConnectionPool for catalog_path)."""
+    with _pools_lock:
+        pool = _pools.get(db_path)
+        if pool is None:
+            pool = ConnectionPool(db_path, catalog_path=catalog_path)
+            _pools[db_path] = pool
+        return pool
+
+
+def close_all_pools():
+    """Closes the idle connections of every pool. Called on shutdown."""
+    with _pools_lock:
+        pools = list(_pools.values())
+    for pool in pools:
+        pool.close()
+
+
+def connect(db_path, catalog_path=None):
+    """
+    Opens db_path read-write with PRAGMAS applied and the split catalog (if
+    any) attached. Fails instead of silently creating an empty database.
+    """
+    uri = Path(db_path).as_uri() + '?mode=rw'
+    conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+    try:
+        for name, value in PRAGMAS:
+            conn.execute(f"PRAGMA {name} = {value}")
+        if catalog_path and catalog_path != db_path:
+            attach_catalog(conn, catalog_path)
+    except sqlite3.Error:
+        conn.close()
+        raise
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+class PoolTimeout(sqlite3.Error):
+    """
+    No connection became free within the checkout timeout. Not an
+    OperationalError, so handlers for a database that cannot be opened
+    let it through.
+    """
+
+
+class ConnectionPool:
+    """
+    Thread-safe pool of configured SQLite connections.
+
+    Connections are opened lazily up to `max_size`, configured once with
+    PRAGMAS and handed out with row_factory = sqlite3.Row. release() rolls
+    back anything left uncommitted before the connection is reused; a
+    connection that fails to reset is discarded. A split-off catalog
+    (`catalog_path` other than db_path) is attached read-only to each one.
+    """
+
+    def __init__(self, db_path, max_size=16, timeout=10.0, catalog_path=None):
+        self.db_path = db_path
+        self.catalog_path = catalog_path
+        self.max_size = max_size
+        self.timeout = timeout
+        self._idle = []
+        self._size = 0
+        self._cond = threading.Condition()
+        self._closed = False
+        self.checkouts = 0
+        self.waits = 0
+        self.timeouts = 0
+        self.created = 0
+        self.discarded = 0
+        self.wait_time_total = 0.0
+        self.wait_time_max = 0.0
+
+    def acquire(self, timeout=None):
+        """
+        Checks out a connection, waiting up to `timeout` seconds (default:
+        the pool's) for one to be released. Raises PoolTimeout if none does,
+        or sqlite3.OperationalError if the database cannot be opened.
+        """
+        timeout = self.timeout if timeout is None else timeout
+        start = time.perf_counter()
+        waited = False
+        with self._cond:
+            while True:
+                if self._idle:
+                    conn = self._idle.pop()
+                    break
+                if self._size < self.max_size:
+                    # Reserve the slot, then connect outside the lock
+                    self._size += 1
+                    conn = None
+                    break
+                remaining = timeout - (time.perf_counter() - start)
+                if remaining <= 0:
+                    self.timeouts += 1
+                    raise PoolTimeout(f'No database connection free after {timeout:.1f}s '
+                                      f'({self.max_size} in use)')
+                waited = True
+                self._cond.wait(remaining)
+
+            wait = time.perf_counter() - start
+            self.checkouts += 1
+            if waited:
+                self.waits += 1
+            self.wait_time_total += wait
+            self.wait_time_max = max(self.wait_time_max, wait)
+
+        if conn is None:
+            try:
+                conn = connect(self.db_path, self.catalog_path)
+            except Exception:
+                with self._cond:
+                    self._size -= 1
+                    self._cond.notify()
+                raise
+            with self._cond:
+                self.created += 1
+        return conn
+
+    def release(self, conn):
+        """Returns a connection to the pool after resetting it."""
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+            conn.row_factory = sqlite3.Row
+            reusable = not self._closed
+        except sqlite3.Error:
+            reusable = False
+
+        with self._cond:
+            if reusable:
+                self._idle.append(conn)
+            else:
+                self._size -= 1
+                self.discarded += 1
+            self._cond.notify()
+        if not reusable:
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+
+    def close(self):
+        """Closes idle connections; ones still checked out close on release."""
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._size -= len(idle)
+        for conn in idle:
+            conn.close()
+
+    def metrics(self):
+        with self._cond:
+            return {
+                'size': self._size,
+                'idle': len(self._idle),
+                'in_use': self._size - len(self._idle),
+                'max_size': self.max_size,
+                'checkouts': self.checkouts,
+                'waits': self.waits,
+                'timeouts': self.timeouts,
+                'created': self.created,
+                'discarded': self.discarded,
+                'wait_ms_avg': round(self.wait_time_total / self.checkouts * 1000, 3) if self.checkouts else 0.0,
+                'wait_ms_max': round(self.wait_time_max * 1000, 3)
+            }
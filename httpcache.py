@@ -0,0 +1,156 @@
+# httpcache.py
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+from flask import Response, request
+from werkzeug.http import is_resource_modified
+
+from catalog import get_catalog
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def get_response_cache(db_path):
+    """Returns the process-wide ResponseCache for db_path."""
+    with _caches_lock:
+        cache = _caches.get(db_path)
+        if cache is None:
+            cache = ResponseCache()
+            _caches[db_path] = cache
+        return cache
+
+
+def serialize(data):
+    """Compact UTF-8 JSON bytes, as stored in the response cache."""
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def strong_etag(*parts):
+    """Strong entity tag (unquoted) over the given byte strings."""
+    digest = hashlib.sha1()
+    for part in parts:
+        digest.update(part)
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+def json_response(body, etag, cache_control='no-cache'):
+    """
+    JSON response for pre-serialized `body` carrying `etag`. Answers a
+    matching If-None-Match with an empty 304. 'no-cache' lets the browser
+    keep the body but makes it revalidate on every use.
+    """
+    response = Response(body, mimetype='application/json')
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = cache_control
+    return response.make_conditional(request)
+
+
+def catalog_response(db_path, key, build, cache_control='no-cache'):
+    """
+    Conditional JSON response for data derived only from terms_data.
+
+    The ETag combines the catalog version with `key` (the request path and
+    query), and Last-Modified is the time of the last catalog change. Both
+    are known before any data is built, so a revalidating client costs an
+    empty 304. Otherwise `build()` supplies the data, whose serialized body
+    is kept in the response cache until the catalog changes.
+    """
+    catalog = get_catalog(db_path)
+    # Validators before data: a rebuild in between only makes the tag older than the body
+    version_tag, last_modified = catalog.validators()
+    generation = catalog.current_generation()
+    etag = strong_etag(version_tag.encode('ascii'), key.encode('utf-8'))
+
+    response = Response(mimetype='application/json')
+    response.set_etag(etag)
+    if last_modified is not None:
+        response.last_modified = last_modified
+    response.headers['Cache-Control'] = cache_control
+    if not is_resource_modified(request.environ, etag=etag, last_modified=last_modified):
+        return response.make_conditional(request)
+
+    cache = get_response_cache(db_path)
+    cached = cache.get(('catalog', key), generation)
+    if cached is None:
+        cached = cache.put(('catalog', key), serialize(build()), generation)
+    response.set_data(cached[0])
+    return response
+
+
+class ResponseCache:
+    """
+    LRU cache of serialized response bodies with their ETags, bounded by
+    total body size. Entries are tagged with the catalog generation and the
+    whole cache is dropped when terms_data changes, like TermCache.
+    """
+
+    def __init__(self, max_bytes=32 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._generation = None
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def _check_generation(self, generation):
+        if generation != self._generation:
+            if self._entries:
+                self.invalidations += 1
+            self._entries.clear()
+            self.current_bytes = 0
+            self._generation = generation
+
+    def get(self, key, generation):
+        """(body, etag) cached for `key`, or None."""
+        with self._lock:
+            self._check_generation(generation)
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key, body, generation):
+        """Stores `body` under `key` and returns (body, etag)."""
+        entry = (body, strong_etag(body))
+        with self._lock:
+            self._check_generation(generation)
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.current_bytes -= len(old[0])
+            if len(body) <= self.max_bytes:
+                self._entries[key] = entry
+                self.current_bytes += len(body)
+                while self.current_bytes > self.max_bytes:
+                    _, (evicted, _) = self._entries.popitem(last=False)
+                    self.current_bytes -= len(evicted)
+                    self.evictions += 1
+        return entry
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self.current_bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations
+            }
@@ -0,0 +1,293 @@
+# maintenance.py
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from datetime import datetime
+
+from writer import get_writer, stop_all_writers
+
+TASKS = ('checkpoint', 'optimize', 'vacuum')
+
+# Seconds between runs of each task
+INTERVALS = {
+    'checkpoint': 60,
+    'optimize': 3600,
+    'vacuum': 900
+}
+
+# Rows kept in maintenance_log
+LOG_KEEP = 500
+
+_maintainers = {}
+_maintainers_lock = threading.Lock()
+
+
+def get_maintainer(db_path):
+    """Returns the process-wide Maintainer for db_path (its thread starts with start())."""
+    with _maintainers_lock:
+        maintainer = _maintainers.get(db_path)
+        if maintainer is None:
+            maintainer = Maintainer(db_path)
+            _maintainers[db_path] = maintainer
+        return maintainer
+
+
+def stop_all_maintainers():
+    """Stops every maintainer's thread (a task in progress finishes first). Called on shutdown."""
+    with _maintainers_lock:
+        maintainers = list(_maintainers.values())
+    for maintainer in maintainers:
+        maintainer.stop()
+
+
+def _table_row_counts(conn):
+    """{table: rows} for every ordinary table of the main database."""
+    tables = [row[0] for row in conn.execute("""
+        SELECT name FROM main.sqlite_master
+        WHERE type = 'table' AND name NOT LIKE 'sqlite_%' AND sql NOT LIKE 'CREATE VIRTUAL%'
+    """)]
+    return {table: conn.execute(f'SELECT COUNT(*) FROM main."{table}"').fetchone()[0] for table in tables}
+
+
+def _analyzed_row_counts(conn):
+    """{table: rows} as recorded by the last ANALYZE ({} if it never ran)."""
+    exists = conn.execute("SELECT 1 FROM main.sqlite_master WHERE name = 'sqlite_stat1'").fetchone()
+    if not exists:
+        return {}
+    counts = {}
+    for table, stat in conn.execute("SELECT tbl, stat FROM main.sqlite_stat1"):
+        if stat:
+            counts[table] = max(counts.get(table, 0), int(str(stat).split()[0]))
+    return counts
+
+
+class Maintainer:
+    """
+    Idle-time upkeep of db_path, run on a background thread:
+
+    checkpoint  PRAGMA wal_checkpoint(PASSIVE): copies the WAL back into the
+                database without waiting for (or blocking) readers
+    optimize    PRAGMA optimize, then ANALYZE for every table whose row
+                count in sqlite_stat1 is missing or off by more than
+                `stale_ratio`, so the query planner has statistics
+    vacuum      PRAGMA incremental_vacuum, `vacuum_step` pages at a time,
+                returning the pages of deleted rows to the file system
+
+    Incremental vacuum needs auto_vacuum=INCREMENTAL, which only a full
+    VACUUM can switch on. The vacuum task does that once, if the file is
+    no larger than `convert_max_bytes`; bigger files are left to
+    `python maintenance.py --convert` with the app stopped.
+
+    A task runs when its interval (INTERVALS) has passed and the writer has
+    been idle for `idle_after` seconds. It starts no new step after
+    `budget` seconds. Tasks run on the writer's connection between batches
+    (DatabaseWriter.run_exclusive), so they never compete with the app's
+    writes for the lock. Every run is recorded in maintenance_log. A split
+    catalog.sqlite is read-only and is not maintained here.
+    """
+
+    def __init__(self, db_path, intervals=None, idle_after=2.0, budget=0.5, poll_interval=5.0,
+                 stale_ratio=2.0, analysis_limit=1000, vacuum_step=128, convert_max_bytes=32 * 1024 * 1024):
+        self.db_path = db_path
+        self.intervals = dict(INTERVALS, **(intervals or {}))
+        self.idle_after = idle_after
+        self.budget = budget
+        self.poll_interval = poll_interval
+        self.stale_ratio = stale_ratio
+        self.analysis_limit = analysis_limit
+        self.vacuum_step = vacuum_step
+        self.convert_max_bytes = convert_max_bytes
+        self._cond = threading.Condition()
+        # One pass at a time (background thread or run() from the admin endpoint)
+        self._run_lock = threading.Lock()
+        self._thread = None
+        self._stopping = False
+        self._last_run = {}
+        self.reports = {}
+
+    def start(self):
+        """Starts the background thread. Tasks first come due one interval from now."""
+        with self._cond:
+            if self._thread is None and not self._stopping:
+                now = time.monotonic()
+                for task in TASKS:
+                    self._last_run.setdefault(task, now)
+                self._thread = threading.Thread(target=self._loop, name='prism-maintenance', daemon=True)
+                self._thread.start()
+
+    def due(self):
+        """Tasks whose interval has passed."""
+        now = time.monotonic()
+        return [task for task in TASKS if now - self._last_run.get(task, 0) >= self.intervals[task]]
+
+    def run(self, tasks=TASKS):
+        """Runs `tasks` now, in TASKS order, and returns their reports."""
+        unknown = set(tasks) - set(TASKS)
+        if unknown:
+            raise ValueError(f"Unknown maintenance task(s): {', '.join(sorted(unknown))}")
+        writer = get_writer(self.db_path)
+        reports = []
+        with self._run_lock:
+            for task in TASKS:
+                if task not in tasks:
+                    continue
+                started_at = datetime.now().isoformat()
+                start = time.perf_counter()
+                try:
+                    details = writer.run_exclusive(getattr(self, f'_{task}'))
+                    status = 'skipped' if details.pop('skipped', False) else 'ok'
+                except sqlite3.Error as e:
+                    details, status = {'error': str(e)}, 'error'
+                report = {
+                    'task': task,
+                    'started_at': started_at,
+                    'duration_ms': round((time.perf_counter() - start) * 1000, 3),
+                    'status': status,
+                    'details': details
+                }
+                self._last_run[task] = time.monotonic()
+                self.reports[task] = report
+                reports.append(report)
+            self._log(writer, reports)
+        return reports
+
+    def status(self):
+        """Latest report and seconds until next due, per task (this process only)."""
+        now = time.monotonic()
+        return {
+            'running': self._thread is not None,
+            'tasks': {task: {
+                'interval_s': self.intervals[task],
+                'due_in_s': round(max(0.0, self.intervals[task] - (now - self._last_run[task])), 1)
+                            if task in self._last_run else None,
+                'last': self.reports.get(task)
+            } for task in TASKS}
+        }
+
+    def stop(self):
+        with self._cond:
+            self._stopping = True
+            thread = self._thread
+            self._cond.notify()
+        if thread is not None:
+            thread.join(timeout=10)
+
+    # --- internal -----------------------------------------------------
+
+    def _loop(self):
+        writer = get_writer(self.db_path)
+        while True:
+            with self._cond:
+                if not self._stopping:
+                    self._cond.wait(self.poll_interval)
+                if self._stopping:
+                    return
+            tasks = self.due()
+            idle = writer.idle_seconds()
+            if not tasks or (idle is not None and idle < self.idle_after):
+                continue
+            try:
+                self.run(tasks)
+            except Exception as e:
+                print(f"WARNING: Database maintenance failed: {e}")
+
+    def _log(self, writer, reports):
+        def insert(cursor):
+            cursor.executemany("""
+                INSERT INTO maintenance_log (task, started_at, duration_ms, status, details_json)
+                VALUES (?, ?, ?, ?, ?)
+            """, [(r['task'], r['started_at'], r['duration_ms'], r['status'], json.dumps(r['details']))
+                  for r in reports])
+            cursor.execute("DELETE FROM maintenance_log WHERE id <= (SELECT MAX(id) FROM maintenance_log) - ?",
+                           (LOG_KEEP,))
+        try:
+            writer.write(insert)
+        except sqlite3.Error as e:
+            print(f"WARNING: Could not record maintenance run: {e}")
+
+    def _checkpoint(self, conn):
+        busy, wal_pages, checkpointed = conn.execute("PRAGMA wal_checkpoint(PASSIVE)").fetchone()
+        if wal_pages < 0:
+            return {'skipped': True, 'reason': 'not in WAL mode'}
+        return {'wal_pages': wal_pages, 'checkpointed': checkpointed, 'blocked': bool(busy)}
+
+    def _optimize(self, conn):
+        deadline = time.perf_counter() + self.budget
+        conn.execute(f"PRAGMA analysis_limit = {int(self.analysis_limit)}")
+        # main only: an attached catalog.sqlite is read-only
+        conn.execute("PRAGMA main.optimize").fetchall()
+
+        analyzed = _analyzed_row_counts(conn)
+        stale = []
+        for table, rows in _table_row_counts(conn).items():
+            recorded = analyzed.get(table)
+            if recorded is None:
+                if rows:
+                    stale.append(table)
+            elif max(rows, 1) / max(recorded, 1) > self.stale_ratio or \
+                    max(recorded, 1) / max(rows, 1) > self.stale_ratio:
+                stale.append(table)
+
+        done = []
+        for table in stale:
+            if time.perf_counter() > deadline:
+                break
+            conn.execute(f'ANALYZE main."{table}"')
+            done.append(table)
+        return {'analyzed': done, 'deferred': stale[len(done):]}
+
+    def _vacuum(self, conn):
+        mode = conn.execute("PRAGMA auto_vacuum").fetchone()[0]
+        page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+        if mode != 2:
+            size = conn.execute("PRAGMA page_count").fetchone()[0] * page_size
+            if self.convert_max_bytes is not None and size > self.convert_max_bytes:
+                return {'skipped': True,
+                        'reason': f'auto_vacuum is off and the file is {size // 1024 // 1024} MB; '
+                                  f'run maintenance.py --convert with the app stopped'}
+            # Takes effect with the VACUUM, which also drops every free page
+            conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+            conn.execute("VACUUM")
+            after = conn.execute("PRAGMA page_count").fetchone()[0] * page_size
+            return {'converted': True, 'bytes_before': size, 'bytes_after': after}
+
+        deadline = time.perf_counter() + self.budget
+        free = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        freed = 0
+        while free and time.perf_counter() < deadline:
+            conn.execute(f"PRAGMA incremental_vacuum({int(self.vacuum_step)})").fetchall()
+            remaining = conn.execute("PRAGMA freelist_count").fetchone()[0]
+            freed += free - remaining
+            free = remaining
+        return {'freed_pages': freed, 'freed_bytes': freed * page_size, 'free_pages_left': free}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Run database maintenance tasks now')
+    parser.add_argument('--db', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'prism.sqlite'))
+    parser.add_argument('--task', action='append', choices=TASKS,
+                        help='task to run (repeatable; default: all)')
+    parser.add_argument('--convert', action='store_true',
+                        help='switch on auto_vacuum=INCREMENTAL whatever the file size (app must be stopped)')
+    parser.add_argument('--budget', type=float, default=30.0, help='seconds each task may spend')
+    args = parser.parse_args()
+
+    if not os.path.exists(args.db):
+        print(f"❌ Database not found at: {args.db}")
+        sys.exit(1)
+
+    print(f"🔧 Maintaining {args.db}...\n")
+    options = {'convert_max_bytes': None} if args.convert else {}
+    maintainer = Maintainer(args.db, budget=args.budget, **options)
+    try:
+        reports = maintainer.run(args.task or TASKS)
+    finally:
+        stop_all_writers()
+    for report in reports:
+        icon = {'ok': '✅', 'skipped': '📋', 'error': '❌'}[report['status']]
+        print(f"{icon} {report['task']:10} {report['duration_ms']:9.1f} ms  {json.dumps(report['details'])}")
+    sys.exit(1 if any(r['status'] == 'error' for r in reports) else 0)
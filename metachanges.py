@@ -0,0 +1,109 @@
+# metachanges.py
+
+# Fields of user_term_meta a client mirror holds (the /api/meta/all row), with
+# {row} standing for the row (new/old in triggers).
+SYNCED = {
+    'favorite': "{row}.favorite",
+    'bookmark': "{row}.bookmark",
+    'difficulty': "{row}.difficulty",
+    'rating': "{row}.rating",
+    'notes': "CASE WHEN {row}.notes = '' THEN 0 ELSE 1 END"
+}
+# Further fields whose changes are logged because the bitmap index filters on
+# them (bitmapindex.DIMENSIONS), so its per-user bitmaps go stale with them
+FILTERED = {
+    'has_notes': "{row}.notes IS NOT NULL AND {row}.notes != ''",
+    'important_level': "{row}.important_level",
+    'read_status': "{row}.read_status"
+}
+# Writes that change none of these (last_viewed, notes text) are not logged
+LOGGED = {**SYNCED, **FILTERED}
+
+# Columns the LOGGED fields are computed from
+_LOGGED_COLUMNS = ('favorite', 'bookmark', 'difficulty', 'rating', 'notes', 'important_level', 'read_status')
+
+_BUMP = "UPDATE meta_change_version SET version = version + 1;"
+
+
+def _mark(row, deleted, when=''):
+    """Stamps (row.user_id, row.term_id) with the current version, as a tombstone if `deleted`."""
+    return f"""
+        INSERT INTO user_meta_changes (user_id, term_id, version, deleted)
+        SELECT {row}.user_id, {row}.term_id, (SELECT version FROM meta_change_version), {deleted}
+        WHERE {row}.user_id IS NOT NULL {when}
+        ON CONFLICT(user_id, term_id) DO UPDATE SET version = excluded.version, deleted = excluded.deleted;
+    """
+
+
+def ensure_meta_changes(cursor):
+    """
+    Creates user_meta_changes, the version at which each (user_id, term_id)
+    row of user_term_meta last changed, and the triggers that stamp it from
+    the meta_change_version counter. A deleted row keeps its entry as a
+    tombstone (deleted = 1) until the pair is written again, so there is at
+    most one entry per pair.
+
+    Every change takes the next version, so versions are unique and a client
+    that has seen version N needs only the entries above N (some may leave its
+    SYNCED fields as they were). The bitmap index compares a user's latest
+    version with the one its bitmaps were built at. Rows present on first
+    creation are numbered 1..n.
+    """
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'meta_change_version'")
+    exists = cursor.fetchone() is not None
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS meta_change_version (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            version INTEGER NOT NULL
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS user_meta_changes (
+            user_id TEXT NOT NULL,
+            term_id INTEGER NOT NULL,
+            version INTEGER NOT NULL,
+            deleted INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (user_id, term_id)
+        ) WITHOUT ROWID
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_user_meta_changes_version ON user_meta_changes(version)")
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_user_meta_changes_user_version
+        ON user_meta_changes(user_id, version)
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS user_meta_changes_insert AFTER INSERT ON user_term_meta
+        BEGIN {_BUMP} {_mark('new', 0)} END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS user_meta_changes_delete AFTER DELETE ON user_term_meta
+        BEGIN {_BUMP} {_mark('old', 1)} END
+    """)
+    moved = "old.user_id IS NOT new.user_id OR old.term_id IS NOT new.term_id"
+    changed = ' OR '.join([moved] + [
+        f"({e.format(row='old')}) IS NOT ({e.format(row='new')})" for e in LOGGED.values()])
+    # A row moved to another user or term leaves a tombstone at its old key
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS user_meta_changes_update
+        AFTER UPDATE OF user_id, term_id, {', '.join(_LOGGED_COLUMNS)} ON user_term_meta
+        WHEN {changed}
+        BEGIN
+            UPDATE meta_change_version SET version = version + 1 WHERE {moved};
+            {_mark('old', 1, f'AND ({moved})')}
+            {_BUMP} {_mark('new', 0)}
+        END
+    """)
+    if not exists:
+        cursor.execute("""
+            INSERT INTO user_meta_changes (user_id, term_id, version, deleted)
+            SELECT user_id, term_id, ROW_NUMBER() OVER (ORDER BY id), 0
+            FROM user_term_meta WHERE user_id IS NOT NULL
+        """)
+        cursor.execute("INSERT INTO meta_change_version (id, version) SELECT 1, COUNT(*) FROM user_meta_changes")
+
+
+def current_version(cursor):
+    """The version of the latest change (0 before any)."""
+    cursor.execute("SELECT version FROM meta_change_version WHERE id = 1")
+    row = cursor.fetchone()
+    return row[0] if row else 0
@@ -0,0 +1,145 @@
+# metacounters.py
+import argparse
+import os
+import sqlite3
+import sys
+
+from writer import get_writer, stop_all_writers
+
+# Counted dimensions of user_term_meta: name -> value expression, with {row}
+# standing for the row (new/old in triggers). Rows where it is NULL are not counted.
+DIMENSIONS = {
+    'notes': "CASE WHEN {row}.notes != '' THEN 'with' END",
+    'difficulty': "CAST({row}.difficulty AS TEXT)",
+    'rating': "CAST({row}.rating AS TEXT)",
+    'important_level': "CAST({row}.important_level AS TEXT)"
+}
+
+# Columns whose change moves a counter
+_COUNTED_COLUMNS = ('user_id', 'notes', 'difficulty', 'rating', 'important_level')
+
+
+def _value(dimension, row):
+    return DIMENSIONS[dimension].format(row=row)
+
+
+def _increment(dimension, row):
+    value = _value(dimension, row)
+    return f"""
+        INSERT INTO user_meta_counters (user_id, dimension, value, count)
+        SELECT {row}.user_id, '{dimension}', {value}, 1
+        WHERE {row}.user_id IS NOT NULL AND {value} IS NOT NULL
+        ON CONFLICT(user_id, dimension, value) DO UPDATE SET count = count + 1;
+    """
+
+
+def _decrement(dimension, row):
+    return f"""
+        UPDATE user_meta_counters SET count = count - 1
+        WHERE user_id = {row}.user_id AND dimension = '{dimension}' AND value = {_value(dimension, row)};
+    """
+
+
+def ensure_meta_counters(cursor):
+    """
+    Creates user_meta_counters, the number of user_term_meta rows per
+    (user_id, dimension, value), and the triggers that keep it exact. The
+    counters are filled on first creation only.
+
+    Rows that INSERT OR REPLACE deletes to make room do not fire the delete
+    trigger (unless PRAGMA recursive_triggers is on), so the app writes
+    user_term_meta with upserts. After changes made by other tools, run
+    `python metacounters.py` to recompute the counters.
+    """
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'user_meta_counters'")
+    exists = cursor.fetchone() is not None
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS user_meta_counters (
+            user_id TEXT NOT NULL,
+            dimension TEXT NOT NULL,
+            value TEXT NOT NULL,
+            count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (user_id, dimension, value)
+        ) WITHOUT ROWID
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS user_meta_counters_insert AFTER INSERT ON user_term_meta
+        BEGIN
+            {''.join(_increment(dimension, 'new') for dimension in DIMENSIONS)}
+        END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS user_meta_counters_delete AFTER DELETE ON user_term_meta
+        BEGIN
+            {''.join(_decrement(dimension, 'old') for dimension in DIMENSIONS)}
+        END
+    """)
+    # One trigger per dimension, so writes that leave it alone (last_viewed, notes text) skip it
+    for dimension in DIMENSIONS:
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS user_meta_counters_update_{dimension}
+            AFTER UPDATE OF {', '.join(_COUNTED_COLUMNS)} ON user_term_meta
+            WHEN old.user_id IS NOT new.user_id OR {_value(dimension, 'old')} IS NOT {_value(dimension, 'new')}
+            BEGIN
+                {_decrement(dimension, 'old')}
+                {_increment(dimension, 'new')}
+            END
+        """)
+    if not exists:
+        rebuild_meta_counters(cursor)
+
+
+def _recount_sql():
+    return ' UNION ALL '.join(f"""
+        SELECT user_id, '{dimension}' AS dimension, {_value(dimension, 'm')} AS value, COUNT(*) AS count
+        FROM user_term_meta m
+        WHERE user_id IS NOT NULL AND {_value(dimension, 'm')} IS NOT NULL
+        GROUP BY user_id, 3
+    """ for dimension in DIMENSIONS)
+
+
+def rebuild_meta_counters(cursor):
+    """Recomputes every counter from user_term_meta. Returns the number of counters."""
+    cursor.execute("DELETE FROM user_meta_counters")
+    cursor.execute(f"INSERT INTO user_meta_counters (user_id, dimension, value, count) {_recount_sql()}")
+    return cursor.rowcount
+
+
+def check_meta_counters(cursor):
+    """[(user_id, dimension, value, stored, actual)] for every counter that is off."""
+    actual = {row[:3]: row[3] for row in cursor.execute(_recount_sql())}
+    stored = {row[:3]: row[3] for row in cursor.execute(
+        "SELECT user_id, dimension, value, count FROM user_meta_counters")}
+    return sorted((*key, stored.get(key, 0), actual.get(key, 0))
+                  for key in actual.keys() | stored.keys()
+                  if stored.get(key, 0) != actual.get(key, 0))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Recompute the user_meta_counters table from user_term_meta')
+    parser.add_argument('--db', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'prism.sqlite'))
+    parser.add_argument('--check', action='store_true', help='only report counters that are off')
+    args = parser.parse_args()
+
+    if not os.path.exists(args.db):
+        print(f"❌ Database not found at: {args.db}")
+        sys.exit(1)
+
+    conn = sqlite3.connect(args.db)
+    try:
+        drift = check_meta_counters(conn.cursor())
+    finally:
+        conn.close()
+    for user_id, dimension, value, stored, actual in drift:
+        print(f"📋 {user_id} {dimension}={value}: stored {stored}, actual {actual}")
+    if args.check:
+        print(f"{'❌' if drift else '✅'} {len(drift)} counter(s) off")
+        sys.exit(1 if drift else 0)
+
+    print(f"🔧 Rebuilding counters in {args.db}...")
+    try:
+        # One transaction under the write lock: a running app's writes wait for it
+        counters = get_writer(args.db).write(rebuild_meta_counters)
+    finally:
+        stop_all_writers()
+    print(f"✅ {counters} counter(s) rebuilt ({len(drift)} were off)")
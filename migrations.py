@@ -0,0 +1,584 @@
+# migrations.py
+import json
+import re
+import sqlite3
+
+from metachanges import ensure_meta_changes
+from metacounters import ensure_meta_counters
+from search import ensure_search_index
+from splitdb import attach_catalog, catalog_db_path
+from userstats import ensure_user_stats
+
+# Which database file a migration belongs to. Both live in prism.sqlite until
+# splitdb.py moves the catalog out; after that each file runs its own steps.
+SCOPE_USER = 'user'
+SCOPE_CATALOG = 'catalog'
+ALL_SCOPES = (SCOPE_USER, SCOPE_CATALOG)
+
+
+class MigrationBlocked(sqlite3.Error):
+    """A user-state step needs the attached catalog migrated first (run migdb.py)."""
+
+
+def _columns(cursor, table):
+    cursor.execute(f'PRAGMA table_info("{table}")')
+    return [col[1] for col in cursor.fetchall()]
+
+
+def _add_column(cursor, table, column, declaration):
+    """ALTER TABLE ... ADD COLUMN unless the column is already there."""
+    columns = _columns(cursor, table)
+    if columns and column not in columns:
+        cursor.execute(f'ALTER TABLE "{table}" ADD COLUMN {column} {declaration}')
+
+
+def _column_definition(name, declared_type, notnull, default):
+    definition = f'"{name}" {declared_type}'.rstrip()
+    if notnull:
+        definition += ' NOT NULL'
+    if default is not None:
+        literal = re.fullmatch(r"'.*'|[-+]?[\d.]+|NULL|CURRENT_\w+|\(.*\)", default, re.DOTALL | re.IGNORECASE)
+        definition += f' DEFAULT {default}' if literal else f' DEFAULT ({default})'
+    return definition
+
+
+def _rebuild_table(cursor, table, definitions, copy_sql, rename=None):
+    """
+    Replaces `table` with one created from `definitions`, filled by copy_sql
+    (an INSERT INTO "{table}_new" ...). Its indexes and triggers are
+    recreated, with `rename` = (old column, new column) applied to them.
+    """
+    dependents = [sql for (sql,) in cursor.execute("""
+        SELECT sql FROM sqlite_master
+        WHERE tbl_name = ? AND type IN ('index', 'trigger') AND sql IS NOT NULL
+    """, (table,)).fetchall()]
+    cursor.execute(f'CREATE TABLE "{table}_new" (\n    ' + ',\n    '.join(definitions) + '\n)')
+    cursor.execute(copy_sql)
+    cursor.execute(f'DROP TABLE "{table}"')
+    cursor.execute(f'ALTER TABLE "{table}_new" RENAME TO "{table}"')
+    for sql in dependents:
+        if rename:
+            # Only after ON: the index name itself stays
+            head, on, tail = re.split(r'(\bON\b)', sql, maxsplit=1, flags=re.IGNORECASE)
+            sql = head + on + re.sub(rf'\b{rename[0]}\b', rename[1], tail)
+        cursor.execute(sql)
+
+
+# --- Migration steps ------------------------------------------------------
+# Every step must be idempotent: databases created before this module have
+# user_version 0 but already contain some (or all) of the schema.
+
+def _create_user_tables(cursor):
+    """User-state tables as they exist in deployed databases"""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS user_term_meta (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            term TEXT NOT NULL,
+            user_id TEXT DEFAULT 'local',
+            favorite INTEGER DEFAULT 0,
+            bookmark INTEGER DEFAULT 0,
+            difficulty TEXT DEFAULT 'unknown',
+            rating INTEGER DEFAULT 0,
+            read_status TEXT DEFAULT 'to-read',
+            personal_tags TEXT DEFAULT '',
+            notes TEXT DEFAULT '',
+            last_viewed TIMESTAMP,
+            important_level TEXT DEFAULT 'none',
+            UNIQUE(term, user_id)
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS saved_tests (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT,
+            description TEXT,
+            creator TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            config_json TEXT
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS test_questions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            test_id INTEGER,
+            term TEXT,
+            question_json TEXT,
+            seq INTEGER,
+            FOREIGN KEY(test_id) REFERENCES saved_tests(id)
+        )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_test_questions_test_id ON test_questions(test_id)")
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS test_attempts (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            test_id INTEGER,
+            user_id TEXT,
+            started_at TIMESTAMP,
+            finished_at TIMESTAMP,
+            answers_json TEXT,
+            score REAL,
+            status TEXT DEFAULT 'in-progress',
+            FOREIGN KEY(test_id) REFERENCES saved_tests(id)
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS user_collections (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id TEXT DEFAULT 'local',
+            title TEXT,
+            description TEXT,
+            term_keys TEXT,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS collection_terms (
+            collection_id INTEGER,
+            term TEXT NOT NULL,
+            FOREIGN KEY(collection_id) REFERENCES user_collections(id) ON DELETE CASCADE,
+            UNIQUE(collection_id, term)
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS user_preferences (
+            user_id TEXT NOT NULL DEFAULT 'local',
+            preference_key TEXT NOT NULL,
+            preference_value TEXT NOT NULL,
+            updated_at TEXT NOT NULL,
+            PRIMARY KEY (user_id, preference_key)
+        )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_preferences_user ON user_preferences(user_id)")
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS user_recent_terms (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id TEXT NOT NULL DEFAULT 'local',
+            term TEXT NOT NULL,
+            subject TEXT,
+            viewed_at TEXT NOT NULL
+        )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_recent_terms_user_time ON user_recent_terms(user_id, viewed_at DESC)")
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS user_activity_log (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id TEXT DEFAULT 'local',
+            event_type TEXT NOT NULL,
+            event_subtype TEXT,
+            term_key TEXT,
+            subject TEXT,
+            payload TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_activity_user_time ON user_activity_log(user_id, created_at)")
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS term_view_aggregates (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id TEXT DEFAULT 'local',
+            term_key TEXT NOT NULL,
+            views INTEGER DEFAULT 0,
+            last_viewed TIMESTAMP,
+            total_time_ms INTEGER DEFAULT 0,
+            UNIQUE(user_id, term_key)
+        )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_term_aggregate ON term_view_aggregates(user_id, views)")
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS subject_view_aggregates (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id TEXT DEFAULT 'local',
+            subject TEXT NOT NULL,
+            views INTEGER DEFAULT 0,
+            total_time_ms INTEGER DEFAULT 0,
+            last_viewed TIMESTAMP,
+            UNIQUE(user_id, subject)
+        )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_subject_aggregate ON subject_view_aggregates(user_id, views)")
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS search_logs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id TEXT DEFAULT 'local',
+            query TEXT NOT NULL,
+            results_count INTEGER,
+            clicked_term TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_search_user_time ON search_logs(user_id, created_at)")
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS homework (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id TEXT DEFAULT 'local',
+            term TEXT NOT NULL,
+            due_date DATE,
+            notes TEXT,
+            added_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            name TEXT,
+            config_json TEXT
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS term_history (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id TEXT DEFAULT 'local',
+            term TEXT NOT NULL,
+            subject TEXT,
+            action TEXT,
+            details TEXT,
+            timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS user_sessions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id TEXT DEFAULT 'local',
+            session_token TEXT,
+            started_at TIMESTAMP,
+            ended_at TIMESTAMP,
+            duration_seconds INTEGER,
+            device_info TEXT,
+            synced INTEGER DEFAULT 0
+        )
+    """)
+
+
+def _add_user_columns(cursor):
+    """Columns that were added to deployed databases by hand or by init_db"""
+    _add_column(cursor, 'user_term_meta', 'important_level', "TEXT DEFAULT 'none'")
+    try:
+        _add_column(cursor, 'user_collections', 'created_at',
+                    "TIMESTAMP DEFAULT (STRFTIME('%Y-%m-%dT%H:%M:%f', 'now'))")
+    except sqlite3.OperationalError:
+        # SQLite only accepts a non-constant default while the table is empty
+        _add_column(cursor, 'user_collections', 'created_at', "TIMESTAMP")
+    cursor.execute("""
+        UPDATE user_collections SET created_at = COALESCE(updated_at, STRFTIME('%Y-%m-%dT%H:%M:%f', 'now'))
+        WHERE created_at IS NULL
+    """)
+    # activity.py names collections by 'name'; older databases only had 'title'
+    _add_column(cursor, 'user_collections', 'name', "TEXT")
+    cursor.execute("UPDATE user_collections SET name = title WHERE name IS NULL AND title IS NOT NULL")
+
+
+def _unify_user_preferences(cursor):
+    """
+    init_db and migdb.py used to create two different user_preferences
+    tables. Rebuilds the init_db variant (surrogate id, no updated_at) into
+    the migdb one that activity.py writes to.
+    """
+    columns = _columns(cursor, 'user_preferences')
+    if 'updated_at' in columns and 'id' not in columns:
+        return
+    cursor.execute("ALTER TABLE user_preferences RENAME TO user_preferences_old")
+    cursor.execute("""
+        CREATE TABLE user_preferences (
+            user_id TEXT NOT NULL DEFAULT 'local',
+            preference_key TEXT NOT NULL,
+            preference_value TEXT NOT NULL,
+            updated_at TEXT NOT NULL,
+            PRIMARY KEY (user_id, preference_key)
+        )
+    """)
+    updated_at = 'updated_at' if 'updated_at' in columns else 'NULL'
+    cursor.execute(f"""
+        INSERT OR REPLACE INTO user_preferences (user_id, preference_key, preference_value, updated_at)
+        SELECT COALESCE(user_id, 'local'), preference_key, COALESCE(preference_value, ''),
+               COALESCE({updated_at}, STRFTIME('%Y-%m-%dT%H:%M:%f', 'now'))
+        FROM user_preferences_old WHERE preference_key IS NOT NULL
+    """)
+    cursor.execute("DROP TABLE user_preferences_old")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_preferences_user ON user_preferences(user_id)")
+
+
+def _create_query_indexes(cursor):
+    """
+    Indexes for the hot user-state queries (checked by check_query_plans.py).
+    Each one lets its query SEARCH instead of SCAN, and carries the ORDER BY
+    columns so the rows come out sorted without a temp B-tree.
+    """
+    # Deployed databases have single-column versions of these; replaced by
+    # (flag, term) so the favorites/bookmarks lists come out sorted
+    for flag in ('favorite', 'bookmark'):
+        cursor.execute(f"DROP INDEX IF EXISTS idx_user_term_meta_{flag}")
+        cursor.execute(f"CREATE INDEX idx_user_term_meta_{flag} ON user_term_meta({flag}, term)")
+    for column in ('difficulty', 'rating', 'important_level'):
+        cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_user_term_meta_{column} ON user_term_meta({column}, term)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_user_term_meta_user_term ON user_term_meta(user_id, term)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_user_term_meta_user_rating ON user_term_meta(user_id, rating, term)")
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_user_term_meta_user_important
+        ON user_term_meta(user_id, important_level, term)
+    """)
+    # Partial indexes: only the rows the "with notes" / "recently viewed" queries can match
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_user_term_meta_notes ON user_term_meta(term) WHERE notes != ''")
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_user_term_meta_viewed
+        ON user_term_meta(last_viewed) WHERE last_viewed IS NOT NULL
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_saved_tests_created ON saved_tests(created_at)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_collections_user_created ON user_collections(user_id, created_at)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_collections_user_name ON user_collections(user_id, name)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_search_user_query ON search_logs(user_id, query, clicked_term)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_homework_user_due ON homework(user_id, due_date, added_at DESC)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_sessions_token ON user_sessions(session_token)")
+
+
+def _create_catalog_version(cursor):
+    """
+    Catalog version counter, bumped by triggers whenever terms_data changes.
+    The in-memory catalog index compares it to decide when to rebuild;
+    updated_at feeds the Last-Modified header of the catalog endpoints.
+    """
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS catalog_version (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            version INTEGER NOT NULL DEFAULT 0,
+            updated_at TEXT
+        )
+    """)
+    cursor.execute("INSERT OR IGNORE INTO catalog_version (id, version) VALUES (1, 0)")
+    if 'updated_at' not in _columns(cursor, 'catalog_version'):
+        cursor.execute("ALTER TABLE catalog_version ADD COLUMN updated_at TEXT")
+    cursor.execute("""
+        UPDATE catalog_version SET updated_at = STRFTIME('%Y-%m-%dT%H:%M:%S', 'now')
+        WHERE id = 1 AND updated_at IS NULL
+    """)
+    for event in ('INSERT', 'UPDATE', 'DELETE'):
+        # Recreated: earlier versions did not stamp updated_at
+        cursor.execute(f"DROP TRIGGER IF EXISTS terms_data_version_{event.lower()}")
+        cursor.execute(f"""
+            CREATE TRIGGER terms_data_version_{event.lower()}
+            AFTER {event} ON terms_data
+            BEGIN
+                UPDATE catalog_version
+                SET version = version + 1, updated_at = STRFTIME('%Y-%m-%dT%H:%M:%S', 'now')
+                WHERE id = 1;
+            END
+        """)
+
+
+def _add_content_codec(cursor):
+    """Codec of the compressed content columns (see compress_catalog.py); 0 = plain TEXT"""
+    _add_column(cursor, 'terms_data', 'content_codec', "INTEGER DEFAULT 0")
+
+
+def _create_search_index(cursor):
+    """Full-text search index over the catalog (kept in sync by triggers)"""
+    ensure_search_index(cursor)
+
+
+def _create_subject_index(cursor):
+    """Subject index on the catalog: subject filters and the subject/term listing"""
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_terms_subject_term ON terms_data(subject, term)")
+
+
+def _create_maintenance_log(cursor):
+    """Record of the background maintenance runs (see maintenance.py)"""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS maintenance_log (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            task TEXT NOT NULL,
+            started_at TEXT NOT NULL,
+            duration_ms REAL,
+            status TEXT,
+            details_json TEXT
+        )
+    """)
+
+
+def _add_term_ids(cursor):
+    """
+    Stable INTEGER term_id for every catalog term. terms_data is rebuilt
+    with term_id INTEGER PRIMARY KEY (the name stays UNIQUE), taking over
+    the current rowids. Those key terms_fts, so the search index stays valid.
+    An INTEGER PRIMARY KEY is also never renumbered by VACUUM, and renaming
+    a term keeps its id.
+    """
+    columns = cursor.execute("PRAGMA table_info(terms_data)").fetchall()
+    if not columns or 'term_id' in [c[1] for c in columns]:
+        return
+    definitions = ['term_id INTEGER PRIMARY KEY']
+    for _, name, declared_type, notnull, default, _ in columns:
+        definition = _column_definition(name, declared_type, notnull, default)
+        # Was the PRIMARY KEY
+        definitions.append(definition + ' UNIQUE' if name == 'term' else definition)
+    names = ', '.join(f'"{c[1]}"' for c in columns)
+    _rebuild_table(cursor, 'terms_data', definitions, f"""
+        INSERT INTO terms_data_new (term_id, {names}) SELECT rowid, {names} FROM terms_data
+    """)
+
+
+# User-state tables that point at catalog terms, with their name column
+TERM_REFERENCES = (
+    ('user_term_meta', 'term'),
+    ('collection_terms', 'term'),
+    ('term_view_aggregates', 'term_key'),
+    ('homework', 'term'),
+    ('user_recent_terms', 'term'),
+    ('test_questions', 'term'),
+)
+
+
+def _reference_term_ids(cursor):
+    """
+    User-state tables reference terms by term_id instead of by name. Rows
+    whose name is not in the catalog cannot be linked; they are kept in
+    orphaned_term_rows.
+    """
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS orphaned_term_rows (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            table_name TEXT NOT NULL,
+            term TEXT,
+            row_json TEXT NOT NULL
+        )
+    """)
+    # Only migration 10 makes ids stable: the rowids of a split catalog that
+    # has not run it yet may have been renumbered by VACUUM
+    if 'term_id' not in _columns(cursor, 'terms_data'):
+        raise MigrationBlocked('the catalog has no term_id yet; stop the app and run migdb.py')
+
+    for table, column in TERM_REFERENCES:
+        columns = cursor.execute(f'PRAGMA table_info("{table}")').fetchall()
+        if column not in [c[1] for c in columns]:
+            continue
+        create_sql = cursor.execute("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?",
+                                    (table,)).fetchone()[0]
+
+        definitions = []
+        for _, name, declared_type, notnull, default, pk in columns:
+            if name == column:
+                definitions.append('term_id INTEGER NOT NULL')
+            elif pk and declared_type.upper() == 'INTEGER':
+                autoincrement = ' AUTOINCREMENT' if 'AUTOINCREMENT' in create_sql.upper() else ''
+                definitions.append(f'"{name}" INTEGER PRIMARY KEY{autoincrement}')
+            else:
+                definitions.append(_column_definition(name, declared_type, notnull, default))
+        for _, index, unique, origin, _ in cursor.execute(f'PRAGMA index_list("{table}")').fetchall():
+            if unique and origin == 'u':
+                keys = [row[2] for row in cursor.execute(f'PRAGMA index_info("{index}")').fetchall()]
+                definitions.append('UNIQUE(' + ', '.join('term_id' if k == column else k for k in keys) + ')')
+        for fk in cursor.execute(f'PRAGMA foreign_key_list("{table}")').fetchall():
+            on_delete = f' ON DELETE {fk[6]}' if fk[6] and fk[6] != 'NO ACTION' else ''
+            definitions.append(f'FOREIGN KEY({fk[3]}) REFERENCES {fk[2]}({fk[4]}){on_delete}')
+
+        names = [c[1] for c in columns]
+        orphans = cursor.execute(f"""
+            SELECT * FROM "{table}" x
+            WHERE NOT EXISTS (SELECT 1 FROM terms_data t WHERE t.term = x."{column}")
+        """).fetchall()
+        cursor.executemany(
+            "INSERT INTO orphaned_term_rows (table_name, term, row_json) VALUES (?, ?, ?)",
+            [(table, row[names.index(column)], json.dumps(dict(zip(names, row)), default=str))
+             for row in orphans])
+
+        targets = ', '.join('term_id' if n == column else f'"{n}"' for n in names)
+        values = ', '.join('t.term_id' if n == column else f'x."{n}"' for n in names)
+        _rebuild_table(cursor, table, definitions, f"""
+            INSERT INTO "{table}_new" ({targets})
+            SELECT {values} FROM "{table}" x JOIN terms_data t ON t.term = x."{column}"
+        """, rename=(column, 'term_id'))
+
+
+def _create_meta_counters(cursor):
+    """Per-user counts of user_term_meta by difficulty, rating, ... (kept exact by triggers)"""
+    ensure_meta_counters(cursor)
+
+
+def _create_user_stats(cursor):
+    """Per-user summary of favorites, collections, views, ... (kept current by triggers)"""
+    ensure_user_stats(cursor)
+
+
+def _create_meta_changes(cursor):
+    """Version of the last change of every user_term_meta row, with tombstones (stamped by triggers)"""
+    ensure_meta_changes(cursor)
+
+
+def _log_filtered_meta_changes(cursor):
+    """Changes of the columns the bitmap index filters on are logged in user_meta_changes too"""
+    cursor.execute("DROP TRIGGER IF EXISTS user_meta_changes_update")
+    ensure_meta_changes(cursor)
+
+
+# (version, scope, step). Append only: never renumber or edit a released step.
+MIGRATIONS = (
+    (1, SCOPE_USER, _create_user_tables),
+    (2, SCOPE_USER, _add_user_columns),
+    (3, SCOPE_USER, _unify_user_preferences),
+    (4, SCOPE_CATALOG, _create_catalog_version),
+    (5, SCOPE_CATALOG, _add_content_codec),
+    (6, SCOPE_CATALOG, _create_search_index),
+    (7, SCOPE_USER, _create_query_indexes),
+    (8, SCOPE_CATALOG, _create_subject_index),
+    (9, SCOPE_USER, _create_maintenance_log),
+    (10, SCOPE_CATALOG, _add_term_ids),
+    (11, SCOPE_USER, _reference_term_ids),
+    (12, SCOPE_USER, _create_meta_counters),
+    (13, SCOPE_USER, _create_user_stats),
+    (14, SCOPE_USER, _create_meta_changes),
+    (15, SCOPE_USER, _log_filtered_meta_changes),
+)
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def schema_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate_database(db_path, scopes=ALL_SCOPES, verbose=False):
+    """
+    Applies the pending MIGRATIONS to db_path, tracked in PRAGMA user_version.
+    Steps of other scopes are skipped but still counted, since they belong
+    to the other database file. Each step commits together with its version
+    bump. Returns the list of versions applied.
+
+    An up-to-date database costs a single pragma read.
+    """
+    conn = sqlite3.connect(db_path, timeout=30, isolation_level=None, uri=True)
+    try:
+        if schema_version(conn) >= LATEST_VERSION:
+            return []
+        catalog_path = catalog_db_path(db_path)
+        if SCOPE_CATALOG not in scopes and catalog_path != db_path:
+            # User-state steps may look up catalog terms
+            attach_catalog(conn, catalog_path)
+
+        applied = []
+        cursor = conn.cursor()
+        for version, scope, step in MIGRATIONS:
+            # The write lock makes concurrent starts wait; re-check under it
+            cursor.execute("BEGIN IMMEDIATE")
+            try:
+                if schema_version(conn) >= version:
+                    cursor.execute("COMMIT")
+                    continue
+                if scope in scopes:
+                    if verbose:
+                        print(f"🔧 Migration {version}: {step.__doc__.strip().splitlines()[0]}")
+                    step(cursor)
+                    applied.append(version)
+                cursor.execute(f"PRAGMA user_version = {version}")
+                cursor.execute("COMMIT")
+            except Exception:
+                cursor.execute("ROLLBACK")
+                raise
+        return applied
+    finally:
+        conn.close()
+
+
+def migrate_all(db_path, verbose=False):
+    """
+    Migrates db_path and, once split, its catalog.sqlite (app must be stopped).
+    The catalog goes first: user-state steps link rows to its term ids.
+    """
+    catalog_path = catalog_db_path(db_path)
+    if catalog_path == db_path:
+        return {db_path: migrate_database(db_path, ALL_SCOPES, verbose)}
+    applied = {catalog_path: migrate_database(catalog_path, (SCOPE_CATALOG,), verbose)}
+    applied[db_path] = migrate_database(db_path, (SCOPE_USER,), verbose)
+    return applied
+
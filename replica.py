@@ -0,0 +1,199 @@
+# replica.py
+import sqlite3
+import threading
+import time
+
+from splitdb import _is_catalog_table, attach_catalog, read_only_uri
+
+# Replicas are opt-in (app.py --replica): get_replica() returns None for a
+# database that enable_replica() was not called for.
+_replicas = {}
+_replicas_lock = threading.Lock()
+
+
+def enable_replica(db_path, catalog_path=None):
+    """Creates (once) and returns the UserStateReplica for db_path."""
+    with _replicas_lock:
+        replica = _replicas.get(db_path)
+        if replica is None:
+            replica = UserStateReplica(db_path, catalog_path)
+            _replicas[db_path] = replica
+        return replica
+
+
+def get_replica(db_path):
+    """The replica enabled for db_path, or None."""
+    return _replicas.get(db_path)
+
+
+def stop_all_replicas():
+    """Stops every replica's refresh thread. Called on shutdown."""
+    with _replicas_lock:
+        replicas = list(_replicas.values())
+    for replica in replicas:
+        replica.stop()
+
+
+class UserStateReplica:
+    """
+    Read-only :memory: copy of the user-state tables of db_path.
+
+    A background thread re-copies them whenever the file changes: after every
+    batch the database writer commits (see mark_dirty) and, for changes made
+    by other processes, when PRAGMA data_version moves. With a split catalog
+    prism.sqlite holds only user state and is copied with the backup API,
+    `backup_pages` pages per step so the source is never locked for long.
+    Otherwise the user tables are copied out of it table by table. Each copy
+    is built on a fresh connection and swapped in whole, so readers never
+    wait for a refresh or for a disk write lock. They may see data up to one
+    refresh old.
+
+    The catalog is attached read-only to every copy, so queries that join
+    terms_data work unchanged.
+    """
+
+    def __init__(self, db_path, catalog_path=None, check_interval=1.0, min_interval=0.05,
+                 backup_pages=256):
+        self.db_path = db_path
+        self.catalog_path = catalog_path or db_path
+        self.check_interval = check_interval
+        self.min_interval = min_interval
+        self.backup_pages = backup_pages
+        self._conn = None
+        self._cond = threading.Condition()
+        self._dirty = True
+        self._stopping = False
+        self._probe = None
+        self._data_version = None
+        self._refreshed_at = 0.0
+        self._thread = None
+        self.refreshes = 0
+        self.failures = 0
+        self.last_refresh_ms = 0.0
+
+    def connection(self):
+        """
+        The current copy (built on first use). Never closed while referenced:
+        a connection swapped out mid-request stays valid until it is dropped.
+        """
+        conn = self._conn
+        if conn is None:
+            with self._cond:
+                if self._conn is None:
+                    self._changed_on_disk()
+                    self._conn = self._build()
+                    self._dirty = False
+                    self._start()
+                conn = self._conn
+        return conn
+
+    def mark_dirty(self):
+        """Schedules a refresh (called by the writer after each commit)."""
+        with self._cond:
+            self._dirty = True
+            self._cond.notify()
+
+    # --- internal -----------------------------------------------------
+
+    def _build(self):
+        start = time.perf_counter()
+        conn = sqlite3.connect(':memory:', uri=True, check_same_thread=False)
+        try:
+            if self.catalog_path != self.db_path:
+                # Split: the whole file is user state
+                source = sqlite3.connect(read_only_uri(self.db_path), uri=True)
+                try:
+                    source.backup(conn, pages=self.backup_pages)
+                finally:
+                    source.close()
+            else:
+                self._copy_user_tables(conn)
+            attach_catalog(conn, self.catalog_path)
+        except Exception:
+            conn.close()
+            raise
+        conn.row_factory = sqlite3.Row
+        self._refreshed_at = time.monotonic()
+        self.last_refresh_ms = round((time.perf_counter() - start) * 1000, 3)
+        self.refreshes += 1
+        return conn
+
+    def _copy_user_tables(self, conn):
+        """Copies every non-catalog table (and its indexes) in one read transaction."""
+        conn.execute("ATTACH DATABASE ? AS source", (read_only_uri(self.db_path),))
+        try:
+            conn.execute("BEGIN")
+            schema = conn.execute("""
+                SELECT type, name, tbl_name, sql FROM source.sqlite_master
+                WHERE type IN ('table', 'index') AND sql IS NOT NULL AND name NOT LIKE 'sqlite_%'
+                ORDER BY type = 'index'
+            """).fetchall()
+            for kind, name, table, sql in schema:
+                if _is_catalog_table(table):
+                    continue
+                conn.execute(sql)
+                if kind == 'table':
+                    conn.execute(f'INSERT INTO main."{name}" SELECT * FROM source."{name}"')
+            conn.execute("COMMIT")
+        finally:
+            conn.execute("DETACH DATABASE source")
+
+    def _changed_on_disk(self):
+        """
+        True when another connection (writer or process) committed since the
+        last check. Called before each copy, so commits made while it is
+        being built show up at the next check.
+        """
+        if self._probe is None:
+            self._probe = sqlite3.connect(read_only_uri(self.db_path), uri=True, check_same_thread=False)
+        version = self._probe.execute("PRAGMA data_version").fetchone()[0]
+        changed = self._data_version is not None and version != self._data_version
+        self._data_version = version
+        return changed
+
+    def _start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='prism-replica', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if not self._dirty and not self._stopping:
+                    self._cond.wait(self.check_interval)
+                if self._stopping:
+                    return
+                dirty, self._dirty = self._dirty, False
+            try:
+                if self._changed_on_disk() or dirty:
+                    # Coalesce bursts of commits into one copy
+                    wait = self.min_interval - (time.monotonic() - self._refreshed_at)
+                    if wait > 0:
+                        time.sleep(wait)
+                    with self._cond:
+                        self._dirty = False
+                    self._conn = self._build()
+            except Exception as e:
+                self.failures += 1
+                print(f"WARNING: Could not refresh user-state replica: {e}")
+                with self._cond:
+                    self._cond.wait(self.check_interval)
+
+    def stop(self):
+        with self._cond:
+            self._stopping = True
+            thread = self._thread
+            self._cond.notify()
+        if thread is not None:
+            thread.join(timeout=5)
+        if self._probe is not None:
+            self._probe.close()
+            self._probe = None
+
+    def metrics(self):
+        return {
+            'refreshes': self.refreshes,
+            'failures': self.failures,
+            'last_refresh_ms': self.last_refresh_ms,
+            'age_ms': round((time.monotonic() - self._refreshed_at) * 1000, 1) if self._refreshed_at else None
+        }
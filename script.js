@@ -1,5 +1,6 @@
 // Global state
-let allTerms = [];
+let allTerms = []; // Full catalog, fetched lazily by ensureAllTerms() only where a view needs it
+let allTermsLoaded = false;
 let currentView = 'discover';
 let currentTerm = null;
 let sessionTerms = 0;
@@ -221,17 +222,15 @@ function displayClock(date) {
 
 
 
-// Load all terms
+// Load subjects (terms themselves are paged in per subject as views open)
 async function loadTerms() {
     showLoading();
     try {
-        const response = await fetch('/api/terms');
-        allTerms = await response.json();
-
         const subjectsResponse = await fetch('/api/subjects');
         allSubjects = await subjectsResponse.json();
 
-        document.getElementById('totalTermsCount').textContent = allTerms.length;
+        const totalTerms = allSubjects.reduce((sum, s) => sum + s.count, 0);
+        document.getElementById('totalTermsCount').textContent = totalTerms;
         renderDiscoverView();
         renderSubjectsPreview();
         updateQuickAccessCounts();
@@ -282,10 +281,17 @@ function setupEventListeners() {
                 return;
             }
             
-            // Check if term exists in database
-            const matchingTerms = allTerms.filter(t => 
-                t.term.toLowerCase() === query.toLowerCase()
-            );
+            // Check if term exists in database (an exact match is always the first suggestion)
+            let matchingTerms = [];
+            try {
+                const response = await fetch(`/api/suggest?q=${encodeURIComponent(query)}&limit=1&user_id=local`);
+                const suggestions = response.ok ? await response.json() : [];
+                matchingTerms = suggestions.filter(t =>
+                    t.term.toLowerCase() === query.toLowerCase()
+                );
+            } catch (error) {
+                console.error('Error checking term:', error);
+            }
             
             if (matchingTerms.length > 0) {
                 // Term exists - open it
@@ -379,10 +385,35 @@ function switchView(view) {
     }
 }
 
+// Fetch one keyset page of terms: { items, next }
+async function fetchTermsPage(baseUrl, params = {}) {
+    const query = new URLSearchParams(params);
+    const response = await fetch(`${baseUrl}?${query.toString()}`);
+    if (!response.ok) throw new Error(`Failed to load terms: ${response.status}`);
+    return response.json();
+}
+
+// Load the whole catalog once, page by page (only for views that need every term)
+async function ensureAllTerms() {
+    if (allTermsLoaded) return allTerms;
+    const terms = [];
+    let after = null;
+    do {
+        const params = { limit: 500 };
+        if (after) params.after = after;
+        const page = await fetchTermsPage('/api/terms', params);
+        terms.push(...page.items);
+        after = page.next;
+    } while (after);
+    allTerms = terms;
+    allTermsLoaded = true;
+    return allTerms;
+}
+
 // Render discover view
-function renderDiscoverView() {
+async function renderDiscoverView() {
     const container = document.getElementById('randomTerms');
-    const randomTerms = getRandomTerms(6);
+    const randomTerms = await getRandomTerms(6);
 
     container.innerHTML = randomTerms.map(term => `
         <div class="term-card" onclick="viewTerm('${escapeHtml(term.term)}')">
@@ -421,12 +452,26 @@ function renderSubjectsPreview() {
     `).join('');
 }
 
-// Filter by subject
+// Filter by subject (terms are loaded a page at a time)
+const SUBJECT_PAGE_SIZE = 200;
+let subjectPageState = null;
+
+function renderTermCards(terms) {
+    return terms.map(term => `
+        <div class="term-card" onclick="viewTerm('${escapeHtml(term.term)}')">
+            <h3 class="term-card-title">${escapeHtml(term.term)}</h3>
+            <span class="term-card-subject">${escapeHtml(term.subject)}</span>
+        </div>
+    `).join('');
+}
+
 async function filterBySubject(subject) {
     showLoading();
     try {
-        const response = await fetch(`/api/terms/subject/${encodeURIComponent(subject)}`);
-        const terms = await response.json();
+        const page = await fetchTermsPage(
+            `/api/terms/subject/${encodeURIComponent(subject)}`, { limit: SUBJECT_PAGE_SIZE });
+        const info = allSubjects.find(s => s.subject === subject);
+        subjectPageState = { subject, next: page.next };
 
         switchView('subjects');
 
@@ -434,15 +479,14 @@ async function filterBySubject(subject) {
         container.innerHTML = `
             <div class="view-header">
                 <h2>${escapeHtml(subject)}</h2>
-                <p>${terms.length} terms</p>
+                <p>${info ? info.count : page.items.length} terms</p>
             </div>
-            <div class="term-grid">
-                ${terms.map(term => `
-                    <div class="term-card" onclick="viewTerm('${escapeHtml(term.term)}')">
-                        <h3 class="term-card-title">${escapeHtml(term.term)}</h3>
-                        <span class="term-card-subject">${escapeHtml(term.subject)}</span>
-                    </div>
-                `).join('')}
+            <div class="term-grid" id="subjectTermGrid">
+                ${renderTermCards(page.items)}
+            </div>
+            <div style="text-align: center; margin: 20px 0;">
+                <button id="subjectLoadMore" class="secondary-btn" onclick="loadMoreSubjectTerms()"
+                        style="display: ${page.next ? 'inline-block' : 'none'};">Load more</button>
             </div>
         `;
         hideLoading();
@@ -452,6 +496,23 @@ async function filterBySubject(subject) {
     }
 }
 
+async function loadMoreSubjectTerms() {
+    if (!subjectPageState || !subjectPageState.next) return;
+    const { subject, next } = subjectPageState;
+    try {
+        const page = await fetchTermsPage(
+            `/api/terms/subject/${encodeURIComponent(subject)}`, { limit: SUBJECT_PAGE_SIZE, after: next });
+        // Ignore the page if the user moved to another subject meanwhile
+        if (!subjectPageState || subjectPageState.subject !== subject) return;
+        subjectPageState.next = page.next;
+        document.getElementById('subjectTermGrid')?.insertAdjacentHTML('beforeend', renderTermCards(page.items));
+        const button = document.getElementById('subjectLoadMore');
+        if (button) button.style.display = page.next ? 'inline-block' : 'none';
+    } catch (error) {
+        console.error('Error loading more terms:', error);
+    }
+}
+
 // Render subjects view with elegant tiles
 function renderSubjectsView() {
     const container = document.getElementById('subjectsList');
@@ -470,6 +531,9 @@ function renderSubjectsView() {
 }
 
 // Render alphabet view
+const ALPHABET_PAGE_SIZE = 300;
+let alphabetPageState = null;
+
 function renderAlphabetView() {
     const navContainer = document.getElementById('alphabetNav');
     const termsContainer = document.getElementById('alphabetTerms');
@@ -479,10 +543,10 @@ function renderAlphabetView() {
         `<button class="alphabet-btn" onclick="filterByLetter('${letter}')">${letter}</button>`
     ).join('');
 
-    displayAlphabetTerms(allTerms);
+    termsContainer.innerHTML = '<p style="text-align: center; color: var(--text-secondary);">Pick a letter to browse terms</p>';
 }
 
-function filterByLetter(letter) {
+async function filterByLetter(letter) {
     document.querySelectorAll('.alphabet-btn').forEach(btn => {
         btn.classList.remove('active');
         if (btn.textContent === letter) {
@@ -490,11 +554,31 @@ function filterByLetter(letter) {
         }
     });
 
-    const filtered = allTerms.filter(t => t.term.toUpperCase().startsWith(letter));
-    displayAlphabetTerms(filtered);
+    try {
+        const page = await fetchTermsPage('/api/terms', { prefix: letter, limit: ALPHABET_PAGE_SIZE });
+        alphabetPageState = { letter, next: page.next };
+        displayAlphabetTerms(page.items, page.next);
+    } catch (error) {
+        console.error('Error loading terms by letter:', error);
+    }
+}
+
+async function loadMoreAlphabetTerms() {
+    if (!alphabetPageState || !alphabetPageState.next) return;
+    const { letter, next } = alphabetPageState;
+    try {
+        const page = await fetchTermsPage('/api/terms', { prefix: letter, limit: ALPHABET_PAGE_SIZE, after: next });
+        if (!alphabetPageState || alphabetPageState.letter !== letter) return;
+        alphabetPageState.next = page.next;
+        document.getElementById('alphabetTermGrid')?.insertAdjacentHTML('beforeend', renderTermCards(page.items));
+        const button = document.getElementById('alphabetLoadMore');
+        if (button) button.style.display = page.next ? 'inline-block' : 'none';
+    } catch (error) {
+        console.error('Error loading more terms:', error);
+    }
 }
 
-function displayAlphabetTerms(terms) {
+function displayAlphabetTerms(terms, next = null) {
     const container = document.getElementById('alphabetTerms');
 
     if (terms.length === 0) {
@@ -503,13 +587,12 @@ function displayAlphabetTerms(terms) {
     }
 
     container.innerHTML = `
-        <div class="term-grid">
-            ${terms.map(term => `
-                <div class="term-card" onclick="viewTerm('${escapeHtml(term.term)}')">
-                    <h3 class="term-card-title">${escapeHtml(term.term)}</h3>
-                    <span class="term-card-subject">${escapeHtml(term.subject)}</span>
-                </div>
-            `).join('')}
+        <div class="term-grid" id="alphabetTermGrid">
+            ${renderTermCards(terms)}
+        </div>
+        <div style="text-align: center; margin: 20px 0;">
+            <button id="alphabetLoadMore" class="secondary-btn" onclick="loadMoreAlphabetTerms()"
+                    style="display: ${next ? 'inline-block' : 'none'};">Load more</button>
         </div>
     `;
 }
@@ -531,45 +614,28 @@ async function handleSearchInstant(e) {
     // Debounce for smooth typing
     searchTimeout = setTimeout(async () => {
         try {
-            // Get all matching terms
-            let results = allTerms.filter(t =>
-                t.term.toLowerCase().includes(query) ||
-                t.subject.toLowerCase().includes(query)
-            );
-
-            // Get metadata for priority sorting
-            const metaResponse = await fetch('/api/meta/all');
-            const allMeta = await metaResponse.json();
-
-            // Sort by priority
-            results.sort((a, b) => {
-                const aMeta = allMeta.find(m => m.term === a.term);
-                const bMeta = allMeta.find(m => m.term === b.term);
-
-                const aPriority = (aMeta?.favorite ? 10 : 0) +
-                    (aMeta?.bookmark ? 5 : 0) +
-                    (aMeta?.notes ? 3 : 0) +
-                    (aMeta?.difficulty !== 'unknown' ? 2 : 0) +
-                    (aMeta?.rating ? 1 : 0);
-
-                const bPriority = (bMeta?.favorite ? 10 : 0) +
-                    (bMeta?.bookmark ? 5 : 0) +
-                    (bMeta?.notes ? 3 : 0) +
-                    (bMeta?.difficulty !== 'unknown' ? 2 : 0) +
-                    (bMeta?.rating ? 1 : 0);
-
-                return bPriority - aPriority;
-            });
-
-            displaySearchResults(results, allMeta);
+            // Server-side full-text search returns the top matches already
+            // ranked by priority (favorite > bookmark > notes > difficulty > rating)
+            const response = await fetch(`/api/search/query?q=${encodeURIComponent(query)}&limit=100&user_id=local`);
+            if (!response.ok) throw new Error(`Search failed: ${response.status}`);
+            const results = await response.json();
+
+            // Each result carries its own metadata fields, so it doubles as the metadata list
+            displaySearchResults(results, results);
         } catch (error) {
             console.error('Error in search:', error);
-            // Fallback to basic search
-            const results = allTerms.filter(t =>
-                t.term.toLowerCase().includes(query) ||
-                t.subject.toLowerCase().includes(query)
-            );
-            displaySearchResults(results, []);
+            // Fallback to basic search over the catalog (loaded on first use)
+            try {
+                const catalog = await ensureAllTerms();
+                const results = catalog.filter(t =>
+                    t.term.toLowerCase().includes(query) ||
+                    (t.subject || '').toLowerCase().includes(query)
+                );
+                displaySearchResults(results, []);
+            } catch (fallbackError) {
+                console.error('Error in fallback search:', fallbackError);
+                container.innerHTML = '<p style="text-align: center; color: var(--text-secondary); padding: 20px;">Search is unavailable right now</p>';
+            }
         }
     }, 300); // 300ms debounce - smooth typing experience
 }
@@ -625,7 +691,12 @@ async function viewTerm(termName) {
     showLoading();
 
     try {
-        const response = await fetch(`/api/term/${encodeURIComponent(termName)}`);
+        // Metadata first: opening the term below records a view, which would change last_viewed.
+        // The content request carries no per-user data, so revisits are answered with 304.
+        // Question sections are left out here and fetched when their tab opens
+        const metaResponse = await fetch(`/api/term/meta/${encodeURIComponent(termName)}`);
+        const meta = metaResponse.ok ? await metaResponse.json() : null;
+        const response = await fetch(`/api/term/${encodeURIComponent(termName)}?fields=definition,keyPoints,example`);
         
         // Check if term was found
         if (!response.ok) {
@@ -643,6 +714,7 @@ async function viewTerm(termName) {
             return;
         }
         
+        data.meta = meta || {};
         currentTerm = data;
 
         // Save to recent terms in database
@@ -887,68 +959,92 @@ function generateCustomizationStatus(meta, term) {
     `;
 }
 
-function renderTermDetail(data) {
-    const container = document.getElementById('termContent');
-    const meta = data.meta || {};
+// Question tabs of the term view; each is fetched the first time it is opened
+const TERM_TABS = {
+    objective: { section: 'objective_qa', path: 'objective', render: renderObjectiveContent },
+    descriptive: { section: 'descriptive_qa', path: 'descriptive', render: renderDescriptiveContent },
+    quiz: { section: 'quiz_data', path: 'quiz', render: renderQuizContent }
+};
 
-    // Build tabs and content for questions
-    const hasObjective = data.objective_qa && data.objective_qa.length > 0;
-    const hasDescriptive = data.descriptive_qa && data.descriptive_qa.length > 0;
-    const hasQuiz = data.quiz_data && data.quiz_data.length > 0;
-
-    let tabsHTML = '';
-    let contentHTML = '';
-
-    if (hasObjective) {
-        tabsHTML += '<button class="tab-btn active" onclick="switchTab(event, \'objective\')">❓ Objective Questions</button>';
-        contentHTML += `
-            <div class="tab-content active" id="objective-content">
-                ${data.objective_qa.map((qa, i) => `
-                    <div class="qa-item">
-                        <div class="qa-question">Q${i + 1}. ${qa.question}</div>
-                        <div style="margin-top: 8px; color: var(--text-secondary);"><strong>Answer:</strong> ${qa.answer}</div>
-                    </div>
-                `).join('')}
-            </div>
-        `;
-    }
+function renderObjectiveContent(items) {
+    return items.map((qa, i) => `
+        <div class="qa-item">
+            <div class="qa-question">Q${i + 1}. ${qa.question}</div>
+            <div style="margin-top: 8px; color: var(--text-secondary);"><strong>Answer:</strong> ${qa.answer}</div>
+        </div>
+    `).join('');
+}
 
-    if (hasDescriptive) {
-        tabsHTML += `<button class="tab-btn${!hasObjective ? ' active' : ''}" onclick="switchTab(event, 'descriptive')">📋 Descriptive Questions</button>`;
-        contentHTML += `
-            <div class="tab-content${!hasObjective ? ' active' : ''}" id="descriptive-content">
-                ${data.descriptive_qa.map((qa, i) => `
-                    <div class="qa-item">
-                        <div class="qa-question">Q${i + 1}. ${qa.question}</div>
-                        <div style="margin-top: 12px;">${qa.answer}</div>
-                    </div>
-                `).join('')}
-            </div>
-        `;
-    }
+function renderDescriptiveContent(items) {
+    return items.map((qa, i) => `
+        <div class="qa-item">
+            <div class="qa-question">Q${i + 1}. ${qa.question}</div>
+            <div style="margin-top: 12px;">${qa.answer}</div>
+        </div>
+    `).join('');
+}
 
-    if (hasQuiz) {
-        tabsHTML += `<button class="tab-btn${!hasObjective && !hasDescriptive ? ' active' : ''}" onclick="switchTab(event, 'quiz')">🎯 Practice Test</button>`;
-        contentHTML += `
-            <div class="tab-content${!hasObjective && !hasDescriptive ? ' active' : ''}" id="quiz-content">
-                ${data.quiz_data.map((q, i) => {
-            const options = q.options || {};
-            return `
-                    <div class="quiz-item">
-                        <div class="qa-question">Q${i + 1}. ${q.question_text || q.question || ''}</div>
-                        <ul class="quiz-options">
-                            ${Object.keys(options).sort().map(key => `<li>${key}. ${options[key]}</li>`).join('')}
-                        </ul>
-                        <button class="quiz-toggle-btn" onclick="toggleQuizAnswer(${i})">Show Answer</button>
-                        <div class="quiz-answer hidden" id="quiz-answer-${i}">
-                            <strong style="color: var(--success);">✓ Correct Answer: ${q.correct_answer_key || q.correct_answer || ''}</strong>
-                            ${q.explanation ? `<p style="margin-top: 12px;">${q.explanation}</p>` : ''}
-                        </div>
-                    </div>
-                `}).join('')}
+function renderQuizContent(items) {
+    return items.map((q, i) => {
+        const options = q.options || {};
+        return `
+            <div class="quiz-item">
+                <div class="qa-question">Q${i + 1}. ${q.question_text || q.question || ''}</div>
+                <ul class="quiz-options">
+                    ${Object.keys(options).sort().map(key => `<li>${key}. ${options[key]}</li>`).join('')}
+                </ul>
+                <button class="quiz-toggle-btn" onclick="toggleQuizAnswer(${i})">Show Answer</button>
+                <div class="quiz-answer hidden" id="quiz-answer-${i}">
+                    <strong style="color: var(--success);">✓ Correct Answer: ${q.correct_answer_key || q.correct_answer || ''}</strong>
+                    ${q.explanation ? `<p style="margin-top: 12px;">${q.explanation}</p>` : ''}
+                </div>
             </div>
         `;
+    }).join('');
+}
+
+async function loadTermTab(tabName) {
+    const tab = TERM_TABS[tabName];
+    const term = currentTerm;
+    const container = document.getElementById(tabName + '-content');
+    if (!tab || !term || !container || container.dataset.loaded === 'true') return;
+
+    try {
+        let items = term[tab.section];
+        if (!items) {
+            const response = await fetch(`/api/term/${encodeURIComponent(term.term)}/${tab.path}`);
+            items = response.ok ? await response.json() : [];
+            term[tab.section] = items;
+        }
+        // The user may have opened another term while this was loading
+        if (currentTerm !== term) return;
+
+        container.innerHTML = items.length > 0
+            ? tab.render(items)
+            : '<p style="color: var(--text-secondary);">No questions available for this term.</p>';
+        container.dataset.loaded = 'true';
+    } catch (error) {
+        console.error(`Error loading ${tabName} questions:`, error);
+        container.innerHTML = '<p style="color: var(--text-secondary);">Could not load questions.</p>';
     }
+}
+
+function renderTermDetail(data) {
+    const container = document.getElementById('termContent');
+    const meta = data.meta || {};
+
+    // Question tabs start empty and are filled in by loadTermTab()
+    const loadingHTML = '<p style="color: var(--text-secondary);">Loading...</p>';
+    const tabsHTML = `
+        <button class="tab-btn active" onclick="switchTab(event, 'objective')">❓ Objective Questions</button>
+        <button class="tab-btn" onclick="switchTab(event, 'descriptive')">📋 Descriptive Questions</button>
+        <button class="tab-btn" onclick="switchTab(event, 'quiz')">🎯 Practice Test</button>
+    `;
+    const contentHTML = `
+        <div class="tab-content active" id="objective-content">${loadingHTML}</div>
+        <div class="tab-content" id="descriptive-content">${loadingHTML}</div>
+        <div class="tab-content" id="quiz-content">${loadingHTML}</div>
+    `;
 
     container.innerHTML = `
         <div class="term-detail">
@@ -1077,16 +1173,16 @@ function renderTermDetail(data) {
                 </div>
             ` : ''}
             
-            ${(hasObjective || hasDescriptive || hasQuiz) ? `
-                <div class="section">
-                    <div class="tabs-container">
-                        ${tabsHTML}
-                    </div>
-                    ${contentHTML}
+            <div class="section">
+                <div class="tabs-container">
+                    ${tabsHTML}
                 </div>
-            ` : ''}
+                ${contentHTML}
+            </div>
         </div>
     `;
+
+    loadTermTab('objective');
 }
 
 // Tab switching
@@ -1096,6 +1192,7 @@ function switchTab(event, tabName) {
 
     event.target.classList.add('active');
     document.getElementById(tabName + '-content').classList.add('active');
+    loadTermTab(tabName);
 }
 
 // Toggle quiz answer
@@ -1743,11 +1840,12 @@ function saveCollectionEdit(index) {
     renderCollectionsView();
 }
 
-function viewCollection(index) {
+async function viewCollection(index) {
     const collection = userCollections[index];
     showLoading();
 
-    const termsToShow = allTerms.filter(t => collection.terms.includes(t.term));
+    const catalog = await ensureAllTerms();
+    const termsToShow = catalog.filter(t => collection.terms.includes(t.term));
 
     const container = document.getElementById('collectionsView');
     container.innerHTML = `
@@ -1992,14 +2090,20 @@ async function loadHomework() {
     }
 }
 
-function handleHwSearch(e) {
+async function handleHwSearch(e) {
     const query = e.target.value.toLowerCase();
     if (query.length < 2) {
         document.getElementById('hwSuggestions').innerHTML = '';
         return;
     }
     
-    const results = allTerms.filter(t => t.term.toLowerCase().includes(query)).slice(0, 5);
+    let results = [];
+    try {
+        const response = await fetch(`/api/suggest?q=${encodeURIComponent(query)}&limit=5&user_id=local`);
+        if (response.ok) results = await response.json();
+    } catch (error) {
+        console.error('Error fetching suggestions:', error);
+    }
     
     document.getElementById('hwSuggestions').innerHTML = results.map(t => `
         <div class="suggestion-item" onclick="selectHwTerm('${escapeHtml(t.term)}')">
@@ -2073,9 +2177,14 @@ async function deleteHomework(hwId) {
 }
 
 // Utility functions
-function getRandomTerms(count) {
-    const shuffled = [...allTerms].sort(() => 0.5 - Math.random());
-    return shuffled.slice(0, count);
+async function getRandomTerms(count) {
+    try {
+        const response = await fetch(`/api/terms/random?count=${count}`);
+        return response.ok ? await response.json() : [];
+    } catch (error) {
+        console.error('Error loading random terms:', error);
+        return [];
+    }
 }
 
 function escapeHtml(text) {
@@ -2802,7 +2911,7 @@ document.addEventListener('DOMContentLoaded', () => {
     const globalSearchResults = document.getElementById('globalSearchResults');
     
     if (globalSearchInput) {
-        globalSearchInput.addEventListener('input', (e) => {
+        globalSearchInput.addEventListener('input', async (e) => {
             const query = e.target.value.trim().toLowerCase();
             
             if (query.length < 2) {
@@ -2810,10 +2919,17 @@ document.addEventListener('DOMContentLoaded', () => {
                 return;
             }
             
-            // Filter terms
-            const results = allTerms.filter(t => 
-                t.term.toLowerCase().includes(query)
-            ).slice(0, 10);
+            // Prefix completions from the server, most viewed first
+            let results = [];
+            try {
+                const response = await fetch(`/api/suggest?q=${encodeURIComponent(query)}&limit=10&user_id=local`);
+                if (response.ok) results = await response.json();
+            } catch (error) {
+                console.error('Error fetching suggestions:', error);
+            }
+            
+            // Ignore responses that arrive after the user kept typing
+            if (e.target.value.trim().toLowerCase() !== query) return;
             
             if (results.length === 0) {
                 globalSearchResults.innerHTML = '<div style="padding: 12px; color: #999;">No terms found</div>';
@@ -0,0 +1,193 @@
+# search.py
+import re
+import sqlite3
+
+# Columns of terms_data that are full-text indexed, with their bm25 weights.
+# A hit in the term name counts far more than one buried in the example.
+FTS_COLUMNS = ('term', 'subject', 'definition', 'keyPoints_str', 'example')
+FTS_WEIGHTS = (10.0, 4.0, 1.0, 1.0, 0.5)
+
+# Same priority the frontend used to compute per keystroke in handleSearchInstant
+PRIORITY_SQL = """
+    (COALESCE(m.favorite, 0) = 1) * 10
+    + (COALESCE(m.bookmark, 0) = 1) * 5
+    + (COALESCE(m.notes, '') != '') * 3
+    + (COALESCE(m.difficulty, 'unknown') != 'unknown') * 2
+    + (COALESCE(m.rating, 0) > 0) * 1
+"""
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def _create_index(cursor, external_content):
+    options = "content='terms_data', content_rowid='rowid'," if external_content else ''
+    cursor.execute(f"""
+        CREATE VIRTUAL TABLE IF NOT EXISTS terms_fts USING fts5(
+            {', '.join(FTS_COLUMNS)},
+            {options}
+            tokenize='unicode61 remove_diacritics 2',
+            prefix='2 3'
+        )
+    """)
+
+
+def _is_external_content(cursor):
+    cursor.execute("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'terms_fts'")
+    row = cursor.fetchone()
+    return row is not None and "content='terms_data'" in row[0]
+
+
+def ensure_search_index(cursor):
+    """
+    Creates the terms_fts FTS5 index over terms_data and the triggers that keep
+    it in sync. The index is populated on first creation only.
+    Returns False if this SQLite build has no FTS5.
+
+    By default terms_fts is an external-content table keyed on
+    terms_data.rowid; run rebuild_search_index() after a full VACUUM, which
+    may renumber rowids. Once compress_catalog.py has compressed the catalog
+    the index holds its own copy of the text instead and has no triggers
+    (SQL cannot decompress the columns); it is refreshed by that tool, and
+    `compress_catalog.py --codec plain` restores the synced index.
+    """
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'terms_fts'")
+    exists = cursor.fetchone() is not None
+    if exists and not _is_external_content(cursor):
+        return True
+
+    cols = ', '.join(FTS_COLUMNS)
+    new_cols = ', '.join(f'new.{c}' for c in FTS_COLUMNS)
+    old_cols = ', '.join(f'old.{c}' for c in FTS_COLUMNS)
+    try:
+        _create_index(cursor, external_content=True)
+    except sqlite3.OperationalError as e:
+        print(f"WARNING: FTS5 search index unavailable: {e}")
+        return False
+
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS terms_fts_insert AFTER INSERT ON terms_data
+        BEGIN
+            INSERT INTO terms_fts(rowid, {cols}) VALUES (new.rowid, {new_cols});
+        END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS terms_fts_delete AFTER DELETE ON terms_data
+        BEGIN
+            INSERT INTO terms_fts(terms_fts, rowid, {cols}) VALUES ('delete', old.rowid, {old_cols});
+        END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS terms_fts_update AFTER UPDATE ON terms_data
+        BEGIN
+            INSERT INTO terms_fts(terms_fts, rowid, {cols}) VALUES ('delete', old.rowid, {old_cols});
+            INSERT INTO terms_fts(rowid, {cols}) VALUES (new.rowid, {new_cols});
+        END
+    """)
+
+    if not exists:
+        print("INFO: Building full-text search index (one-time)...")
+        rebuild_search_index(cursor)
+    return True
+
+
+def rebuild_search_index(cursor):
+    """Re-reads every terms_data row into the external-content terms_fts."""
+    cursor.execute("INSERT INTO terms_fts(terms_fts) VALUES ('rebuild')")
+
+
+def drop_search_triggers(cursor):
+    """Removes the triggers that copy terms_data text into terms_fts."""
+    for name in ('terms_fts_insert', 'terms_fts_delete', 'terms_fts_update'):
+        cursor.execute(f"DROP TRIGGER IF EXISTS {name}")
+
+
+def build_external_search_index(cursor):
+    """
+    Replaces terms_fts with the external-content index and its sync triggers,
+    rebuilt from terms_data. Only valid once every row is stored as plain TEXT.
+    """
+    drop_search_triggers(cursor)
+    cursor.execute("DROP TABLE IF EXISTS terms_fts")
+    return ensure_search_index(cursor)
+
+
+def build_standalone_search_index(cursor, rows):
+    """
+    Replaces terms_fts with an index that stores its own copy of the text.
+    `rows` yields (terms_data rowid, term, subject, definition, keyPoints_str,
+    example) with the text already decoded.
+    """
+    drop_search_triggers(cursor)
+    cursor.execute("DROP TABLE IF EXISTS terms_fts")
+    _create_index(cursor, external_content=False)
+    placeholders = ', '.join('?' * (len(FTS_COLUMNS) + 1))
+    cursor.executemany(
+        f"INSERT INTO terms_fts(rowid, {', '.join(FTS_COLUMNS)}) VALUES ({placeholders})", rows)
+
+
+def build_match_query(text):
+    """
+    Turns free text typed in the search box into an FTS5 MATCH expression:
+    every word must match the start of some token ("cell bio" finds
+    "Biology of the Cell"). Returns None if there is nothing to search for.
+    """
+    tokens = _TOKEN_RE.findall(text or '')
+    if not tokens:
+        return None
+    return ' '.join(f'"{token}"*' for token in tokens)
+
+
+def search_terms(cursor, text, user_id='local', limit=50):
+    """
+    Top `limit` terms matching `text`, ordered by the user's metadata priority
+    (favorite > bookmark > notes > difficulty > rating) and then by bm25.
+
+    Only two candidate sets are ranked: the `limit` best matches by bm25
+    (FTS5 keeps just those while scoring) and the user's own matching rows
+    with a nonzero priority. Any term of the final top `limit` is in one of
+    them, so the sort covers at most `limit` + the user's meta rows, however
+    many terms match.
+    """
+    match = build_match_query(text)
+    if match is None:
+        return []
+
+    rank = f"bm25({', '.join(str(w) for w in FTS_WEIGHTS)})"
+    cursor.execute(f"""
+        WITH candidates(rowid, score) AS (
+            SELECT * FROM (
+                SELECT rowid, rank FROM terms_fts
+                WHERE terms_fts MATCH ? AND rank MATCH ?
+                ORDER BY rank LIMIT ?
+            )
+            UNION
+            SELECT f.rowid, f.rank
+            FROM user_term_meta m
+            JOIN terms_data t ON t.term_id = m.term_id
+            JOIN terms_fts f ON f.rowid = t.rowid
+            WHERE m.user_id = ? AND ({PRIORITY_SQL}) > 0
+              AND f.terms_fts MATCH ? AND f.rank MATCH ?
+        )
+        SELECT t.term, t.subject,
+               COALESCE(m.favorite, 0), COALESCE(m.bookmark, 0),
+               COALESCE(m.difficulty, 'unknown'), COALESCE(m.rating, 0),
+               CASE WHEN COALESCE(m.notes, '') = '' THEN 0 ELSE 1 END,
+               {PRIORITY_SQL} AS priority,
+               c.score
+        FROM candidates c
+        JOIN terms_data t ON t.rowid = c.rowid
+        LEFT JOIN user_term_meta m ON m.term_id = t.term_id AND m.user_id = ?
+        ORDER BY priority DESC, c.score
+        LIMIT ?
+    """, (match, rank, limit, user_id, match, rank, user_id, limit))
+
+    return [{
+        'term': row[0],
+        'subject': row[1],
+        'favorite': row[2],
+        'bookmark': row[3],
+        'difficulty': row[4],
+        'rating': row[5],
+        'notes': row[6],
+        'score': row[8]
+    } for row in cursor.fetchall()]
@@ -0,0 +1,205 @@
+# server.py
+import os
+import signal
+import socket
+import sys
+import threading
+
+from werkzeug.serving import make_server
+from werkzeug.wsgi import ClosingIterator
+
+try:
+    from waitress.server import create_server
+except ImportError:  # optional: without it, Werkzeug's threaded server (no keep-alive) is used
+    create_server = None
+
+# The server running in this process, for request_shutdown()
+_server = None
+_server_lock = threading.Lock()
+
+
+def request_shutdown():
+    """
+    Starts a graceful drain of the server running in this process (and, for
+    a pre-forked server, of its siblings). Returns False if the app is not
+    running under serve(), e.g. under `flask run` or a test client.
+    """
+    with _server_lock:
+        server = _server
+    if server is None:
+        return False
+    if server.parent_pid is not None:
+        # Pre-forked worker: the parent forwards SIGTERM to every worker
+        os.kill(server.parent_pid, signal.SIGTERM)
+    else:
+        server.drain()
+    return True
+
+
+class DrainMiddleware:
+    """
+    Counts requests in flight and, once draining, turns new ones away with
+    503 so the server can stop as soon as the last response has been sent.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.active = 0
+        self.draining = False
+        self._cond = threading.Condition()
+
+    def __call__(self, environ, start_response):
+        with self._cond:
+            if self.draining:
+                start_response('503 Service Unavailable', [
+                    ('Content-Type', 'text/plain'), ('Connection', 'close'), ('Retry-After', '1')])
+                return [b'Server is shutting down']
+            self.active += 1
+        try:
+            return ClosingIterator(self.app(environ, start_response), self._finished)
+        except BaseException:
+            self._finished()
+            raise
+
+    def _finished(self):
+        with self._cond:
+            self.active -= 1
+            self._cond.notify_all()
+
+    def wait_idle(self, timeout):
+        """Stops admitting requests and waits up to `timeout` seconds for the rest to finish."""
+        with self._cond:
+            self.draining = True
+            return self._cond.wait_for(lambda: self.active == 0, timeout)
+
+
+class Server:
+    """
+    A WSGI server for `app` that can be drained: drain() stops admitting
+    requests, waits up to `drain_timeout` seconds for those in flight, then
+    makes run() return.
+
+    Uses waitress when it is installed: a fixed pool of `threads` with
+    HTTP/1.1 keep-alive, idle connections closed after `keep_alive`
+    seconds. Otherwise falls back to Werkzeug's thread-per-connection
+    server, which closes the connection after every response.
+    """
+
+    def __init__(self, app, host, port, threads=8, keep_alive=5.0, drain_timeout=30.0, sock=None):
+        self.drainer = DrainMiddleware(app)
+        self.drain_timeout = drain_timeout
+        self.parent_pid = None
+        self._draining = False
+        if create_server is not None:
+            listen = {'sockets': [sock]} if sock is not None else {'host': host, 'port': port}
+            self._waitress = create_server(self.drainer, threads=threads, channel_timeout=keep_alive,
+                                           ident='Prism', **listen)
+            self._werkzeug = None
+        else:
+            self._waitress = None
+            self._werkzeug = make_server(host, port, self.drainer, threaded=True,
+                                         fd=sock.fileno() if sock is not None else None)
+
+    def run(self):
+        global _server
+        with _server_lock:
+            _server = self
+        try:
+            if self._waitress is not None:
+                # Returns once the listener and every connection are closed
+                self._waitress.run()
+                self._waitress.task_dispatcher.shutdown(cancel_pending=False)
+            else:
+                self._werkzeug.serve_forever()
+        finally:
+            with _server_lock:
+                _server = None
+
+    def drain(self):
+        """Stops the server once in-flight requests are done. Safe to call from a signal handler."""
+        if self._draining:
+            return
+        self._draining = True
+        # Never block the serving thread (a signal handler may be running on it)
+        threading.Thread(target=self._stop_when_idle, name='prism-drain', daemon=True).start()
+
+    def _stop_when_idle(self):
+        if not self.drainer.wait_idle(self.drain_timeout):
+            print(f"WARNING: {self.drainer.active} request(s) still running after {self.drain_timeout:.0f}s")
+        if self._waitress is None:
+            self._werkzeug.shutdown()
+            return
+        server = self._waitress
+
+        def close():
+            # Runs on waitress's event loop: close the listener, then each
+            # connection once its buffered output has been sent
+            for channel in list(server.active_channels.values()):
+                channel.will_close = True
+            server.close()
+        server.trigger.pull_trigger(close)
+
+
+def serve(app, host='127.0.0.1', port=5000, threads=8, workers=1, keep_alive=5.0,
+          drain_timeout=30.0, on_start=lambda worker: None, on_exit=lambda: None):
+    """
+    Serves `app` until SIGINT/SIGTERM or request_shutdown(), then drains and
+    runs on_exit() (commit queued writes, close connections) before returning.
+    on_start(worker) runs in each serving process before it accepts
+    requests, with the worker's index (0 when not pre-forking).
+
+    With workers > 1 (POSIX only) the listening socket is opened once and
+    shared by that many forked worker processes, each with its own thread
+    pool. Every worker has its own caches and writer thread; SQLite's
+    locking serializes their writes.
+    """
+    if workers > 1 and not hasattr(os, 'fork'):
+        print("WARNING: --workers needs fork(); serving with a single process")
+        workers = 1
+
+    if workers == 1:
+        server = Server(app, host, port, threads, keep_alive, drain_timeout)
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(sig, lambda *_: server.drain())
+        try:
+            on_start(0)
+            server.run()
+        finally:
+            on_exit()
+        return
+
+    listener = socket.create_server((host, port), backlog=1024)
+    children = []
+    for worker in range(workers):
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGINT, signal.SIG_IGN)  # the parent handles Ctrl+C
+            code = 0
+            try:
+                server = Server(app, host, port, threads, keep_alive, drain_timeout, sock=listener)
+                server.parent_pid = os.getppid()
+                signal.signal(signal.SIGTERM, lambda *_: server.drain())
+                try:
+                    on_start(worker)
+                    server.run()
+                finally:
+                    on_exit()
+            except BaseException as e:
+                print(f"❌ Worker {os.getpid()} failed: {e}")
+                code = 1
+            finally:
+                sys.stdout.flush()
+                os._exit(code)
+        children.append(pid)
+    listener.close()
+
+    def stop_workers(*_):
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+    signal.signal(signal.SIGINT, stop_workers)
+    signal.signal(signal.SIGTERM, stop_workers)
+    for pid in children:
+        os.waitpid(pid, 0)
@@ -0,0 +1,146 @@
+import argparse
+import os
+import sqlite3
+from pathlib import Path
+
+# The read-only catalog lives next to prism.sqlite once split_database() has run
+CATALOG_FILENAME = 'catalog.sqlite'
+CATALOG_SCHEMA = 'catalog'
+
+# Tables that move to the catalog file (terms_fts takes its shadow tables along)
+CATALOG_TABLES = ('terms_data', 'terms_fts', 'catalog_version', 'codec_dictionaries')
+
+
+def catalog_db_path(db_path):
+    """Path of the catalog for the user database db_path: the split-off file if present, else db_path itself."""
+    path = os.path.join(os.path.dirname(os.path.abspath(db_path)), CATALOG_FILENAME)
+    return path if os.path.exists(path) else db_path
+
+
+def read_only_uri(path):
+    """
+    URI for a read-only connection to `path`. A split catalog file is also
+    opened immutable: SQLite then skips all locking and change detection,
+    so any number of processes can share it. It must only be modified
+    with the app stopped.
+    """
+    uri = Path(path).as_uri() + '?mode=ro'
+    if os.path.basename(path) == CATALOG_FILENAME:
+        uri += '&immutable=1'
+    return uri
+
+
+def attach_catalog(conn, catalog_path, mmap_size=268435456):
+    """
+    Attaches the split catalog to a user-state connection as 'catalog'.
+    Unqualified names fall through from main to attached databases, so
+    queries on terms_data / terms_fts work unchanged. `conn` must have been
+    opened with uri=True.
+    """
+    conn.execute(f"ATTACH DATABASE ? AS {CATALOG_SCHEMA}", (read_only_uri(catalog_path),))
+    conn.execute(f"PRAGMA {CATALOG_SCHEMA}.mmap_size = {int(mmap_size)}")
+
+
+def _is_catalog_table(name):
+    return name in CATALOG_TABLES or name.startswith('terms_fts_')
+
+
+def _rebuild_search_index(conn):
+    """VACUUM may renumber terms_data rowids, which key terms_fts."""
+    from search import _is_external_content, rebuild_search_index, build_standalone_search_index
+    cursor = conn.cursor()
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'terms_fts'")
+    if cursor.fetchone() is None:
+        return
+    if _is_external_content(cursor):
+        rebuild_search_index(cursor)
+    else:
+        from compress_catalog import current_codec, decoded_search_rows
+        build_standalone_search_index(cursor, decoded_search_rows(conn, current_codec(cursor)))
+    conn.commit()
+
+
+def split_database(db_path, keep_source=False):
+    """
+    Moves the catalog tables of db_path into catalog.sqlite next to it.
+    The copy is verified (terms_data row count) before anything is dropped
+    from db_path; with keep_source the catalog stays in db_path as well
+    (the app prefers catalog.sqlite whenever it exists).
+    """
+    if not os.path.exists(db_path):
+        print(f"❌ Database not found at: {db_path}")
+        return False
+
+    catalog_path = os.path.join(os.path.dirname(os.path.abspath(db_path)), CATALOG_FILENAME)
+    if os.path.exists(catalog_path):
+        print(f"❌ Catalog already exists at: {catalog_path}")
+        return False
+    tmp_path = catalog_path + '.tmp'
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+
+    size_before = os.path.getsize(db_path)
+    conn = sqlite3.connect(db_path)
+    try:
+        conn.execute("SELECT 1 FROM terms_data LIMIT 1")
+        expected = conn.execute("SELECT COUNT(*) FROM terms_data").fetchone()[0]
+
+        print("🔧 Copying database...")
+        conn.execute("VACUUM INTO ?", (tmp_path,))
+
+        print("🔧 Removing user-state tables from the catalog copy...")
+        cat = sqlite3.connect(tmp_path)
+        try:
+            rows = cat.execute("""
+                SELECT type, name FROM sqlite_master
+                WHERE type IN ('table', 'view') AND name NOT LIKE 'sqlite_%'
+            """).fetchall()
+            for kind, name in rows:
+                if not _is_catalog_table(name):
+                    cat.execute(f'DROP {kind.upper()} IF EXISTS "{name}"')
+            cat.commit()
+            cat.execute("VACUUM")
+            _rebuild_search_index(cat)
+            # Immutable readers must not find a WAL to replay
+            cat.execute("PRAGMA journal_mode = DELETE")
+            copied = cat.execute("SELECT COUNT(*) FROM terms_data").fetchone()[0]
+        finally:
+            cat.close()
+
+        if copied != expected:
+            print(f"❌ Catalog copy has {copied} terms, expected {expected}; nothing was changed")
+            os.remove(tmp_path)
+            return False
+        os.replace(tmp_path, catalog_path)
+        print(f"✅ Catalog written to {catalog_path} ({copied} terms)")
+
+        if not keep_source:
+            print("🔧 Removing catalog tables from the user database...")
+            for name in CATALOG_TABLES:
+                conn.execute(f'DROP TABLE IF EXISTS "{name}"')
+            conn.commit()
+            conn.execute("VACUUM")
+
+        size_after = os.path.getsize(db_path)
+        print("\n📋 Summary:")
+        print(f"   {os.path.basename(db_path)}: {size_before / (1024 * 1024):.1f} MB -> {size_after / (1024 * 1024):.1f} MB")
+        print(f"   {CATALOG_FILENAME}: {os.path.getsize(catalog_path) / (1024 * 1024):.1f} MB")
+        return True
+    except Exception as e:
+        print(f"❌ Split failed: {e}")
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        return False
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Move the read-only catalog out of prism.sqlite into catalog.sqlite')
+    parser.add_argument('--db', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'prism.sqlite'))
+    parser.add_argument('--keep-source', action='store_true',
+                        help='copy the catalog without dropping it from the user database')
+    args = parser.parse_args()
+
+    print("🚀 Splitting catalog from user state...\n")
+    split_database(args.db, args.keep_source)
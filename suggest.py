@@ -0,0 +1,148 @@
+# suggest.py
+import bisect
+import heapq
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+from catalog import get_catalog
+from splitdb import attach_catalog
+
+_suggesters = {}
+_suggesters_lock = threading.Lock()
+
+
+def get_suggester(db_path, catalog_path=None):
+    """Returns the process-wide Suggester for db_path (terms from catalog_path, default db_path)."""
+    with _suggesters_lock:
+        suggester = _suggesters.get(db_path)
+        if suggester is None:
+            suggester = Suggester(db_path, catalog_path)
+            _suggesters[db_path] = suggester
+        return suggester
+
+
+class _PrefixTable:
+    """Lower-cased term names in sorted order, searchable by prefix with bisect."""
+
+    __slots__ = ('keys', 'entries', 'positions')
+
+    def __init__(self, rows):
+        triples = sorted((r['term'].lower(), r['term'], r['subject']) for r in rows)
+        self.keys = [t[0] for t in triples]
+        self.entries = [(t[1], t[2]) for t in triples]
+        self.positions = {t[1]: i for i, t in enumerate(triples)}
+
+    def prefix_range(self, prefix):
+        lo = bisect.bisect_left(self.keys, prefix)
+        hi = bisect.bisect_left(self.keys, prefix + '\U0010ffff', lo)
+        return lo, hi
+
+
+class Suggester:
+    """
+    Search-as-you-type completions over terms_data.term.
+
+    Built from the in-memory catalog index (and rebuilt when its generation
+    changes), so no SQL runs for the prefix lookup itself. Completions are
+    ranked by the user's term_view_aggregates.views, which are re-read at most
+    every `views_interval` seconds per user.
+    """
+
+    def __init__(self, db_path, catalog_path=None, views_interval=5.0):
+        self.db_path = db_path
+        self.catalog_path = catalog_path or db_path
+        self.views_interval = views_interval
+        self._lock = threading.Lock()
+        self._generation = None
+        self._all = None
+        self._by_subject = {}
+        self._views = {}
+        self._conn = None
+
+    def _tables(self, subject):
+        catalog = get_catalog(self.catalog_path)
+        rows = catalog.all_terms()
+        with self._lock:
+            if self._generation != catalog.generation:
+                self._all = _PrefixTable(rows)
+                self._by_subject = {}
+                self._generation = catalog.generation
+            if subject is None:
+                return self._all
+            table = self._by_subject.get(subject)
+            if table is None:
+                # Per-subject tables are built on first use; unknown subjects
+                # come from the client and are not cached
+                subject_rows = catalog.terms_for_subject(subject)
+                if not subject_rows:
+                    return None
+                table = _PrefixTable(subject_rows)
+                self._by_subject[subject] = table
+            return table
+
+    def _views_for(self, user_id):
+        now = time.monotonic()
+        cached = self._views.get(user_id)
+        if cached is not None and now - cached[0] < self.views_interval:
+            return cached[1]
+
+        with self._lock:
+            if self._conn is None:
+                uri = Path(self.db_path).as_uri() + '?mode=ro'
+                self._conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+                if self.catalog_path != self.db_path:
+                    # Term names live in the catalog
+                    attach_catalog(self._conn, self.catalog_path)
+            try:
+                rows = self._conn.execute("""
+                    SELECT t.term, a.views FROM term_view_aggregates a
+                    JOIN terms_data t ON t.term_id = a.term_id
+                    WHERE a.user_id = ?
+                """, (user_id,)).fetchall()
+            except sqlite3.Error:
+                rows = []
+            views = {term: count or 0 for term, count in rows}
+            self._views[user_id] = (now, views)
+            return views
+
+    def suggest(self, prefix, limit=10, subject=None, user_id='local'):
+        """
+        Up to `limit` completions of `prefix` as [{'term', 'subject', 'views'}].
+        An exact (case-insensitive) match always comes first, then the most
+        viewed terms, then alphabetical order.
+        """
+        prefix = (prefix or '').strip().lower()
+        if not prefix or limit <= 0:
+            return []
+
+        table = self._tables(subject)
+        if table is None:
+            return []
+        lo, hi = table.prefix_range(prefix)
+        if lo == hi:
+            return []
+
+        views = self._views_for(user_id)
+        if hi - lo <= limit:
+            candidates = range(lo, hi)
+        else:
+            # Only the first `limit` names and the viewed ones can make the cut
+            picked = set(range(lo, lo + limit))
+            for term in views:
+                pos = table.positions.get(term)
+                if pos is not None and lo <= pos < hi:
+                    picked.add(pos)
+            candidates = sorted(picked)
+
+        keys, entries = table.keys, table.entries
+        ranked = heapq.nlargest(
+            limit, candidates,
+            key=lambda i: (keys[i] == prefix, views.get(entries[i][0], 0)))
+
+        return [{
+            'term': entries[i][0],
+            'subject': entries[i][1],
+            'views': views.get(entries[i][0], 0)
+        } for i in ranked]
@@ -0,0 +1,105 @@
+# termcache.py
+import threading
+from collections import OrderedDict
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def get_term_cache(db_path):
+    """Returns the process-wide TermCache for db_path."""
+    with _caches_lock:
+        cache = _caches.get(db_path)
+        if cache is None:
+            cache = TermCache()
+            _caches[db_path] = cache
+        return cache
+
+
+class TermCache:
+    """
+    LRU cache of decoded term records (JSON parsed, key points split).
+    A record may hold only some sections; missing ones are merged in as
+    they are loaded.
+
+    Bounded by total size rather than entry count, because records range from
+    a few KB to hundreds of KB. An entry's size is the UTF-8 byte length of
+    the decoded column text it was built from (not the compressed bytes read
+    from a compressed catalog). Entries are tagged with the catalog
+    generation and the whole cache is dropped when terms_data changes.
+    """
+
+    def __init__(self, max_bytes=64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._generation = None
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def _check_generation(self, generation):
+        if generation != self._generation:
+            if self._entries:
+                self.invalidations += 1
+            self._entries.clear()
+            self.current_bytes = 0
+            self._generation = generation
+
+    def get(self, key, generation):
+        """Cached record for `key`, or None. `generation` is the catalog's."""
+        with self._lock:
+            self._check_generation(generation)
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def merge(self, key, fields, size, generation):
+        """
+        Adds the decoded `fields` (costing `size` bytes) to the record cached
+        for `key`, creating it if needed, and returns the merged record.
+        Records are replaced rather than mutated, so readers never see a
+        partially updated dict. Least recently used entries are evicted.
+        """
+        with self._lock:
+            self._check_generation(generation)
+            old = self._entries.pop(key, None)
+            record = dict(old[0]) if old else {}
+            record.update(fields)
+            total = size
+            if old is not None:
+                self.current_bytes -= old[1]
+                total += old[1]
+            if total <= self.max_bytes:
+                self._entries[key] = (record, total)
+                self.current_bytes += total
+                while self.current_bytes > self.max_bytes:
+                    _, (_, evicted_size) = self._entries.popitem(last=False)
+                    self.current_bytes -= evicted_size
+                    self.evictions += 1
+            return record
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self.current_bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations
+            }
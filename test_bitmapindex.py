@@ -0,0 +1,73 @@
+# test_bitmapindex.py
+import os
+import tempfile
+import unittest
+
+from bitmapindex import get_bitmap_index
+from test_maintenance import build_database
+from viewtracker import ViewTracker
+from writer import get_writer, stop_all_writers
+
+
+def set_meta(cursor, user_id, term, values):
+    columns = ', '.join(values)
+    cursor.execute(f"""
+        INSERT INTO user_term_meta (term_id, user_id, {columns})
+        SELECT term_id, ?, {', '.join('?' for _ in values)} FROM terms_data WHERE term = ?
+        ON CONFLICT(term_id, user_id) DO UPDATE SET {', '.join(f'{c} = excluded.{c}' for c in values)}
+    """, [user_id, *values.values(), term])
+
+
+class BitmapIndexTest(unittest.TestCase):
+    """A user's bitmaps are rebuilt after that user's metadata changes, and only then."""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmpdir.name, 'prism.sqlite')
+        build_database(self.db_path, terms=50)
+        self.writer = get_writer(self.db_path)
+        self.writer.write(set_meta, 'u', 'term 0001', {'favorite': 1})
+        self.writer.write(set_meta, 'u', 'term 0002', {'difficulty': 'hard'})
+        self.index = get_bitmap_index(self.db_path)
+
+    def tearDown(self):
+        stop_all_writers()
+        self.tmpdir.cleanup()
+
+    def favorites(self, user_id='u'):
+        return [item['term'] for item in self.index.query(user_id, {'favorite': True})['items']]
+
+    def test_view_flush_keeps_bitmaps(self):
+        self.assertEqual(self.favorites(), ['term 0001'])
+        builds = self.index.builds
+
+        tracker = ViewTracker(self.db_path)
+        tracker.record('u', 'term 0001')
+        tracker.record('u', 'term 0002')
+        self.assertEqual(tracker.flush(), 2)
+
+        self.assertEqual(self.favorites(), ['term 0001'])
+        self.assertEqual(self.index.builds, builds)
+        tracker.stop()
+
+    def test_rebuilds_only_the_changed_user(self):
+        self.writer.write(set_meta, 'v', 'term 0003', {'favorite': 1})
+        self.assertEqual(self.favorites('u'), ['term 0001'])
+        self.assertEqual(self.favorites('v'), ['term 0003'])
+        builds = self.index.builds
+
+        self.writer.write(set_meta, 'u', 'term 0002', {'favorite': 1})
+        self.assertEqual(self.favorites('v'), ['term 0003'])
+        self.assertEqual(self.index.builds, builds)
+        self.assertEqual(self.favorites('u'), ['term 0001', 'term 0002'])
+        self.assertEqual(self.index.builds, builds + 1)
+
+    def test_rebuilds_after_filtered_column_change(self):
+        self.assertEqual(self.index.query('u', {'important_level': 'high'})['count'], 0)
+        self.writer.write(set_meta, 'u', 'term 0002', {'important_level': 'high'})
+        self.assertEqual(self.index.query('u', {'important_level': 'high'})['items'],
+                         [{'term': 'term 0002', 'subject': 'subject 2'}])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+# test_maintenance.py
+import os
+import sqlite3
+import tempfile
+import unittest
+
+from maintenance import Maintainer, TASKS
+from migrations import migrate_all, migrate_database
+from splitdb import split_database
+from writer import get_writer, stop_all_writers
+
+
+def build_database(path, terms=500):
+    """prism.sqlite with the current schema and a small catalog."""
+    conn = sqlite3.connect(path)
+    conn.execute("""
+        CREATE TABLE terms_data (
+            term TEXT PRIMARY KEY, subject TEXT, definition TEXT, keyPoints_str TEXT, example TEXT,
+            objective_qa_json TEXT, descriptive_qa_json TEXT, quiz_data_json TEXT, orig_subject TEXT
+        )
+    """)
+    conn.executemany("INSERT INTO terms_data (term, subject, definition) VALUES (?, ?, ?)",
+                     [(f'term {i:04d}', f'subject {i % 7}', 'text ' * 20) for i in range(terms)])
+    conn.commit()
+    conn.close()
+    migrate_database(path)
+
+
+def touch_catalog(cursor):
+    # Queries that join the catalog make PRAGMA optimize consider its tables too
+    cursor.execute("""
+        INSERT INTO user_term_meta (term_id, user_id, favorite)
+        SELECT term_id, 'u', 1 FROM terms_data WHERE subject = 'subject 3'
+    """)
+    cursor.execute("""
+        SELECT t.term FROM terms_data t JOIN user_term_meta m ON m.term_id = t.term_id
+        WHERE m.user_id = 'u' AND t.subject = 'subject 3' ORDER BY t.term
+    """).fetchall()
+
+
+class MaintenanceTest(unittest.TestCase):
+    """Every task runs without error on a single database and on a split one."""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmpdir.name, 'prism.sqlite')
+        build_database(self.db_path)
+
+    def tearDown(self):
+        stop_all_writers()
+        self.tmpdir.cleanup()
+
+    def run_all_tasks(self):
+        get_writer(self.db_path).write(touch_catalog)
+        reports = Maintainer(self.db_path).run(TASKS)
+        self.assertEqual([r['task'] for r in reports], list(TASKS))
+        for report in reports:
+            self.assertNotEqual(report['status'], 'error', report)
+        return {r['task']: r for r in reports}
+
+    def test_single_database(self):
+        self.run_all_tasks()
+
+    def test_split_database(self):
+        self.assertTrue(split_database(self.db_path))
+        migrate_all(self.db_path)
+        # The writer attaches catalog.sqlite read-only; optimize must leave it alone
+        reports = self.run_all_tasks()
+        self.assertEqual(reports['optimize']['status'], 'ok')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,101 @@
+# test_migrations.py
+import json
+import os
+import sqlite3
+import tempfile
+import unittest
+from unittest import mock
+
+import migrations
+from migrations import MIGRATIONS, MigrationBlocked, SCOPE_USER, migrate_all, migrate_database
+from splitdb import split_database
+
+
+def build_legacy_database(path, terms=60):
+    """prism.sqlite as deployed before term ids: catalog keyed by name, user rows holding names."""
+    conn = sqlite3.connect(path)
+    conn.execute("""
+        CREATE TABLE terms_data (
+            term TEXT PRIMARY KEY, subject TEXT, definition TEXT, keyPoints_str TEXT, example TEXT,
+            objective_qa_json TEXT, descriptive_qa_json TEXT, quiz_data_json TEXT, orig_subject TEXT
+        )
+    """)
+    conn.executemany("INSERT INTO terms_data (term, subject, definition) VALUES (?, ?, ?)",
+                     [(f'term {i:04d}', f'subject {i % 5}', 'text') for i in range(terms)])
+    conn.commit()
+    conn.close()
+    with mock.patch.object(migrations, 'MIGRATIONS', tuple(m for m in MIGRATIONS if m[0] < 10)):
+        migrate_database(path)
+
+
+class TermIdMigrationTest(unittest.TestCase):
+    """Migration 11 links user rows to the catalog's term ids, also after a split."""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmpdir.name, 'prism.sqlite')
+        build_legacy_database(self.db_path)
+
+        conn = sqlite3.connect(self.db_path)
+        # Every third term leaves the catalog; user rows naming them are orphans
+        conn.execute("DELETE FROM terms_data WHERE CAST(substr(term, 6) AS INTEGER) % 3 = 0")
+        names = [row[0] for row in conn.execute("SELECT term FROM terms_data ORDER BY term")]
+        self.linked = names[::2]
+        self.orphans = ['term 0003', 'term 0030', 'no such term']
+        # notes holds the name each row must still point at after the migration
+        conn.executemany("INSERT INTO user_term_meta (term, user_id, favorite, notes) VALUES (?, 'u', 1, ?)",
+                         [(name, name) for name in self.linked + self.orphans])
+        conn.commit()
+        conn.close()
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def assert_linked(self):
+        conn = sqlite3.connect(self.db_path)
+        try:
+            catalog = os.path.join(self.tmpdir.name, 'catalog.sqlite')
+            if os.path.exists(catalog):
+                conn.execute("ATTACH DATABASE ? AS catalog", (catalog,))
+            rows = conn.execute("""
+                SELECT t.term, m.notes FROM user_term_meta m
+                JOIN terms_data t ON t.term_id = m.term_id ORDER BY t.term
+            """).fetchall()
+            self.assertEqual(rows, [(name, name) for name in self.linked])
+            self.assertEqual(conn.execute("SELECT COUNT(*) FROM user_term_meta").fetchone()[0], len(self.linked))
+
+            orphaned = conn.execute(
+                "SELECT term, row_json FROM orphaned_term_rows WHERE table_name = 'user_term_meta' ORDER BY term"
+            ).fetchall()
+            self.assertEqual([term for term, _ in orphaned], sorted(self.orphans))
+            for term, row_json in orphaned:
+                self.assertEqual(json.loads(row_json)['notes'], term)
+        finally:
+            conn.close()
+
+    def test_single_database(self):
+        migrate_database(self.db_path)
+        self.assert_linked()
+
+    def test_split_before_term_ids(self):
+        self.assertTrue(split_database(self.db_path))
+
+        # The catalog still lacks term_id, and its rowids are not stable yet
+        with self.assertRaises(MigrationBlocked):
+            migrate_database(self.db_path, (SCOPE_USER,))
+        conn = sqlite3.connect(self.db_path)
+        self.assertIn('term', [c[1] for c in conn.execute("PRAGMA table_info(user_term_meta)")])
+        conn.close()
+
+        # VACUUM may renumber the rowids of a table without an INTEGER PRIMARY KEY
+        catalog = sqlite3.connect(os.path.join(self.tmpdir.name, 'catalog.sqlite'))
+        catalog.execute("UPDATE terms_data SET rowid = rowid + 1000")
+        catalog.commit()
+        catalog.close()
+
+        migrate_all(self.db_path)
+        self.assert_linked()
+
+
+if __name__ == '__main__':
+    unittest.main()
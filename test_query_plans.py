@@ -0,0 +1,35 @@
+# test_query_plans.py
+import unittest
+from unittest import mock
+
+import check_query_plans as plans
+
+
+class QueryPlanTest(unittest.TestCase):
+    """Every statement in plans.SOURCES is planned against a fresh fixture with the full schema."""
+
+    def test_no_full_scans_or_temp_sorts(self):
+        problems, checked = plans.find_problems()
+        self.assertGreater(checked, 0)
+        self.assertEqual(problems, [], '\n' + '\n'.join(f'{location}: {message}' for location, message in problems))
+
+    def test_detects_full_scan_and_temp_sort(self):
+        plan = ['SCAN user_term_meta', 'USE TEMP B-TREE FOR ORDER BY', 'SCAN terms_fts VIRTUAL TABLE INDEX 0:M5']
+        self.assertEqual(plans.bad_steps(plan, partial=set()), plan[:2])
+
+    def test_exemption_is_bound_to_its_statement(self):
+        sql = "SELECT t.term FROM terms_data t JOIN user_term_meta m ON m.term_id = t.term_id ORDER BY t.term"
+        step = 'USE TEMP B-TREE FOR ORDER BY'
+        self.assertIsNotNone(plans.allowance('app.py:filter_terms', sql, step))
+        self.assertIsNone(plans.allowance('app.py:some_new_route', sql, step))
+        self.assertIsNone(plans.allowance('app.py:filter_terms', sql, 'SCAN m'))
+
+    def test_unused_exemption_is_reported(self):
+        stale = ('app.py:removed_route', 'from nowhere', ('SCAN',), 'gone')
+        with mock.patch.object(plans, 'ALLOWED', plans.ALLOWED + (stale,)):
+            problems, _ = plans.find_problems()
+        self.assertEqual([location for location, _ in problems], ['app.py:removed_route'])
+
+
+if __name__ == '__main__':
+    unittest.main()
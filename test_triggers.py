@@ -0,0 +1,139 @@
+# test_triggers.py
+import os
+import random
+import sqlite3
+import tempfile
+import unittest
+
+from metachanges import LOGGED, current_version
+from metacounters import check_meta_counters
+from test_maintenance import build_database
+from userstats import check_user_stats
+
+USERS = ('a', 'b', 'c')
+VALUES = {
+    'favorite': (0, 1, None),
+    'bookmark': (0, 1),
+    'difficulty': ('unknown', 'easy', 'medium', 'hard', None),
+    'rating': (0, 1, 3, 5),
+    'notes': ('', 'short', 'longer note', None),
+    'important_level': ('none', 'high'),
+    'read_status': ('to-read', 'read'),
+    'last_viewed': ('2024-01-01T10:00:00', '2024-02-01T10:00:00')
+}
+
+
+def mix_writes(conn, rng, steps):
+    """Random inserts, upserts, updates (some moving rows to another user or term) and deletes on user_term_meta."""
+    term_ids = [row[0] for row in conn.execute("SELECT term_id FROM terms_data ORDER BY term_id LIMIT 40")]
+
+    def some_row():
+        ids = conn.execute("SELECT id FROM user_term_meta ORDER BY id").fetchall()
+        return rng.choice(ids) if ids else None
+
+    for _ in range(steps):
+        action = rng.random()
+        column = rng.choice(list(VALUES))
+        if action < 0.35:
+            columns = rng.sample(list(VALUES), 3)
+            conn.execute(f"""
+                INSERT INTO user_term_meta (term_id, user_id, {', '.join(columns)}) VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(term_id, user_id) DO UPDATE SET {', '.join(f'{c} = excluded.{c}' for c in columns)}
+            """, [rng.choice(term_ids), rng.choice(USERS)] + [rng.choice(VALUES[c]) for c in columns])
+            continue
+        row = some_row()
+        if row is None:
+            continue
+        if action < 0.65:
+            conn.execute(f"UPDATE user_term_meta SET {column} = ? WHERE id = ?", (rng.choice(VALUES[column]), row[0]))
+        elif action < 0.72:
+            conn.execute(f"UPDATE user_term_meta SET {column} = ? WHERE user_id = ? AND rating = ?",
+                         (rng.choice(VALUES[column]), rng.choice(USERS), rng.choice(VALUES['rating'])))
+        elif action < 0.8:
+            conn.execute("UPDATE OR IGNORE user_term_meta SET user_id = ? WHERE id = ?",
+                         (rng.choice(USERS + (None,)), row[0]))
+        elif action < 0.86:
+            conn.execute("UPDATE OR IGNORE user_term_meta SET term_id = ? WHERE id = ?", (rng.choice(term_ids), row[0]))
+        elif action < 0.95:
+            conn.execute("DELETE FROM user_term_meta WHERE id = ?", row)
+        else:
+            conn.execute("DELETE FROM user_term_meta WHERE user_id = ? AND difficulty = ?",
+                         (rng.choice(USERS), rng.choice(VALUES['difficulty'])))
+
+
+class TriggerTestCase(unittest.TestCase):
+    """A migrated database; run_writes() applies the same mix of writes for every derived table."""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmpdir.name, 'prism.sqlite')
+        build_database(self.db_path, terms=100)
+        self.conn = sqlite3.connect(self.db_path)
+
+    def tearDown(self):
+        self.conn.close()
+        self.tmpdir.cleanup()
+
+    def run_writes(self, check, rounds=10, steps=60):
+        rng = random.Random(20)
+        for _ in range(rounds):
+            mix_writes(self.conn, rng, steps)
+            self.conn.commit()
+            check()
+
+
+class MetaCountersTriggerTest(TriggerTestCase):
+    """user_meta_counters always equals the recount that `metacounters.py` rebuilds from."""
+
+    def test_counters_follow_writes(self):
+        self.run_writes(lambda: self.assertEqual(check_meta_counters(self.conn.cursor()), []))
+
+
+class UserStatsTriggerTest(TriggerTestCase):
+    """user_stats_summary always equals the recount that `userstats.py` rebuilds from."""
+
+    def test_summary_follows_writes(self):
+        self.run_writes(lambda: self.assertEqual(check_user_stats(self.conn.cursor()), []))
+
+
+class MetaChangesTriggerTest(TriggerTestCase):
+    """
+    user_meta_changes has a live entry for exactly the rows of user_term_meta
+    (what its initial fill builds) and, above any earlier version, an entry
+    for every pair whose logged fields changed since.
+    """
+
+    def logged_state(self):
+        fields = ', '.join(e.format(row='m') for e in LOGGED.values())
+        return {(row[0], row[1]): row[2:] for row in self.conn.execute(
+            f"SELECT user_id, term_id, {fields} FROM user_term_meta m WHERE user_id IS NOT NULL")}
+
+    def entries(self, since=0):
+        return {(user_id, term_id): deleted for user_id, term_id, deleted in self.conn.execute(
+            "SELECT user_id, term_id, deleted FROM user_meta_changes WHERE version > ?", (since,))}
+
+    def test_changes_follow_writes(self):
+        snapshots = [(current_version(self.conn.cursor()), self.logged_state())]
+
+        def check():
+            state = self.logged_state()
+            entries = self.entries()
+            self.assertEqual({pair for pair, deleted in entries.items() if not deleted}, set(state))
+
+            versions = [row[0] for row in self.conn.execute("SELECT version FROM user_meta_changes")]
+            self.assertEqual(len(versions), len(set(versions)))
+            self.assertLessEqual(max(versions, default=0), current_version(self.conn.cursor()))
+
+            for since, seen in snapshots:
+                changes = self.entries(since)
+                for pair in seen.keys() | state.keys():
+                    if seen.get(pair) != state.get(pair):
+                        self.assertIn(pair, changes)
+                        self.assertEqual(changes[pair], int(pair not in state), pair)
+            snapshots.append((current_version(self.conn.cursor()), state))
+
+        self.run_writes(check)
+
+
+if __name__ == '__main__':
+    unittest.main()
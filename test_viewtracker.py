@@ -0,0 +1,77 @@
+# test_viewtracker.py
+import os
+import sqlite3
+import tempfile
+import time
+import unittest
+
+from test_maintenance import build_database
+from viewtracker import ViewTracker
+from writer import stop_all_writers
+
+
+class ViewTrackerTest(unittest.TestCase):
+    """Views are queued in memory and reach user_term_meta.last_viewed in batches."""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmpdir.name, 'prism.sqlite')
+        build_database(self.db_path, terms=20)
+
+    def tearDown(self):
+        stop_all_writers()
+        self.tmpdir.cleanup()
+
+    def last_viewed(self):
+        conn = sqlite3.connect(self.db_path)
+        try:
+            return dict(((user_id, term), viewed) for user_id, term, viewed in conn.execute("""
+                SELECT m.user_id, t.term, m.last_viewed FROM user_term_meta m
+                JOIN terms_data t ON t.term_id = m.term_id
+            """))
+        finally:
+            conn.close()
+
+    def test_repeat_views_keep_latest_timestamp(self):
+        tracker = ViewTracker(self.db_path, flush_interval=60, max_pending=100)
+        for viewed_at in ('2024-01-01T10:00:00', '2024-01-01T10:05:00', '2024-01-01T10:09:00'):
+            tracker.record('u', 'term 0001', viewed_at)
+        tracker.record('v', 'term 0001', '2024-01-01T11:00:00')
+        self.assertEqual(tracker.pending_view('u', 'term 0001'), '2024-01-01T10:09:00')
+
+        self.assertEqual(tracker.flush(), 2)
+        self.assertEqual(self.last_viewed(), {
+            ('u', 'term 0001'): '2024-01-01T10:09:00',
+            ('v', 'term 0001'): '2024-01-01T11:00:00'
+        })
+        self.assertIsNone(tracker.pending_view('u', 'term 0001'))
+        tracker.stop()
+
+    def test_flushes_when_max_pending_reached(self):
+        tracker = ViewTracker(self.db_path, flush_interval=60, max_pending=3)
+        for i in range(3):
+            tracker.record('u', f'term {i:04d}')
+        deadline = time.monotonic() + 5
+        while tracker.flushes == 0 and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+        # Well before flush_interval: the background thread was woken by the backlog
+        self.assertEqual(tracker.flushes, 1)
+        self.assertEqual(len(self.last_viewed()), 3)
+        tracker.stop()
+
+    def test_stop_flushes_pending_views(self):
+        tracker = ViewTracker(self.db_path, flush_interval=60, max_pending=100)
+        tracker.record('u', 'term 0001', '2024-01-01T10:00:00')
+        self.assertEqual(self.last_viewed(), {})
+
+        tracker.stop()
+        self.assertEqual(self.last_viewed(), {('u', 'term 0001'): '2024-01-01T10:00:00'})
+
+        # After stop() views are written straight through
+        tracker.record('u', 'term 0002', '2024-01-01T10:01:00')
+        self.assertEqual(self.last_viewed()[('u', 'term 0002')], '2024-01-01T10:01:00')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,104 @@
+# test_writer.py
+import os
+import sqlite3
+import tempfile
+import threading
+import unittest
+
+from writer import DatabaseWriter
+
+
+def insert(cursor, table, value):
+    cursor.execute(f"INSERT INTO {table} (value) VALUES (?)", (value,))
+    return cursor.lastrowid
+
+
+def insert_then_fail(cursor, value):
+    insert(cursor, 'items', value)
+    raise ValueError('rejected')
+
+
+class DatabaseWriterTest(unittest.TestCase):
+    """Group commit with one SAVEPOINT per operation."""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmpdir.name, 'prism.sqlite')
+        conn = sqlite3.connect(self.db_path)
+        conn.executescript("""
+            CREATE TABLE items (id INTEGER PRIMARY KEY, value TEXT);
+            CREATE TABLE parents (id INTEGER PRIMARY KEY);
+            CREATE TABLE children (
+                id INTEGER PRIMARY KEY,
+                value INTEGER REFERENCES parents(id) DEFERRABLE INITIALLY DEFERRED
+            );
+        """)
+        conn.close()
+        self.writer = DatabaseWriter(self.db_path)
+
+    def tearDown(self):
+        self.writer.stop()
+        self.tmpdir.cleanup()
+
+    def values(self, table):
+        conn = sqlite3.connect(self.db_path)
+        try:
+            return [row[0] for row in conn.execute(f"SELECT value FROM {table} ORDER BY id")]
+        finally:
+            conn.close()
+
+    def submit_batch(self, operations):
+        """Submits (fn, *args) tuples so that they all run in one batch; returns their Futures."""
+        started, release = threading.Event(), threading.Event()
+
+        def hold(cursor):
+            started.set()
+            release.wait(5)
+
+        # The writer thread takes the blocker alone; everything queued meanwhile forms the next batch
+        blocker = self.writer.submit(hold)
+        self.assertTrue(started.wait(5))
+        futures = [self.writer.submit(*operation) for operation in operations]
+        release.set()
+        blocker.result(5)
+        for future in futures:
+            future.exception(5)
+        return futures
+
+    def test_failed_operation_rolls_back_alone(self):
+        first, failing, last = self.submit_batch([
+            (insert, 'items', 'a'),
+            (insert_then_fail, 'b'),
+            (insert, 'items', 'c')
+        ])
+
+        self.assertEqual(self.writer.batches, 2)
+        self.assertIsInstance(first.result(), int)
+        with self.assertRaises(ValueError):
+            failing.result()
+        self.assertIsInstance(last.result(), int)
+        self.assertEqual(self.values('items'), ['a', 'c'])
+        self.assertEqual(self.writer.metrics()['failures'], 1)
+
+    def test_commit_failure_fails_every_operation(self):
+        # Deferred foreign keys are only checked at COMMIT
+        self.writer.run_exclusive(lambda conn: conn.execute("PRAGMA foreign_keys = ON"))
+        futures = self.submit_batch([
+            (insert, 'items', 'a'),
+            (insert, 'children', 42),
+            (insert, 'items', 'b')
+        ])
+
+        for future in futures:
+            with self.assertRaises(sqlite3.IntegrityError):
+                future.result()
+        self.assertEqual(self.values('items'), [])
+        self.assertEqual(self.values('children'), [])
+
+        # The writer reconnects and keeps going
+        self.writer.write(insert, 'items', 'c')
+        self.assertEqual(self.values('items'), ['c'])
+
+
+if __name__ == '__main__':
+    unittest.main()
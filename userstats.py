@@ -0,0 +1,160 @@
+# userstats.py
+import argparse
+import os
+import sqlite3
+import sys
+
+from writer import get_writer, stop_all_writers
+
+# Source table -> {summary column: its contribution of one row}, with {row}
+# standing for the row (new/old in triggers)
+SOURCES = {
+    'user_term_meta': {
+        'favorites': "{row}.favorite = 1",
+        'bookmarks': "{row}.bookmark = 1",
+        'with_notes': "{row}.notes IS NOT NULL AND {row}.notes != ''",
+        'easy': "{row}.difficulty = 'easy'",
+        'medium': "{row}.difficulty = 'medium'",
+        'hard': "{row}.difficulty = 'hard'"
+    },
+    'user_recent_terms': {'recent_terms': "1"},
+    'user_collections': {'collections': "1"},
+    'homework': {'homework': "1"},
+    'term_view_aggregates': {'total_views': "{row}.views"}
+}
+# Columns each source's contributions are computed from
+_SOURCE_COLUMNS = {
+    'user_term_meta': ('favorite', 'bookmark', 'notes', 'difficulty'),
+    'user_recent_terms': (),
+    'user_collections': (),
+    'homework': (),
+    'term_view_aggregates': ('views',)
+}
+STAT_COLUMNS = tuple(column for columns in SOURCES.values() for column in columns)
+
+
+def _contribution(expression, row):
+    return f"COALESCE(({expression.format(row=row)}), 0)"
+
+
+def _add(table, row, sign):
+    columns = SOURCES[table]
+    if sign > 0:
+        values = ', '.join(_contribution(e, row) for e in columns.values())
+        updates = ', '.join(f"{c} = {c} + excluded.{c}" for c in columns)
+        return f"""
+            INSERT INTO user_stats_summary (user_id, {', '.join(columns)})
+            SELECT {row}.user_id, {values} WHERE {row}.user_id IS NOT NULL
+            ON CONFLICT(user_id) DO UPDATE SET {updates};
+        """
+    updates = ', '.join(f"{c} = {c} - {_contribution(e, row)}" for c, e in columns.items())
+    return f"UPDATE user_stats_summary SET {updates} WHERE user_id = {row}.user_id;"
+
+
+def ensure_user_stats(cursor):
+    """
+    Creates user_stats_summary, one row of counts per user, and the triggers
+    on its source tables that keep it current. Triggers run inside the
+    statement that fires them, so the summary commits with the write it
+    counts. The summary is filled on first creation only.
+    """
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'user_stats_summary'")
+    exists = cursor.fetchone() is not None
+    cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS user_stats_summary (
+            user_id TEXT PRIMARY KEY,
+            {', '.join(f'{c} INTEGER NOT NULL DEFAULT 0' for c in STAT_COLUMNS)}
+        ) WITHOUT ROWID
+    """)
+    for table in SOURCES:
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS user_stats_{table}_insert AFTER INSERT ON {table}
+            BEGIN {_add(table, 'new', 1)} END
+        """)
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS user_stats_{table}_delete AFTER DELETE ON {table}
+            BEGIN {_add(table, 'old', -1)} END
+        """)
+        changed = ' OR '.join(['old.user_id IS NOT new.user_id'] + [
+            f"{_contribution(e, 'old')} IS NOT {_contribution(e, 'new')}" for e in SOURCES[table].values()
+            if '{row}' in e])
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS user_stats_{table}_update
+            AFTER UPDATE OF {', '.join(('user_id',) + _SOURCE_COLUMNS[table])} ON {table}
+            WHEN {changed}
+            BEGIN {_add(table, 'old', -1)} {_add(table, 'new', 1)} END
+        """)
+    if not exists:
+        rebuild_user_stats(cursor)
+
+
+def _recount_sql():
+    parts = []
+    for table, columns in SOURCES.items():
+        values = ', '.join(
+            f"SUM({_contribution(columns[c], 's')}) AS {c}" if c in columns else f"0 AS {c}"
+            for c in STAT_COLUMNS)
+        parts.append(f"SELECT user_id, {values} FROM {table} s WHERE user_id IS NOT NULL GROUP BY user_id")
+    totals = ', '.join(f"SUM({c})" for c in STAT_COLUMNS)
+    return f"SELECT user_id, {totals} FROM ({' UNION ALL '.join(parts)}) GROUP BY user_id"
+
+
+def rebuild_user_stats(cursor):
+    """Recomputes every user's summary from the source tables. Returns the number of users."""
+    cursor.execute("DELETE FROM user_stats_summary")
+    cursor.execute(f"INSERT INTO user_stats_summary (user_id, {', '.join(STAT_COLUMNS)}) {_recount_sql()}")
+    return cursor.rowcount
+
+
+def check_user_stats(cursor):
+    """[(user_id, column, stored, actual)] for every summary count that is off."""
+    zeros = (0,) * len(STAT_COLUMNS)
+    actual = {row[0]: tuple(row[1:]) for row in cursor.execute(_recount_sql())}
+    stored = {row[0]: tuple(row[1:]) for row in cursor.execute(
+        f"SELECT user_id, {', '.join(STAT_COLUMNS)} FROM user_stats_summary")}
+    drift = []
+    for user_id in sorted(actual.keys() | stored.keys()):
+        for column, have, want in zip(STAT_COLUMNS, stored.get(user_id, zeros), actual.get(user_id, zeros)):
+            if have != want:
+                drift.append((user_id, column, have, want))
+    return drift
+
+
+def read_user_stats(cursor, user_id=None):
+    """{column: count} for user_id (zeros for a user with no rows), or summed over all users if None."""
+    if user_id is None:
+        cursor.execute(f"SELECT {', '.join(f'SUM({c})' for c in STAT_COLUMNS)} FROM user_stats_summary")
+    else:
+        cursor.execute(f"SELECT {', '.join(STAT_COLUMNS)} FROM user_stats_summary WHERE user_id = ?", (user_id,))
+    row = cursor.fetchone()
+    return {column: (row[i] or 0) if row else 0 for i, column in enumerate(STAT_COLUMNS)}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Recompute the user_stats_summary table from its source tables')
+    parser.add_argument('--db', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'prism.sqlite'))
+    parser.add_argument('--check', action='store_true', help='only report counts that are off')
+    args = parser.parse_args()
+
+    if not os.path.exists(args.db):
+        print(f"❌ Database not found at: {args.db}")
+        sys.exit(1)
+
+    conn = sqlite3.connect(args.db)
+    try:
+        drift = check_user_stats(conn.cursor())
+    finally:
+        conn.close()
+    for user_id, column, stored, actual in drift:
+        print(f"📋 {user_id} {column}: stored {stored}, actual {actual}")
+    if args.check:
+        print(f"{'❌' if drift else '✅'} {len(drift)} count(s) off")
+        sys.exit(1 if drift else 0)
+
+    print(f"🔧 Rebuilding user stats in {args.db}...")
+    try:
+        # One transaction under the write lock: a running app's writes wait for it
+        users = get_writer(args.db).write(rebuild_user_stats)
+    finally:
+        stop_all_writers()
+    print(f"✅ Summary rebuilt for {users} user(s) ({len(drift)} count(s) were off)")
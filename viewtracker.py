@@ -0,0 +1,124 @@
+# viewtracker.py
+import threading
+from datetime import datetime
+
+from writer import get_writer
+
+_trackers = {}
+_trackers_lock = threading.Lock()
+
+
+def get_view_tracker(db_path):
+    """Returns the process-wide ViewTracker for db_path (started on first use)."""
+    with _trackers_lock:
+        tracker = _trackers.get(db_path)
+        if tracker is None:
+            tracker = ViewTracker(db_path)
+            _trackers[db_path] = tracker
+        return tracker
+
+
+def stop_all_trackers():
+    """Flushes and stops every tracker. Called on shutdown."""
+    with _trackers_lock:
+        trackers = list(_trackers.values())
+    for tracker in trackers:
+        tracker.stop()
+
+
+def _write_views(cursor, rows):
+    # Views of names that are not (or no longer) in the catalog are dropped
+    cursor.executemany("""
+        INSERT INTO user_term_meta (term_id, user_id, last_viewed)
+        SELECT term_id, ?, ? FROM terms_data WHERE term = ?
+        ON CONFLICT(term_id, user_id) DO UPDATE SET
+            last_viewed = excluded.last_viewed
+    """, rows)
+
+
+class ViewTracker:
+    """
+    Write-behind queue for user_term_meta.last_viewed.
+
+    Opening a term only records (user_id, term) -> timestamp in memory; repeat
+    views of the same term collapse into the latest timestamp. A background
+    thread hands everything pending to the database writer as one operation
+    every `flush_interval` seconds, or sooner once `max_pending` entries
+    pile up.
+    """
+
+    def __init__(self, db_path, flush_interval=0.5, max_pending=200):
+        self.db_path = db_path
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._pending = {}
+        self._cond = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._thread = None
+        self._stopping = False
+        self.flushed = 0
+        self.flushes = 0
+
+    def record(self, user_id, term, viewed_at=None):
+        """Queues a view of `term` by `user_id`; returns the recorded timestamp."""
+        viewed_at = viewed_at or datetime.now().isoformat()
+        with self._cond:
+            self._pending[(user_id, term)] = viewed_at
+            stopping = self._stopping
+            if not stopping:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name='prism-view-tracker', daemon=True)
+                    self._thread.start()
+                if len(self._pending) >= self.max_pending:
+                    self._cond.notify()
+        if stopping:
+            # Too late for the background thread; write straight through
+            self.flush()
+        return viewed_at
+
+    def pending_view(self, user_id, term):
+        """Timestamp of a view that is queued but not yet written, or None."""
+        return self._pending.get((user_id, term))
+
+    def flush(self):
+        """Writes all pending views as one write operation. Returns the row count."""
+        with self._flush_lock:
+            with self._cond:
+                batch, self._pending = self._pending, {}
+            if not batch:
+                return 0
+
+            rows = [(user_id, viewed_at, term) for (user_id, term), viewed_at in batch.items()]
+            try:
+                get_writer(self.db_path).write(_write_views, rows)
+            except Exception as e:
+                # Put the batch back (newer views queued meanwhile win) and retry later
+                print(f"WARNING: Could not flush {len(rows)} term views: {e}")
+                with self._cond:
+                    for key, viewed_at in batch.items():
+                        self._pending.setdefault(key, viewed_at)
+                return 0
+
+            self.flushed += len(rows)
+            self.flushes += 1
+            return len(rows)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if not self._stopping and len(self._pending) < self.max_pending:
+                    self._cond.wait(self.flush_interval)
+                stopping = self._stopping
+            self.flush()
+            if stopping:
+                return
+
+    def stop(self):
+        """Flushes whatever is pending and stops the background thread."""
+        with self._cond:
+            self._stopping = True
+            thread = self._thread
+            self._cond.notify()
+        if thread is not None:
+            thread.join(timeout=5)
+        self.flush()
@@ -0,0 +1,219 @@
+# writer.py
+import sqlite3
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+from dbpool import connect
+from splitdb import catalog_db_path
+
+_writers = {}
+_writers_lock = threading.Lock()
+
+
+def get_writer(db_path):
+    """Returns the process-wide DatabaseWriter for db_path (started on first use)."""
+    with _writers_lock:
+        writer = _writers.get(db_path)
+        if writer is None:
+            writer = DatabaseWriter(db_path)
+            _writers[db_path] = writer
+        return writer
+
+
+def stop_all_writers():
+    """Commits whatever is queued and stops every writer. Called on shutdown."""
+    with _writers_lock:
+        writers = list(_writers.values())
+    for writer in writers:
+        writer.stop()
+
+
+class DatabaseWriter:
+    """
+    Single writer thread owning the only write connection to db_path.
+
+    Callers submit write operations, functions called as fn(cursor, *args),
+    and get a Future for their result. The thread takes everything queued
+    (up to `max_batch` operations) and runs it in one transaction: a group
+    commit, so a burst of small writes shares one fsync. Each operation runs
+    inside its own SAVEPOINT; one that raises is rolled back alone and its
+    Future gets the exception while the rest of the batch commits. Futures
+    resolve only after COMMIT, so a result means the write is durable.
+
+    Operations run on the writer thread: they must not touch a request's
+    pooled connection or Flask globals, only the cursor they are given. A
+    split catalog is attached read-only, so operations can look up term ids
+    in terms_data; writes only go to user-state tables.
+    """
+
+    def __init__(self, db_path, max_batch=256):
+        self.db_path = db_path
+        self.max_batch = max_batch
+        self._queue = deque()
+        self._cond = threading.Condition()
+        # Serializes use of the connection (the thread, or callers after stop())
+        self._conn_lock = threading.Lock()
+        self._conn = None
+        self._thread = None
+        self._stopping = False
+        self._listeners = []
+        self.operations = 0
+        self.failures = 0
+        self.batches = 0
+        self.largest_batch = 0
+        self.commit_time_total = 0.0
+        self.last_commit_at = None
+
+    def submit(self, fn, *args):
+        """Queues fn(cursor, *args) for the writer thread. Returns a Future."""
+        future = Future()
+        with self._cond:
+            stopping = self._stopping
+            if not stopping:
+                self._queue.append((fn, args, future))
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name='prism-db-writer', daemon=True)
+                    self._thread.start()
+                self._cond.notify()
+        if stopping:
+            # Too late for the background thread; write straight through
+            self._write_batch([(fn, args, future)])
+        return future
+
+    def add_listener(self, callback):
+        """Calls callback() on the writer thread after every committed batch."""
+        self._listeners.append(callback)
+
+    def write(self, fn, *args, timeout=30.0):
+        """Submits fn(cursor, *args) and waits for its committed result."""
+        return self.submit(fn, *args).result(timeout)
+
+    def run_exclusive(self, fn, *args):
+        """
+        Runs fn(connection, *args) on the writer's connection between two
+        batches, outside any transaction, for statements that cannot run
+        inside one (VACUUM, wal_checkpoint). Queued writes wait until it
+        returns, so keep it short.
+        """
+        with self._conn_lock:
+            conn = self._connection()
+            try:
+                return fn(conn, *args)
+            finally:
+                if conn.in_transaction:
+                    conn.rollback()
+
+    def idle_seconds(self):
+        """Seconds since the last commit (None if nothing was ever written); 0 while writes are queued."""
+        with self._cond:
+            if self._queue:
+                return 0.0
+        if self.last_commit_at is None:
+            return None
+        return time.monotonic() - self.last_commit_at
+
+    def _connection(self):
+        if self._conn is None:
+            self._conn = connect(self.db_path, catalog_db_path(self.db_path))
+            # Transactions are managed explicitly below
+            self._conn.isolation_level = None
+        return self._conn
+
+    def _write_batch(self, batch):
+        outcomes = []
+        with self._conn_lock:
+            try:
+                conn = self._connection()
+                cursor = conn.cursor()
+                start = time.perf_counter()
+                cursor.execute("BEGIN IMMEDIATE")
+                try:
+                    for fn, args, future in batch:
+                        if not future.set_running_or_notify_cancel():
+                            continue
+                        cursor.execute("SAVEPOINT op")
+                        try:
+                            outcomes.append((future, fn(cursor, *args), None))
+                        except Exception as e:
+                            cursor.execute("ROLLBACK TO op")
+                            outcomes.append((future, None, e))
+                        cursor.execute("RELEASE op")
+                    cursor.execute("COMMIT")
+                    self.last_commit_at = time.monotonic()
+                except BaseException:
+                    if conn.in_transaction:
+                        conn.rollback()
+                    raise
+                self.commit_time_total += time.perf_counter() - start
+            except Exception as e:
+                # Nothing was committed: every operation in the batch fails
+                for fn, args, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                self.failures += len(batch)
+                if isinstance(e, sqlite3.Error):
+                    self._reset()
+                return
+
+        for callback in self._listeners:
+            try:
+                callback()
+            except Exception as e:
+                print(f"WARNING: Writer listener failed: {e}")
+
+        self.batches += 1
+        self.largest_batch = max(self.largest_batch, len(batch))
+        for future, result, error in outcomes:
+            self.operations += 1
+            if error is None:
+                future.set_result(result)
+            else:
+                self.failures += 1
+                future.set_exception(error)
+
+    def _reset(self):
+        """Drops a connection that failed mid-batch; the next batch reconnects."""
+        if self._conn is not None:
+            try:
+                self._conn.close()
+            except sqlite3.Error:
+                pass
+            self._conn = None
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._queue and not self._stopping:
+                    self._cond.wait()
+                if not self._queue:
+                    return
+                batch = [self._queue.popleft() for _ in range(min(len(self._queue), self.max_batch))]
+            self._write_batch(batch)
+
+    def stop(self):
+        """Commits everything still queued, then stops the thread and closes the connection."""
+        with self._cond:
+            self._stopping = True
+            thread = self._thread
+            self._cond.notify()
+        if thread is not None:
+            thread.join(timeout=10)
+        with self._conn_lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def metrics(self):
+        with self._cond:
+            queued = len(self._queue)
+        return {
+            'queued': queued,
+            'operations': self.operations,
+            'failures': self.failures,
+            'batches': self.batches,
+            'avg_batch': round(self.operations / self.batches, 2) if self.batches else 0.0,
+            'largest_batch': self.largest_batch,
+            'commit_ms_avg': round(self.commit_time_total / self.batches * 1000, 3) if self.batches else 0.0
+        }